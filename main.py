@@ -25,15 +25,28 @@ from functools import partial
 from kivy.clock import Clock # For animation loop
 import random # For potential future use with randomness
 import uuid # For generating unique IDs
+import threading
+import time
 from kivy.uix.popup import Popup
 from kivy.uix.button import Button
 
 # Import from our project
 from src.core.ir import EffectIR, EmitterProperties, EmitterParameter, AnimatedParameter, TimelineKeyframe # Add EmitterProperties, EmitterParameter
+from src.core.sim_worker import SimulationWorker
+from src.core.quality import AdaptiveQuality
+from src.core.profiler import FrameProfiler
+from src.core.spine_export import export_spine_json
+from src.core.export_budget import budget_estimator
+from src.ui.preview_window.mesh_renderer import make_disc_texture
+from src.ui.preview_window.layer_compositor import LayeredParticleRenderer
+from src.ui.preview_window.profiler_overlay import ProfilerOverlay
+from src.ui.preview_window.budget_meter import BudgetMeter
 
 # Optional: Set a default window size for easier viewing
 Window.size = (1280, 720) # width, height
 
+PREVIEW_MAX_PARTICLES = 5000
+
 class ParamType(Enum):
     FLOAT = float
     INT = int
@@ -244,43 +257,55 @@ class PlaceholderPanel(BoxLayout):
         self.rect.pos = instance.pos
         self.rect.size = instance.size
 
-class Particle:
-    def __init__(self, pos, color, size, life=1.0, velocity=(0,0)):
-        self.pos = list(pos) 
-        self.color = tuple(color)
-        self.size = tuple(size)
-        self.life = float(life)
-        self.velocity = list(velocity) # Store velocity
-
-    def __repr__(self):
-        return f"Particle(pos={self.pos}, color={self.color}, life={self.life:.2f}, vel={self.velocity})"
-
 class PreviewWindow(Widget):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.particles = []
         self.particle_draw_group = InstructionGroup()
         self.current_emitter_node = None
-        self.emission_rate = 0
-        self.particle_lifespan = 1.0
-        self.particle_base_color = (1,1,1,1)
-        self.particle_initial_velocity = (0,0)
-        self.particle_emitter_offset = (0,0) # Store emitter position offset
-        self.emission_debt = 0.0
+        # The whole effect is simulated on a background worker (with checkpoints,
+        # so scrubbing never re-simulates from t=0) and drawn here, one cached
+        # layer per emitter.
+        self.worker = None
+        self._drawn_serial = 0
 
         with self.canvas:
             Color(rgba=get_color_from_hex('#252525')) 
             self.bg_rect = Rectangle(pos=self.pos, size=self.size)
         self.canvas.add(self.particle_draw_group)
+        # Round particles; each emitter's layer is only re-rendered when its particles change
+        self.renderer = LayeredParticleRenderer(self.particle_draw_group, default_texture=make_disc_texture())
+        self._sprite_textures = {} # No textures: every particle is a disc
+        # Drawing degrades when it exceeds the frame budget
+        self.quality = AdaptiveQuality()
+        self.quality_label = Label(text='', font_size='11sp', color=get_color_from_hex('#9E9E9E'),
+                                   size_hint=(None, None), halign='left', valign='top')
+        self.quality_label.bind(texture_size=lambda label, size: setattr(label, 'size', size))
+        self.add_widget(self.quality_label)
+        # Frame profiler, recording only while its overlay is shown
+        self.profiler = FrameProfiler()
+        self.profiler_overlay = None
+        # Export budget meter, estimating only while shown
+        self.budget_meter = None
         self.bind(pos=self._update_rect, size=self._update_rect)
         self._simulation_event = None
 
     def _update_rect(self, instance, value):
         self.bg_rect.pos = self.pos
         self.bg_rect.size = self.size
+        self.quality_label.pos = (self.x + dp(6), self.top - self.quality_label.height - dp(4))
+        if self.profiler_overlay:
+            self.profiler_overlay.size = (min(self.width, dp(260)), min(self.height, dp(200)))
+            self.profiler_overlay.pos = (self.right - self.profiler_overlay.width, self.y)
+        if self.budget_meter:
+            self.budget_meter.size = (min(self.width, dp(220)), min(self.height, dp(80)))
+            self.budget_meter.pos = (self.x, self.y)
+        self.renderer.resize(self.pos, self.size)
+        self.draw_particles(force=True)
 
     def start_simulation(self, node):
-        self.stop_simulation()
+        # Layers are kept: after an edit only the changed emitter is re-rendered
+        self._unschedule()
+        self.current_emitter_node = None
         if not (node and isinstance(node, SourceNode)):
             self.draw_particles() # Draw empty if no valid node
             return
@@ -301,75 +326,114 @@ class PreviewWindow(Widget):
 
         self.current_emitter_node = node # Still keep a reference to the node for identity, maybe other non-IR uses
 
-        # Fetch parameters from EffectIR, considering current_time for animation
-        current_time = app.current_time
-        node_id = node.node_id
+        if self.worker is None or self.worker.effect_ir is not app.effect_ir:
+            self.shutdown()
+            self.worker = SimulationWorker(app.effect_ir, max_particles=PREVIEW_MAX_PARTICLES)
+            self.worker.simulator.profiler = self.renderer.profiler
+            self.worker.start()
+        else:
+            # Parameters may have changed, so every stored state is stale
+            self.worker.invalidate()
 
-        self.emission_rate = app.effect_ir.get_animated_param_value(node_id, "emission_rate", current_time)
-        self.particle_lifespan = app.effect_ir.get_animated_param_value(node_id, "lifespan", current_time)
-        
-        color_val = app.effect_ir.get_animated_param_value(node_id, "particle_color", current_time)
-        self.particle_base_color = color_val if isinstance(color_val, tuple) and len(color_val) == 4 else (1,1,1,1)
-        
-        # Debug: Print the color being used
-        print(f"Preview: Using particle color {self.particle_base_color} from EffectIR at T={current_time:.2f}")
-        
-        velocity_val = app.effect_ir.get_animated_param_value(node_id, "initial_velocity", current_time)
-        self.particle_initial_velocity = velocity_val if isinstance(velocity_val, tuple) and len(velocity_val) == 2 else (0,0)
-        
-        emitter_pos_val = app.effect_ir.get_animated_param_value(node_id, "emitter_position", current_time)
-        self.particle_emitter_offset = emitter_pos_val if isinstance(emitter_pos_val, tuple) and len(emitter_pos_val) == 2 else (0,0)
+        self.worker.seek(app.current_time)
+        self.worker.play()
+        self._update_quality_label() # Clears a "Preview stopped" message
+        self._simulation_event = Clock.schedule_interval(self.update_simulation, self.worker.dt)
 
-        print(f"Preview using IR data for '{node.node_id}' at T={current_time:.2f}: Rate={self.emission_rate}, Life={self.particle_lifespan}, Color={self.particle_base_color}")
+    def stop_simulation(self):
+        self._unschedule()
+        if self.worker:
+            self.worker.pause()
+        self.renderer.clear()
+        self.current_emitter_node = None
 
-        self.emission_debt = 0.0
-        if self.emission_rate > 0 or self.particles: 
-            self._simulation_event = Clock.schedule_interval(self.update_simulation, 1.0 / 60.0)
+    def shutdown(self):
+        # Stops the background simulation thread, e.g. when the app closes
+        self.stop_simulation()
+        if self.worker:
+            self.worker.stop()
+            self.worker = None
+
+    def toggle_profiler(self, *args):
+        profiling = self.profiler_overlay is None
+        if profiling:
+            self.profiler.clear()
+            self.profiler.hook_gc()
+            self.profiler_overlay = ProfilerOverlay(self.profiler, size_hint=(None, None))
+            self.add_widget(self.profiler_overlay)
         else:
-            self.draw_particles()
-
-    def stop_simulation(self):
+            self.profiler.unhook_gc()
+            self.profiler_overlay.close()
+            self.remove_widget(self.profiler_overlay)
+            self.profiler_overlay = None
+        self.renderer.profiler = self.profiler if profiling else None
+        if self.worker:
+            self.worker.simulator.profiler = self.renderer.profiler
+        self._update_rect(self, None)
+
+    def toggle_budget_meter(self, effect_ir):
+        if self.budget_meter is None:
+            self.budget_meter = BudgetMeter(budget_estimator(effect_ir, workers=1), size_hint=(None, None))
+            self.add_widget(self.budget_meter)
+        else:
+            self.budget_meter.close()
+            self.remove_widget(self.budget_meter)
+            self.budget_meter = None
+        self._update_rect(self, None)
+
+    def export_profile(self, path=None):
+        path = path or time.strftime('preview_profile_%Y%m%d_%H%M%S.csv')
+        self.profiler.export(path)
+        print(f"Preview profile ({len(self.profiler)} frames) written to {path}")
+        return path
+
+    def _unschedule(self):
         if self._simulation_event:
             Clock.unschedule(self._simulation_event)
             self._simulation_event = None
-        self.particles.clear()
-        self.particle_draw_group.clear()
-        self.current_emitter_node = None
-        self.emission_debt = 0.0
+
+    def seek(self, time):
+        # Show the simulated state at `time`, resuming from the nearest checkpoint
+        if not (self.current_emitter_node and self.worker):
+            return
+        self.worker.seek(time)
+
+    def apply_edit(self, apply, on_applied=None):
+        # IR parameter changes run on the simulation thread between steps;
+        # on_applied() then runs back on the UI thread
+        if self.worker:
+            def run():
+                apply()
+                if on_applied:
+                    Clock.schedule_once(lambda dt: on_applied())
+            self.worker.edit(run)
+        else:
+            app = App.get_running_app()
+            with app.effect_ir.lock: # The budget meter snapshots the effect from its own thread
+                apply()
+            if on_applied:
+                on_applied()
 
     def update_simulation(self, dt):
         if not self.current_emitter_node: 
             self.stop_simulation()
             return
-
-        particles_to_emit_float = self.emission_rate * dt + self.emission_debt
-        num_to_emit = int(particles_to_emit_float)
-        self.emission_debt = particles_to_emit_float - num_to_emit
-
-        particle_size = (dp(10), dp(10))
-        # Calculate base emission position using the offset
-        base_pos_x = self.center_x + self.particle_emitter_offset[0]
-        base_pos_y = self.center_y + self.particle_emitter_offset[1]
-
-        for _ in range(num_to_emit):
-            p = Particle(
-                pos=(base_pos_x, base_pos_y), # Use base position
-                color=self.particle_base_color,
-                size=particle_size,
-                life=self.particle_lifespan,
-                velocity=self.particle_initial_velocity
-            )
-            self.particles.append(p)
-
-        for i in range(len(self.particles) - 1, -1, -1):
-            p = self.particles[i]
-            p.life -= dt
-            p.pos[0] += p.velocity[0] * dt
-            p.pos[1] += p.velocity[1] * dt
-            if p.life <= 0:
-                self.particles.pop(i)
-        
-        self.draw_particles()
+        try:
+            self.worker.raise_error()
+        except Exception as e:
+            # The worker paused playback; say so instead of freezing silently
+            print(f"Warning: Preview simulation failed: {e!r}")
+            self.quality_label.text = f'Preview stopped: {e}'
+            self._update_rect(self, None)
+        # The worker steps in the background; this only uploads and draws its latest frame
+        started = time.perf_counter()
+        if self.draw_particles() and self.quality.record(time.perf_counter() - started):
+            self._update_quality_label()
+
+    def _update_quality_label(self):
+        level = self.quality.level
+        self.quality_label.text = '' if level is self.quality.levels[0] else f'Preview quality: {level.name}'
+        self._update_rect(self, None)
 
     def update_preview(self, node):
         if node and isinstance(node, SourceNode):
@@ -378,12 +442,28 @@ class PreviewWindow(Widget):
             self.stop_simulation()
             self.draw_particles()
 
-    def draw_particles(self):
-        self.particle_draw_group.clear() 
-        for p in self.particles:
-            self.particle_draw_group.add(Color(rgba=p.color))
-            ellipse_pos = (p.pos[0] - p.size[0] / 2, p.pos[1] - p.size[1] / 2)
-            self.particle_draw_group.add(Ellipse(pos=ellipse_pos, size=p.size))
+    def draw_particles(self, force=False):
+        # Returns True if a frame was drawn
+        if not (self.current_emitter_node and self.worker):
+            self.renderer.clear()
+            return False
+        if self.worker.serial == self._drawn_serial and not force:
+            return False # Nothing new; the layers still show the last frame
+        frame = self.worker.acquire_frame()
+        try:
+            self._drawn_serial = frame.serial
+            self.renderer.update_sprites(frame.pool.sprite_ids, self._sprite_textures, self.worker.effect_ir)
+            # Simulation positions are offsets from the preview center
+            views = frame.views()
+            self.renderer.draw(self.worker.effect_ir, views, frame.step, offset=self.center,
+                               size_scale=dp(1), quality=self.quality.level, fingerprints=frame.fingerprints)
+            if self.renderer.profiler:
+                stats = self.renderer.queue_stats
+                self.profiler.end_frame({view.emitter_id: len(view) for view in views},
+                                        self.renderer.instruction_count, stats.draws, stats.state_changes_saved)
+        finally:
+            self.worker.release_frame()
+        return True
 
 class NodeWidget(BoxLayout):
     title = StringProperty('Node')
@@ -491,7 +571,11 @@ class NodeWidget(BoxLayout):
                         if emitter_data:
                             # Ensure the parameter exists in the IR's EmitterProperties parameters dict
                             if name in emitter_data.parameters:
-                                emitter_data.set_param_value(name, value)
+                                # Through the preview so the simulation thread never sees a half-applied edit
+                                if app.preview_window:
+                                    app.preview_window.apply_edit(partial(emitter_data.set_param_value, name, value))
+                                else:
+                                    emitter_data.set_param_value(name, value)
                                 print(f"EffectIR: Updated emitter '{self.node_id}' param '{name}' to: {value}")
                             else:
                                 # This case should ideally not happen if IR is synced on creation
@@ -1549,7 +1633,35 @@ class SparcleApp(App):
         # We need to update the preview if a node is selected.
         print(f"SparcleApp.current_time changed to: {value:.2f}s")
         if self.selected_node and self.preview_window:
-            self.preview_window.update_preview(self.selected_node)
+            # Scrubbing: jump to the simulated state at this time (restarts only if nothing is running)
+            if self.preview_window.current_emitter_node is self.selected_node:
+                self.preview_window.seek(value)
+            else:
+                self.preview_window.update_preview(self.selected_node)
+
+    def on_stop(self):
+        if self.preview_window:
+            self.preview_window.shutdown()
+
+    def export_spine(self, path=None):
+        # Bakes on a background thread from a snapshot, so the editor stays responsive and
+        # edits made meanwhile are not exported half-applied. workers=1: no process pool is
+        # started from that thread (with spawn, each worker would re-import this module).
+        path = path or time.strftime('effect_%Y%m%d_%H%M%S.json')
+        effect_ir = self.effect_ir.snapshot()
+
+        def run():
+            try:
+                stats = export_spine_json(effect_ir, path, workers=1)
+            except Exception as e:
+                Clock.schedule_once(lambda dt: print(f"Warning: Spine export to {path} failed: {e!r}"))
+                return
+            Clock.schedule_once(lambda dt: print(
+                f"Spine JSON ({stats.slots} slots, {stats.keys} keys, {stats.raw_bytes} bytes, "
+                f"{stats.gzip_bytes} gzipped) written to {path}"))
+
+        threading.Thread(target=run, name="SpineExport", daemon=True).start()
+        return path
 
     def build(self):
         self.effect_ir = EffectIR() 
@@ -1568,6 +1680,7 @@ class SparcleApp(App):
         file_group.add_widget(ActionButton(text='New'))
         file_group.add_widget(ActionButton(text='Open'))
         file_group.add_widget(ActionButton(text='Save'))
+        file_group.add_widget(ActionButton(text='Export Spine JSON', on_release=lambda *a: self.export_spine()))
         action_view.add_widget(file_group)
 
         edit_group = ActionGroup(text='Edit')
@@ -1577,6 +1690,9 @@ class SparcleApp(App):
 
         view_group = ActionGroup(text='View')
         view_group.add_widget(ActionButton(text='Toggle Something'))
+        view_group.add_widget(ActionButton(text='Preview Profiler', on_release=lambda *a: self.preview_window.toggle_profiler()))
+        view_group.add_widget(ActionButton(text='Export Profile', on_release=lambda *a: self.preview_window.export_profile()))
+        view_group.add_widget(ActionButton(text='Export Budget', on_release=lambda *a: self.preview_window.toggle_budget_meter(self.effect_ir)))
         action_view.add_widget(view_group)
 
         # Add Node group (New)
@@ -1701,11 +1817,6 @@ class SparcleApp(App):
         if keyframe_created and hasattr(self, 'timeline_panel'):
             self._show_keyframe_feedback(param_name)
         
-        # Force clear particles for immediate color feedback
-        if param_name == "particle_color" and self.preview_window and changed_node == self.selected_node:
-            print("Clearing existing particles due to color change")
-            self.preview_window.particles.clear()
-        
         if self.preview_window and changed_node == self.selected_node:
             if isinstance(changed_node, SourceNode) and param_name in ["emission_rate", "lifespan", "particle_color", "initial_velocity", "emitter_position"]:
                  self.preview_window.update_preview(changed_node)
@@ -1725,45 +1836,40 @@ class SparcleApp(App):
             
         # Create timeline path
         timeline_path = f"{node.node_id}/{param_name}"
+        key_time = self.current_time
         
-        # Get or create AnimatedParameter
+        # The edit builds a new AnimatedParameter rather than changing the registered one:
+        # the simulation thread reads timelines, so they are replaced in one step on that thread
         animated_param = self.effect_ir.timelines.get(timeline_path)
+        keyframes = animated_param.keyframes if animated_param else []
+        # Remove existing keyframe at this time if it exists (prevent duplicates)
+        kept = [kf for kf in keyframes if abs(kf.time - key_time) > 0.001]
+        new_param = AnimatedParameter(keyframes=kept + [TimelineKeyframe(time=key_time, value=current_value)])
         if animated_param is None:
-            # Create new AnimatedParameter with just this keyframe
-            from src.core.ir import AnimatedParameter, TimelineKeyframe
-            animated_param = AnimatedParameter(keyframes=[
-                TimelineKeyframe(time=self.current_time, value=current_value)
-            ])
-            self.effect_ir.add_or_update_timeline(timeline_path, animated_param)
-            print(f"✓ KEYFRAME CREATED: New timeline '{timeline_path}' at T={self.current_time:.2f} with value {current_value}")
+            message = f"✓ KEYFRAME CREATED: New timeline '{timeline_path}' at T={key_time:.2f} with value {current_value}"
+        elif len(kept) < len(keyframes):
+            message = f"✓ KEYFRAME UPDATED: Replaced existing keyframe for '{timeline_path}' at T={key_time:.2f} with value {current_value}"
         else:
-            # Add keyframe to existing AnimatedParameter
-            from src.core.ir import TimelineKeyframe
-            new_keyframe = TimelineKeyframe(time=self.current_time, value=current_value)
-            
-            # Remove existing keyframe at this time if it exists (prevent duplicates)
-            existing_count = len(animated_param.keyframes)
-            animated_param.keyframes = [kf for kf in animated_param.keyframes if abs(kf.time - self.current_time) > 0.001]
-            removed_count = existing_count - len(animated_param.keyframes)
-            
-            # Add new keyframe and re-sort
-            animated_param.keyframes.append(new_keyframe)
-            animated_param.keyframes.sort(key=lambda kf: kf.time)
+            message = f"✓ KEYFRAME CREATED: Added to timeline '{timeline_path}' at T={key_time:.2f} with value {current_value}"
+
+        def on_applied():
+            print(message)
+            # Force immediate timeline refresh
+            if hasattr(self, 'timeline_panel'):
+                self.timeline_panel.refresh_keyframes()
+                print(f"Timeline refreshed - Total keyframes for this node: {self._count_node_keyframes(node.node_id)}")
             
-            if removed_count > 0:
-                print(f"✓ KEYFRAME UPDATED: Replaced existing keyframe for '{timeline_path}' at T={self.current_time:.2f} with value {current_value}")
-            else:
-                print(f"✓ KEYFRAME CREATED: Added to timeline '{timeline_path}' at T={self.current_time:.2f} with value {current_value}")
-        
-        # Force immediate timeline refresh
-        if hasattr(self, 'timeline_panel'):
-            self.timeline_panel.refresh_keyframes()
-            print(f"Timeline refreshed - Total keyframes for this node: {self._count_node_keyframes(node.node_id)}")
-        
-        # Force preview update to show keyframe effect immediately
-        if self.preview_window and node == self.selected_node:
-            print(f"Forcing preview update after keyframe creation for '{param_name}'")
-            self.preview_window.update_preview(node)
+            # Force preview update to show keyframe effect immediately
+            if self.preview_window and node == self.selected_node:
+                print(f"Forcing preview update after keyframe creation for '{param_name}'")
+                self.preview_window.update_preview(node)
+
+        apply = partial(self.effect_ir.add_or_update_timeline, timeline_path, new_param)
+        if self.preview_window:
+            self.preview_window.apply_edit(apply, on_applied)
+        else:
+            apply()
+            on_applied()
 
     def _count_node_keyframes(self, node_id):
         """Count total keyframes for a given node (for debugging)"""
@@ -0,0 +1,193 @@
+from typing import List, Optional
+
+import numpy as np
+
+try:
+    from .particle_pool import ParticlePool
+    from .particle_system import ParticleSystem
+    from .curves import LifetimeCurveBanks, DEFAULT_CURVE_TOLERANCE
+    from .simulator import EmitterParticles, group_emitter_rows
+    from .ir import EffectIR
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from particle_pool import ParticlePool
+    from particle_system import ParticleSystem
+    from curves import LifetimeCurveBanks, DEFAULT_CURVE_TOLERANCE
+    from simulator import EmitterParticles, group_emitter_rows
+    from ir import EffectIR
+
+# Pool columns copied into a spawn record at birth
+SPAWN_COLUMNS = (
+    "particle_id", "emitter_index", "position", "velocity", "acceleration", "rotation",
+    "angular_velocity", "lifespan", "initial_size", "initial_color", "sprite_index", "orient_to_velocity",
+)
+
+
+class SpawnRecords:
+    """Birth state of every particle emitted over a time range, sorted by birth time.
+
+    Columns have the names and dtypes of the matching ParticlePool columns,
+    plus `birth_time`. `sprite_ids` resolves `sprite_index`.
+    """
+
+    def __init__(self, chunks: List[dict], sprite_ids: List[Optional[str]]):
+        self.sprite_ids: List[Optional[str]] = list(sprite_ids)
+        if not chunks:
+            template = ParticlePool(capacity=1)
+            chunks = [dict({"birth_time": np.empty(0)}, **{name: getattr(template, name)[:0] for name in SPAWN_COLUMNS})]
+        names = ("birth_time",) + SPAWN_COLUMNS
+        for name in names:
+            setattr(self, name, np.concatenate([chunk[name] for chunk in chunks]))
+        # Stable, so particles born together keep their emission order
+        order = np.argsort(self.birth_time, kind="stable")
+        for name in names:
+            setattr(self, name, getattr(self, name)[order])
+        self.count: int = len(self.birth_time)
+        self.max_lifespan: float = float(self.lifespan.max()) if self.count else 0.0
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def record_spawns(effect_ir: EffectIR, duration: float, dt: float = 1.0 / 60.0,
+                  pool: Optional[ParticlePool] = None,
+                  curve_tolerance: float = DEFAULT_CURVE_TOLERANCE, loop_duration: Optional[float] = None,
+                  loop_start: float = 0.0):
+    """Run only the emission of every emitter over [0, duration) in steps of `dt`.
+
+    Births, random attributes and emission debt match EffectSimulator stepped
+    with the same `dt`; nothing is integrated, so the cost is proportional to
+    the number of particles emitted. Returns (SpawnRecords, systems), the
+    systems holding each emitter's lifetime curves as of the last emission.
+
+    With a `loop_duration`, timelines repeat: parameters are sampled at
+    `(t - loop_start) % loop_duration`, while birth times stay absolute.
+    """
+    if dt <= 0:
+        raise ValueError("dt must be positive")
+    if pool is None:
+        pool = ParticlePool()
+    systems = [ParticleSystem(effect_ir=effect_ir, emitter_id=emitter.emitter_id, max_particles=1 << 30,
+                              curve_tolerance=curve_tolerance, pool=pool, emitter_index=index)
+               for index, emitter in enumerate(effect_ir.emitters)]
+    chunks = []
+    steps = int(np.ceil(duration / dt - 1e-9))
+    for step in range(steps):
+        current_time = step * dt
+        parameter_time = current_time
+        if loop_duration:
+            # The small bias keeps loop starts that land a rounding error short of a cycle in the next one
+            cycles = np.floor((current_time - loop_start) / loop_duration + 1e-9)
+            parameter_time = max(0.0, current_time - loop_start - cycles * loop_duration)
+        pool.clear()
+        for system in systems:
+            # Without advancing, the time only picks the parameters
+            rows = system.emit_step(dt, parameter_time, advance=False)
+            count = rows.stop - rows.start
+            if count <= 0:
+                continue
+            # Same birth schedule as ParticleSystem.emit_batch
+            chunk = {"birth_time": current_time + dt * np.arange(count) / count}
+            for name in SPAWN_COLUMNS:
+                chunk[name] = getattr(pool, name)[rows].copy()
+            chunks.append(chunk)
+    pool.clear()
+    return SpawnRecords(chunks, pool.sprite_ids), systems
+
+
+def particle_motion(records: SpawnRecords, index: np.ndarray, age: np.ndarray, wrap_rotation: bool = True):
+    """(position, velocity, rotation) of the particles records[index] at the given ages.
+
+    `index` may repeat a particle to sample it at several ages at once.
+    Rotation is in degrees; spin is wrapped to [0, 360) unless
+    `wrap_rotation` is False, and velocity headings are in (-180, 180].
+    """
+    age_column = age[:, None]
+    acceleration = records.acceleration[index]
+    velocity = records.velocity[index] + acceleration * age_column
+    position = records.position[index] + records.velocity[index] * age_column + 0.5 * acceleration * age_column ** 2
+    rotation = records.rotation[index] + records.angular_velocity[index] * age
+    if wrap_rotation:
+        np.mod(rotation, 360.0, out=rotation)
+
+    # Orient to velocity where flagged and the velocity is non-zero
+    orient = records.orient_to_velocity[index] & np.any(velocity != 0.0, axis=1)
+    if orient.any():
+        rotation[orient] = np.degrees(np.arctan2(velocity[orient, 1], velocity[orient, 0]))
+    return position, velocity, rotation
+
+
+class AnalyticSimulator:
+    """Evaluates an effect at any time directly from its spawn records.
+
+    Particles move with constant acceleration and angular velocity, so the
+    state at age `a` has a closed form:
+
+        velocity = v0 + acc * a
+        position = p0 + v0 * a + acc * a**2 / 2
+        rotation = r0 + angular_velocity * a   (or the velocity heading)
+
+    and lifetime curves only depend on a / lifespan. evaluate(t) therefore
+    costs O(particles alive at t), wherever t is. The stepping simulators use
+    semi-implicit Euler, which differs from this exact motion by
+    acc * dt * a / 2 in position. Spawns are not limited by max_particles.
+    """
+
+    def __init__(self, effect_ir: EffectIR, duration: Optional[float] = None, dt: float = 1.0 / 60.0,
+                 curve_tolerance: float = DEFAULT_CURVE_TOLERANCE):
+        self.effect_ir: EffectIR = effect_ir
+        self.duration: float = float(effect_ir.loop_duration if duration is None else duration)
+        self.dt: float = dt
+        # Shared with record_spawns so sprite indices resolve against the same table
+        self.pool: ParticlePool = ParticlePool()
+        self.records, systems = record_spawns(effect_ir, self.duration, dt, pool=self.pool,
+                                              curve_tolerance=curve_tolerance)
+        self.emitter_ids: List[str] = [system.emitter_id for system in systems]
+        self._blending_modes = [getattr(system.emitter_properties, "blending_mode", "alpha") for system in systems]
+        self.curve_banks: LifetimeCurveBanks = LifetimeCurveBanks()
+        self.curve_banks.update([system.lifetime_curves for system in systems])
+        self.time: float = 0.0
+
+    def alive_indices(self, time: float) -> np.ndarray:
+        """Indices into the records of particles alive at `time` (born at or before it)."""
+        records = self.records
+        lo = np.searchsorted(records.birth_time, time - records.max_lifespan, side="left")
+        hi = np.searchsorted(records.birth_time, time, side="right")
+        age = time - records.birth_time[lo:hi]
+        return lo + np.flatnonzero(age < records.lifespan[lo:hi])
+
+    def evaluate(self, time: float) -> ParticlePool:
+        """Fill and return self.pool with the state of every particle alive at `time`."""
+        records = self.records
+        index = self.alive_indices(time)
+        age = time - records.birth_time[index]
+        position, velocity, rotation = particle_motion(records, index, age)
+        acceleration = records.acceleration[index]
+
+        pool = self.pool
+        pool.clear()
+        pool.spawn(
+            len(index),
+            particle_id=records.particle_id[index],
+            emitter_index=records.emitter_index[index],
+            position=position,
+            velocity=velocity,
+            acceleration=acceleration,
+            age=age,
+            lifespan=records.lifespan[index],
+            rotation=rotation,
+            angular_velocity=records.angular_velocity[index],
+            initial_size=records.initial_size[index],
+            size=records.initial_size[index],
+            initial_color=records.initial_color[index],
+            sprite_index=records.sprite_index[index],
+            orient_to_velocity=records.orient_to_velocity[index],
+        )
+        self.curve_banks.apply(pool)
+        self.time = time
+        return pool
+
+    def emitter_views(self) -> List[EmitterParticles]:
+        """Per-emitter views of the last evaluate() result, in EffectIR order."""
+        return [EmitterParticles(self.emitter_ids[index], index, self._blending_modes[index], self.pool, rows)
+                for index, rows in enumerate(group_emitter_rows(self.pool, len(self.emitter_ids)))]
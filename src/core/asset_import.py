@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .ir import EffectIR, SpriteAsset
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from ir import EffectIR, SpriteAsset
+
+# Bump when preprocessing changes, so stale cache entries are not reused
+ASSET_CACHE_VERSION = 1
+DEFAULT_ASSET_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sparcle", "assets")
+_HASH_CHUNK = 1 << 20
+
+
+def load_rgba(path: str) -> np.ndarray:
+    """Decode an image file into a (height, width, 4) uint8 array, top row first.
+
+    Uses Kivy's image loaders, which decode without creating a GL texture,
+    so this works without a window.
+    """
+    from kivy.core.image import ImageLoader
+    image = ImageLoader.load(path, keep_data=True)
+    if image is None:
+        raise IOError(f"Could not load image '{path}'")
+    data = image._data[0] # ImageData; Kivy has no public accessor for the decoded pixels
+    channels = {"rgba": 4, "bgra": 4, "rgb": 3, "bgr": 3}.get(data.fmt)
+    if channels is None:
+        raise ValueError(f"Unsupported pixel format '{data.fmt}' in '{path}'")
+    rowlength = data.rowlength or data.width * channels
+    rows = np.frombuffer(data.data, dtype=np.uint8)[:rowlength * data.height].reshape(data.height, rowlength)
+    pixels = rows[:, :data.width * channels].reshape(data.height, data.width, channels)
+    if data.fmt.startswith("bgr"):
+        pixels = pixels[..., [2, 1, 0] + ([3] if channels == 4 else [])]
+    if channels == 3:
+        pixels = np.concatenate([pixels, np.full(pixels.shape[:2] + (1,), 255, dtype=np.uint8)], axis=2)
+    return np.ascontiguousarray(pixels)
+
+
+def premultiply(pixels: np.ndarray) -> np.ndarray:
+    """(h, w, 4) uint8 straight-alpha pixels with RGB multiplied by alpha, rounded.
+
+    Fully transparent texels become (0, 0, 0, 0) whatever color they held,
+    so they cannot leak into blending or filtering.
+    """
+    pixels = np.asarray(pixels, dtype=np.uint8)
+    result = np.empty_like(pixels)
+    alpha = pixels[..., 3:4].astype(np.uint32)
+    result[..., :3] = (pixels[..., :3] * alpha + 127) // 255
+    result[..., 3:] = pixels[..., 3:]
+    return result
+
+
+def trim_bounds(pixels: np.ndarray) -> Tuple[int, int, int, int]:
+    """(x, y, width, height) of the smallest box holding every non-transparent texel."""
+    opaque = pixels[..., 3] > 0
+    rows, columns = np.flatnonzero(opaque.any(axis=1)), np.flatnonzero(opaque.any(axis=0))
+    if rows.size == 0:
+        return 0, 0, 0, 0
+    return int(columns[0]), int(rows[0]), int(columns[-1] - columns[0] + 1), int(rows[-1] - rows[0] + 1)
+
+
+def file_digest(path: str) -> str:
+    """Content hash of a file, salted with ASSET_CACHE_VERSION."""
+    digest = hashlib.sha256(b"sparcle-asset-v%d" % ASSET_CACHE_VERSION)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class ImportedAsset:
+    """A SpriteAsset in render format: premultiplied RGBA, trimmed to its visible texels.
+
+    `pixels` (top row first) is memory-mapped from the cache when it came
+    from an AssetImporter. Regions are given in source image coordinates.
+    """
+    asset_id: str
+    digest: str
+    pixels: np.ndarray
+    offset: Tuple[int, int] # (x, y) of pixels[0, 0] in the source image
+    source_size: Tuple[int, int] # (width, height) of the source image
+
+    @classmethod
+    def from_pixels(cls, asset_id: str, pixels: np.ndarray, digest: str = "") -> "ImportedAsset":
+        """Preprocess decoded straight-alpha pixels ((h, w, 4) uint8, top row first)."""
+        pixels = premultiply(pixels)
+        x, y, width, height = trim_bounds(pixels)
+        return cls(asset_id, digest, np.ascontiguousarray(pixels[y:y + height, x:x + width]), (x, y),
+                   (pixels.shape[1], pixels.shape[0]))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.pixels.nbytes)
+
+    def crop(self, region: Tuple[int, int, int, int]) -> np.ndarray:
+        """(h, w, 4) pixels of a source region; a view unless the region reaches trimmed texels."""
+        x, y, width, height = region
+        x0, y0 = x - self.offset[0], y - self.offset[1]
+        stored_height, stored_width = self.pixels.shape[:2]
+        if x0 >= 0 and y0 >= 0 and x0 + width <= stored_width and y0 + height <= stored_height:
+            return self.pixels[y0:y0 + height, x0:x0 + width]
+        result = np.zeros((max(0, height), max(0, width), 4), dtype=np.uint8)
+        left, top = max(x0, 0), max(y0, 0)
+        right, bottom = min(x0 + width, stored_width), min(y0 + height, stored_height)
+        if right > left and bottom > top:
+            result[top - y0:bottom - y0, left - x0:right - x0] = self.pixels[top:bottom, left:right]
+        return result
+
+    def full_pixels(self) -> np.ndarray:
+        """The whole source image, trimmed margins filled with transparent texels."""
+        width, height = self.source_size
+        return self.crop((0, 0, width, height))
+
+
+@dataclass
+class AssetImportStats:
+    hits: int = 0 # Assets served from the cache without decoding
+    imports: int = 0 # Assets decoded and preprocessed
+    failures: int = 0
+
+
+class AssetImporter:
+    """Imports SpriteAsset files once and serves them from an on-disk cache.
+
+    Each file is hashed; the preprocessed pixels (see ImportedAsset) are
+    stored under that hash as a .npy file with a small JSON sidecar, and are
+    memory-mapped on later loads. An unchanged file therefore costs a hash
+    and an mmap instead of a decode; an edited file gets a new hash and is
+    imported again. Entries are shared by identical files.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_ASSET_CACHE_DIR,
+                 decode: Callable[[str], np.ndarray] = load_rgba):
+        self.cache_dir: str = cache_dir
+        self.decode = decode
+        self.stats: AssetImportStats = AssetImportStats()
+        # path -> ((mtime_ns, size), digest), so a file is hashed once per change
+        self._digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+    def digest(self, path: str) -> str:
+        info = os.stat(path)
+        stamp = (info.st_mtime_ns, info.st_size)
+        known = self._digests.get(path)
+        if known is None or known[0] != stamp:
+            known = self._digests[path] = (stamp, file_digest(path))
+        return known[1]
+
+    def _entry_paths(self, digest: str) -> Tuple[str, str]:
+        base = os.path.join(self.cache_dir, digest)
+        return base + ".npy", base + ".json"
+
+    def load(self, asset: SpriteAsset) -> ImportedAsset:
+        """The asset in render format, importing it first if needed; raises on unreadable files."""
+        digest = self.digest(asset.path)
+        pixels_path, meta_path = self._entry_paths(digest)
+        cached = self._load_cached(asset.asset_id, digest, pixels_path, meta_path)
+        if cached is not None:
+            self.stats.hits += 1
+            return cached
+        try:
+            imported = ImportedAsset.from_pixels(asset.asset_id, self.decode(asset.path), digest)
+        except Exception:
+            self.stats.failures += 1
+            raise
+        self.stats.imports += 1
+        try:
+            self._store(imported, pixels_path, meta_path)
+        except OSError as e:
+            print(f"Warning: Could not cache imported asset '{asset.path}': {e}")
+        return imported
+
+    def import_all(self, effect_ir: EffectIR) -> Dict[str, ImportedAsset]:
+        """Import every SpriteAsset of an effect; assets that fail are reported and left out."""
+        imported = {}
+        for asset in effect_ir.sprite_assets:
+            try:
+                imported[asset.asset_id] = self.load(asset)
+            except Exception as e:
+                print(f"Warning: Could not import sprite asset '{asset.path}': {e}")
+        return imported
+
+    def _load_cached(self, asset_id: str, digest: str, pixels_path: str, meta_path: str) -> Optional[ImportedAsset]:
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            pixels = np.load(pixels_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None # Missing or damaged entry: import again
+        if meta.get("version") != ASSET_CACHE_VERSION or pixels.dtype != np.uint8 or pixels.ndim != 3:
+            return None
+        return ImportedAsset(asset_id, digest, pixels, tuple(meta["offset"]), tuple(meta["source_size"]))
+
+    def _store(self, imported: ImportedAsset, pixels_path: str, meta_path: str):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Written under temporary names and renamed, so readers never see a partial entry
+        temporary = f"{pixels_path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            np.save(f, imported.pixels)
+        os.replace(temporary, pixels_path)
+        temporary = f"{meta_path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"version": ASSET_CACHE_VERSION, "offset": list(imported.offset),
+                       "source_size": list(imported.source_size)}, f)
+        os.replace(temporary, meta_path)
@@ -0,0 +1,361 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .asset_import import AssetImporter, ImportedAsset, load_rgba, trim_bounds
+    from .ir import EffectIR, SpriteAsset, SpriteDefinition
+    from .rasterizer import encode_png
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from asset_import import AssetImporter, ImportedAsset, load_rgba, trim_bounds
+    from ir import EffectIR, SpriteAsset, SpriteDefinition
+    from rasterizer import encode_png
+
+MAX_ATLAS_PAGES = 2
+DEFAULT_MAX_PAGE_SIZE = 2048
+DEFAULT_ATLAS_PADDING = 2
+MIN_PAGE_SIZE = 16
+# Free-rectangle choice (MaxRects): best short side, best long side, best area, bottom-left
+PACKING_HEURISTICS = ("short_side", "long_side", "area", "bottom_left")
+# Orders in which rectangles are inserted, each largest first
+SORT_ORDERS = ("area", "max_side", "height", "width", "perimeter")
+
+Rect = Tuple[int, int, int, int] # (x, y, width, height), top-left origin
+
+
+class MaxRectsBin:
+    """One page packed with the MaxRects algorithm (Jylänki, "A Thousand Ways to Pack the Bin").
+
+    The bin keeps every maximal free rectangle; a rectangle goes into the
+    free one the heuristic scores best, and every free rectangle it overlaps
+    is split into the maximal rectangles around it.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width: int = width
+        self.height: int = height
+        self.free: List[Rect] = [(0, 0, width, height)]
+
+    def insert(self, width: int, height: int, heuristic: str) -> Optional[Tuple[int, int]]:
+        best, best_score = None, None
+        for fx, fy, fw, fh in self.free:
+            if width > fw or height > fh:
+                continue
+            leftover_x, leftover_y = fw - width, fh - height
+            if heuristic == "short_side":
+                score = (min(leftover_x, leftover_y), max(leftover_x, leftover_y))
+            elif heuristic == "long_side":
+                score = (max(leftover_x, leftover_y), min(leftover_x, leftover_y))
+            elif heuristic == "area":
+                score = (fw * fh - width * height, min(leftover_x, leftover_y))
+            else:
+                score = (fy + height, fx)
+            if best_score is None or score < best_score:
+                best, best_score = (fx, fy), score
+        if best is not None:
+            self._place((best[0], best[1], width, height))
+        return best
+
+    def _place(self, used: Rect):
+        ux, uy, uw, uh = used
+        free = []
+        for rect in self.free:
+            fx, fy, fw, fh = rect
+            if ux >= fx + fw or ux + uw <= fx or uy >= fy + fh or uy + uh <= fy:
+                free.append(rect)
+                continue
+            if ux > fx:
+                free.append((fx, fy, ux - fx, fh))
+            if ux + uw < fx + fw:
+                free.append((ux + uw, fy, fx + fw - ux - uw, fh))
+            if uy > fy:
+                free.append((fx, fy, fw, uy - fy))
+            if uy + uh < fy + fh:
+                free.append((fx, uy + uh, fw, fy + fh - uy - uh))
+        # Drop free rectangles contained in another
+        free = list(dict.fromkeys(free))
+        self.free = [a for a in free if not any(
+            a is not b and b[0] <= a[0] and b[1] <= a[1] and a[0] + a[2] <= b[0] + b[2] and a[1] + a[3] <= b[1] + b[3]
+            for b in free)]
+
+
+def _insertion_order(sizes: Sequence[Tuple[int, int]], sort_order: str) -> List[int]:
+    def key(index):
+        w, h = sizes[index]
+        primary = {"area": w * h, "max_side": max(w, h), "height": h, "width": w, "perimeter": w + h}[sort_order]
+        return (-primary, -max(w, h), index)
+    return sorted(range(len(sizes)), key=key)
+
+
+def _page_sizes(max_size: int) -> List[Tuple[int, int]]:
+    """Power-of-two page sizes up to max_size, smallest area first, squarer first."""
+    sides = []
+    side = MIN_PAGE_SIZE
+    while side <= max_size:
+        sides.append(side)
+        side *= 2
+    return sorted(((w, h) for w in sides for h in sides), key=lambda s: (s[0] * s[1], abs(s[0] - s[1]), -s[0]))
+
+
+def _fit_page(width: int, height: int) -> Tuple[int, int]:
+    """Smallest power-of-two page holding (width, height)."""
+    fit = [MIN_PAGE_SIZE, MIN_PAGE_SIZE]
+    for axis, extent in enumerate((width, height)):
+        while fit[axis] < extent:
+            fit[axis] *= 2
+    return fit[0], fit[1]
+
+
+def pack_rectangles(sizes: Sequence[Tuple[int, int]], heuristic: str, sort_order: str,
+                    page_size: Tuple[int, int], max_pages: int,
+                    padding: int = 0) -> Optional[Tuple[List[Tuple[int, int]], List[Tuple[int, int, int]]]]:
+    """Pack (width, height) rectangles into at most `max_pages` pages of `page_size`.
+
+    Returns (page sizes, (page, x, y) per rectangle), pages shrunk to the
+    smallest power of two holding their rectangles, or None if they do not
+    fit. Rectangles keep `padding` pixels between each other.
+    """
+    width, height = page_size
+    remaining = _insertion_order(sizes, sort_order)
+    placements: List[Optional[Tuple[int, int, int]]] = [None] * len(sizes)
+    pages = []
+    while remaining and len(pages) < max_pages:
+        # Padding is added to the right and bottom of every rectangle, and the
+        # page is grown by as much, so it is only ever kept between rectangles
+        page = MaxRectsBin(width + padding, height + padding)
+        extent = [0, 0]
+        left_over = []
+        for index in remaining:
+            w, h = sizes[index]
+            at = page.insert(w + padding, h + padding, heuristic)
+            if at is None:
+                left_over.append(index)
+                continue
+            placements[index] = (len(pages), at[0], at[1])
+            extent = [max(extent[0], at[0] + w), max(extent[1], at[1] + h)]
+        if len(left_over) == len(remaining):
+            return None # Something does not fit on an empty page
+        pages.append(_fit_page(*extent))
+        remaining = left_over
+    if remaining:
+        return None
+    return pages, placements
+
+
+def _pack_job(job: Tuple[List[Tuple[int, int]], str, str, int, int, int]):
+    """Smallest packing of one heuristic and sort order: (total page area, page count, pages, placements).
+
+    Each page count up to the limit gets its smallest fitting page size;
+    fewer pages win ties in area.
+    """
+    sizes, heuristic, sort_order, padding, max_page_size, max_pages = job
+    total_area = sum((w + padding) * (h + padding) for w, h in sizes)
+    best = None
+    for page_count in range(1, max_pages + 1):
+        for page_size in _page_sizes(max_page_size):
+            if page_size[0] * page_size[1] * page_count < total_area:
+                continue
+            packed = pack_rectangles(sizes, heuristic, sort_order, page_size, page_count, padding)
+            if packed is not None:
+                pages, placements = packed
+                result = (sum(w * h for w, h in pages), len(pages), pages, placements)
+                if best is None or result[:2] < best[:2]:
+                    best = result
+                break
+    return best
+
+
+@dataclass
+class PackedRegion:
+    """Where a sprite definition ended up, in the Spine atlas' terms."""
+    definition_id: str
+    page: int
+    region: Rect # In the page, top-left origin
+    offset: Tuple[int, int] # Trimmed margins on the left and at the bottom
+    original_size: Tuple[int, int] # Size of the untrimmed region
+
+    @property
+    def trimmed(self) -> bool:
+        return self.region[2:] != self.original_size
+
+
+@dataclass
+class AtlasPage:
+    asset: SpriteAsset
+    pixels: np.ndarray # (height, width, 4) premultiplied, top row first
+
+
+@dataclass
+class PackedAtlas:
+    """Atlas pages plus the sprite definitions remapped onto them.
+
+    A remapped definition names its page's asset and its trimmed region
+    there, its pivot moved so it stays on the same source texel. `regions`
+    keep the untrimmed size and trim offsets, which exporters need to draw
+    a trimmed region at its original size.
+    """
+    pages: List[AtlasPage] = field(default_factory=list)
+    definitions: Dict[str, SpriteDefinition] = field(default_factory=dict)
+    regions: Dict[str, PackedRegion] = field(default_factory=dict)
+    heuristic: str = ""
+    sort_order: str = ""
+    duplicates: int = 0 # Definitions sharing another's pixels
+
+    @property
+    def area(self) -> int:
+        return sum(page.asset.width * page.asset.height for page in self.pages)
+
+    def png_bytes(self) -> List[bytes]:
+        return [encode_png(page.pixels) for page in self.pages]
+
+    def atlas_text(self) -> str:
+        """The atlas in Spine's text format (premultiplied alpha)."""
+        lines = []
+        for index, page in enumerate(self.pages):
+            lines += [os.path.basename(page.asset.path), f"size: {page.asset.width},{page.asset.height}",
+                      "filter: Linear,Linear", "pma: true"]
+            for region in self.regions.values():
+                if region.page != index:
+                    continue
+                x, y, w, h = region.region
+                lines += [region.definition_id, f"bounds: {x},{y},{w},{h}"]
+                if region.trimmed:
+                    lines.append(f"offsets: {region.offset[0]},{region.offset[1]},"
+                                 f"{region.original_size[0]},{region.original_size[1]}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def save(self, directory: str, name: str = "atlas") -> List[str]:
+        """Write the pages as PNGs and `<name>.atlas`; returns the paths written."""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for page, data in zip(self.pages, self.png_bytes()):
+            path = os.path.join(directory, os.path.basename(page.asset.path))
+            with open(path, "wb") as f:
+                f.write(data)
+            paths.append(path)
+        path = os.path.join(directory, f"{name}.atlas")
+        with open(path, "w") as f:
+            f.write(self.atlas_text())
+        return paths + [path]
+
+
+class AtlasPacker:
+    """Packs an effect's SpriteDefinitions into at most `max_pages` atlas pages.
+
+    Sprites are cut from their (premultiplied) assets, trimmed to their
+    visible texels and deduplicated by a hash of the trimmed pixels, so
+    repeated frames are stored once. Every combination of PACKING_HEURISTICS
+    and SORT_ORDERS is tried, each in a worker process when `workers`
+    (default: one per CPU) is more than one, each finding the smallest
+    power-of-two page size it fits in; the packing with the least total page
+    area wins. `extra_sprites` adds named (h, w, 4) premultiplied images,
+    e.g. the default particle disc.
+    """
+
+    def __init__(self, effect_ir: EffectIR, importer: Optional[AssetImporter] = None,
+                 image_loader: Callable[[str], np.ndarray] = load_rgba,
+                 padding: int = DEFAULT_ATLAS_PADDING, max_page_size: int = DEFAULT_MAX_PAGE_SIZE,
+                 max_pages: int = MAX_ATLAS_PAGES, workers: Optional[int] = None, name: str = "atlas",
+                 extra_sprites: Optional[Dict[str, np.ndarray]] = None):
+        self.effect_ir: EffectIR = effect_ir
+        self.importer: Optional[AssetImporter] = importer
+        self.image_loader = image_loader
+        self.padding: int = padding
+        self.max_page_size: int = max_page_size
+        self.max_pages: int = max_pages
+        self.workers: Optional[int] = workers
+        self.name: str = name
+        self.extra_sprites: Dict[str, np.ndarray] = dict(extra_sprites or {})
+
+    def _load_assets(self) -> Dict[str, ImportedAsset]:
+        if self.importer:
+            return self.importer.import_all(self.effect_ir)
+        images = {}
+        for asset in self.effect_ir.sprite_assets:
+            try:
+                images[asset.asset_id] = ImportedAsset.from_pixels(asset.asset_id, self.image_loader(asset.path))
+            except Exception as e:
+                print(f"Warning: Could not load sprite asset '{asset.path}': {e}")
+        return images
+
+    def _sprites(self) -> List[Tuple[str, np.ndarray, Tuple[float, float]]]:
+        """(definition id, premultiplied region pixels, pivot) of every sprite to pack."""
+        images = self._load_assets()
+        sprites = []
+        for definition in self.effect_ir.sprite_definitions.values():
+            image = images.get(definition.asset_id)
+            if image is None:
+                print(f"Warning: Sprite '{definition.definition_id}' skipped: asset '{definition.asset_id}' unavailable")
+                continue
+            sprites.append((definition.definition_id, image.crop(definition.region), definition.pivot))
+        sprites += [(sprite_id, pixels, (0.5, 0.5)) for sprite_id, pixels in self.extra_sprites.items()]
+        return sprites
+
+    def pack(self) -> PackedAtlas:
+        """Pack every sprite; raises ValueError if they cannot fit in max_pages pages."""
+        sprites = self._sprites()
+        unique: Dict[bytes, int] = {} # Pixel hash -> index into images
+        images: List[np.ndarray] = []
+        sources = [] # Per sprite: (image index, trimmed box, original size)
+        for _sprite_id, pixels, _pivot in sprites:
+            x, y, w, h = trim_bounds(pixels)
+            if w == 0 or h == 0:
+                x, y, w, h = 0, 0, 1, 1 # Fully transparent: keep one texel
+                trimmed = np.zeros((1, 1, 4), dtype=np.uint8)
+            else:
+                trimmed = np.ascontiguousarray(pixels[y:y + h, x:x + w])
+            digest = hashlib.sha256(np.array(trimmed.shape, dtype=np.int64).tobytes() + trimmed.tobytes()).digest()
+            if digest not in unique:
+                unique[digest] = len(images)
+                images.append(trimmed)
+            sources.append((unique[digest], (x, y, w, h), (pixels.shape[1], pixels.shape[0])))
+
+        sizes = [(image.shape[1], image.shape[0]) for image in images]
+        best = self._best_packing(sizes) if sizes else (0, 0, [], [], "", "")
+        if best is None:
+            raise ValueError(f"Sprites do not fit in {self.max_pages} pages of {self.max_page_size} pixels")
+        _area, _count, page_sizes, placements, heuristic, sort_order = best
+
+        atlas = PackedAtlas(heuristic=heuristic, sort_order=sort_order, duplicates=len(sprites) - len(images))
+        for index, (width, height) in enumerate(page_sizes):
+            asset = SpriteAsset(asset_id=f"{self.name}_{index}", path=f"{self.name}_{index}.png",
+                                width=width, height=height)
+            atlas.pages.append(AtlasPage(asset, np.zeros((height, width, 4), dtype=np.uint8)))
+        for image, (page, x, y) in zip(images, placements):
+            atlas.pages[page].pixels[y:y + image.shape[0], x:x + image.shape[1]] = image
+        for (sprite_id, _pixels, pivot), (image_index, trim, original) in zip(sprites, sources):
+            page, x, y = placements[image_index]
+            tx, ty, w, h = trim
+            bottom = original[1] - ty - h
+            # The pivot (normalized, from the bottom-left) stays on the same source texel
+            new_pivot = ((pivot[0] * original[0] - tx) / w, (pivot[1] * original[1] - bottom) / h)
+            atlas.definitions[sprite_id] = SpriteDefinition(
+                definition_id=sprite_id, asset_id=atlas.pages[page].asset.asset_id, region=(x, y, w, h),
+                pivot=new_pivot, name=getattr(self.effect_ir.get_sprite_definition(sprite_id), "name", None))
+            atlas.regions[sprite_id] = PackedRegion(sprite_id, page, (x, y, w, h), (tx, bottom), original)
+        return atlas
+
+    def _best_packing(self, sizes: List[Tuple[int, int]]):
+        combinations = [(heuristic, sort_order) for heuristic in PACKING_HEURISTICS for sort_order in SORT_ORDERS]
+        jobs = [(sizes, heuristic, sort_order, self.padding, self.max_page_size, self.max_pages)
+                for heuristic, sort_order in combinations]
+        workers = self.workers if self.workers is not None else (os.cpu_count() or 1)
+        results = None
+        if min(workers, len(jobs)) > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+                    results = list(executor.map(_pack_job, jobs))
+            except (OSError, NotImplementedError, BrokenProcessPool) as e:
+                print(f"Warning: Could not pack in worker processes ({e}); packing in this process")
+        if results is None:
+            results = [_pack_job(job) for job in jobs]
+        # Least page area, then fewest pages; ties keep the earlier combination
+        candidates = [result + combination for result, combination in zip(results, combinations) if result]
+        return min(candidates, key=lambda c: (c[0], c[1])) if candidates else None
@@ -0,0 +1,107 @@
+import math
+from bisect import bisect_right, insort
+from typing import Dict, List
+
+try:
+    from .simulator import EffectSimulator, SimulationSnapshot
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from simulator import EffectSimulator, SimulationSnapshot
+
+DEFAULT_CHECKPOINT_INTERVAL = 0.25 # Seconds of simulation between snapshots
+DEFAULT_CHECKPOINT_MEMORY = 64 * 1024 * 1024 # Bytes
+
+
+class CheckpointTimeline:
+    """Random-access scrubbing over an EffectSimulator.
+
+    The simulation advances in fixed steps of `dt` from t=0 and a snapshot is
+    kept every `interval` seconds of simulated time as the simulation passes
+    it. seek(t) restores the nearest snapshot at or before t (or keeps the
+    current state if that is closer) and steps forward only the remainder, so
+    a seek costs at most `interval / dt` steps once the timeline has been
+    covered, however long the loop is.
+
+    When snapshots exceed `memory_limit` bytes, the one whose removal leaves
+    the smallest gap is evicted; the empty snapshot at t=0 is always kept.
+    Editing the effect invalidates every snapshot (see invalidate()).
+    """
+
+    def __init__(self, simulator: EffectSimulator, dt: float = 1.0 / 60.0,
+                 interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+                 memory_limit: int = DEFAULT_CHECKPOINT_MEMORY):
+        if dt <= 0:
+            raise ValueError("dt must be positive")
+        self.simulator: EffectSimulator = simulator
+        self.dt: float = dt
+        self.interval_steps: int = max(1, int(round(interval / dt)))
+        self.memory_limit: int = memory_limit
+        self.memory_used: int = 0
+        self.current_step: int = 0 # Steps from t=0 that produced the simulator's state
+        self.last_seek_steps: int = 0 # Steps simulated by the most recent seek
+        self._checkpoints: Dict[int, SimulationSnapshot] = {}
+        self._checkpoint_steps: List[int] = []
+        self.invalidate()
+
+    @property
+    def current_time(self) -> float:
+        return self.current_step * self.dt
+
+    @property
+    def checkpoint_times(self) -> List[float]:
+        return [step * self.dt for step in self._checkpoint_steps]
+
+    def invalidate(self):
+        """Drop all snapshots and rewind; call after editing parameters or curves."""
+        self._checkpoints.clear()
+        self._checkpoint_steps.clear()
+        self.memory_used = 0
+        self.simulator.reset()
+        self._revision = self.simulator.effect_ir.revision
+        self.current_step = 0
+        self._store(0)
+
+    def seek(self, time: float) -> EffectSimulator:
+        """Bring the simulator to the state at `time` (rounded down to a whole step)."""
+        if self.simulator.effect_ir.revision != self._revision:
+            self.invalidate()
+        target = max(0, int(math.floor(time / self.dt + 1e-6)))
+        nearest = self._checkpoint_steps[bisect_right(self._checkpoint_steps, target) - 1]
+        if not (nearest <= self.current_step <= target):
+            self.simulator.restore(self._checkpoints[nearest])
+            self.current_step = nearest
+        self.last_seek_steps = target - self.current_step
+        self._advance_to(target)
+        return self.simulator
+
+    def step(self) -> EffectSimulator:
+        """Advance one step from the current state, e.g. for playback."""
+        return self.seek((self.current_step + 1) * self.dt)
+
+    def _advance_to(self, target: int):
+        simulator = self.simulator
+        while self.current_step < target:
+            simulator.step(self.dt, self.current_step * self.dt)
+            self.current_step += 1
+            if self.current_step % self.interval_steps == 0 and self.current_step not in self._checkpoints:
+                self._store(self.current_step)
+
+    def _store(self, step: int):
+        snapshot = self.simulator.snapshot()
+        self._checkpoints[step] = snapshot
+        insort(self._checkpoint_steps, step)
+        self.memory_used += snapshot.nbytes
+        while self.memory_used > self.memory_limit and len(self._checkpoint_steps) > 1:
+            self._evict()
+
+    def _evict(self):
+        steps = self._checkpoint_steps
+        best_index, best_gap = 1, math.inf
+        for i in range(1, len(steps)):
+            # Gap left behind if steps[i] were dropped; the last one counts its own gap twice
+            following = steps[i + 1] if i + 1 < len(steps) else 2 * steps[i] - steps[i - 1]
+            gap = following - steps[i - 1]
+            if gap < best_gap:
+                best_index, best_gap = i, gap
+        step = steps.pop(best_index)
+        self.memory_used -= self._checkpoints.pop(step).nbytes
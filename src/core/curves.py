@@ -0,0 +1,291 @@
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Maximum absolute difference allowed between a lookup table and the exact
+# piecewise-linear curve it was compiled from (in curve value units).
+DEFAULT_CURVE_TOLERANCE = 1e-3
+MIN_LUT_RESOLUTION = 16
+MAX_LUT_RESOLUTION = 4096
+
+
+class CurveWorkspace:
+    """Reusable scratch buffers so CurveLUT.sample allocates nothing per call."""
+
+    def __init__(self, capacity: int = 0):
+        self.capacity: int = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        self.capacity = capacity
+        self._position = np.empty(capacity, dtype=np.float64)
+        self._floor = np.empty(capacity, dtype=np.float64)
+        self._index = np.empty(capacity, dtype=np.intp)
+        self._lower = np.empty(capacity, dtype=np.float64)
+        self._step = np.empty(capacity, dtype=np.float64)
+
+    def buffers(self, n: int) -> Tuple[np.ndarray, ...]:
+        if n > self.capacity:
+            self._allocate(max(n, 2 * self.capacity))
+        return self._position[:n], self._floor[:n], self._index[:n], self._lower[:n], self._step[:n]
+
+
+class CurveLUT:
+    """Fixed-resolution lookup table for an "over lifetime" curve.
+
+    The table holds `resolution` evenly spaced samples over normalized age
+    [0, 1]; lookups linearly interpolate between neighbouring samples, so a
+    whole particle array is evaluated with a few vectorized operations.
+    """
+
+    def __init__(self, table: np.ndarray, max_error: float = 0.0):
+        self.table: np.ndarray = table  # Shape (resolution, channels)
+        self.resolution: int = table.shape[0]
+        self.channels: int = table.shape[1]
+        self.max_error: float = max_error
+        # Per-channel samples and forward differences, contiguous for np.take
+        self._rows = np.ascontiguousarray(table.T)
+        self._deltas = np.ascontiguousarray(np.diff(table, axis=0).T)
+
+    def sample(self, normalized_times: np.ndarray, out: Optional[np.ndarray] = None,
+               workspace: Optional[CurveWorkspace] = None) -> np.ndarray:
+        """Return an (n, channels) array of curve values at the given normalized ages.
+
+        Pass `out` (any (n, channels) view, e.g. a pool column) and a reusable
+        `workspace` to sample without allocating.
+        """
+        n = normalized_times.shape[0]
+        if out is None:
+            out = np.empty((n, self.channels), dtype=np.float64)
+        if workspace is None:
+            workspace = CurveWorkspace(n)
+        position, floor, index, lower, step = workspace.buffers(n)
+
+        np.clip(normalized_times, 0.0, 1.0, out=position)
+        position *= self.resolution - 1
+        np.floor(position, out=floor)
+        np.minimum(floor, self.resolution - 2, out=floor)
+        position -= floor # Fraction between neighbouring samples
+        index[...] = floor
+        for c in range(self.channels):
+            np.take(self._rows[c], index, out=lower, mode="clip") # mode='raise' would copy out
+            np.take(self._deltas[c], index, out=step, mode="clip")
+            step *= position
+            lower += step
+            out[:, c] = lower
+        return out
+
+    def sample_scalar(self, normalized_times: np.ndarray) -> np.ndarray:
+        return self.sample(normalized_times)[:, 0]
+
+
+def _curve_arrays(curve_points: Sequence[Tuple[float, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    # Sorted copy; the caller's list (usually stored in the IR) is left untouched
+    ordered = sorted(curve_points, key=lambda p: p[0])
+    times = np.array([p[0] for p in ordered], dtype=np.float64)
+    values = np.array([p[1] for p in ordered], dtype=np.float64).reshape(len(ordered), -1)
+    return times, values
+
+
+def _evaluate_exact(times: np.ndarray, values: np.ndarray, normalized_times: np.ndarray) -> np.ndarray:
+    # Piecewise-linear with hold before the first and after the last point
+    return np.stack([np.interp(normalized_times, times, values[:, c]) for c in range(values.shape[1])], axis=1)
+
+
+def compile_curve(curve_points: Sequence[Tuple[float, Any]],
+                  tolerance: float = DEFAULT_CURVE_TOLERANCE,
+                  max_resolution: int = MAX_LUT_RESOLUTION) -> CurveLUT:
+    """Compile (time_norm, value) points into a CurveLUT within `tolerance`.
+
+    Values may be scalars or tuples (e.g. RGBA). The resolution doubles until
+    the table reproduces the exact curve within `tolerance`; curves with hard
+    steps may never get there, in which case the table stops at
+    `max_resolution` and `max_error` reports the achieved accuracy.
+    """
+    if not curve_points:
+        raise ValueError("Cannot compile an empty curve.")
+    times, values = _curve_arrays(curve_points)
+    resolution = MIN_LUT_RESOLUTION
+    while True:
+        lut = _tabulate(times, values, resolution)
+        if lut.max_error <= tolerance or resolution >= max_resolution:
+            return lut
+        resolution = min(resolution * 2, max_resolution)
+
+
+def _tabulate(times: np.ndarray, values: np.ndarray, resolution: int) -> CurveLUT:
+    lut = CurveLUT(_evaluate_exact(times, values, np.linspace(0.0, 1.0, resolution)))
+    # Both the table and the curve are piecewise linear and agree on the grid,
+    # so their largest difference is found at the curve's own control points.
+    check_times = np.clip(times, 0.0, 1.0)
+    lut.max_error = float(np.max(np.abs(lut.sample(check_times) - _evaluate_exact(times, values, check_times))))
+    return lut
+
+
+def _bank_resolution(curves: Sequence["LifetimeCurves"], name: str) -> int:
+    """Smallest shared resolution keeping every emitter's `name` curve as accurate as its own table.
+
+    Grids of different resolutions are not nested, so a finer table than an
+    emitter compiled can still miss its tolerance; each curve is re-checked at
+    the shared resolution, which doubles until all pass.
+    """
+    compiled = [(c.source(name), getattr(c, name), c.tolerance) for c in curves if getattr(c, name)]
+    resolution = max([lut.resolution for _source, lut, _tolerance in compiled] + [MIN_LUT_RESOLUTION])
+    arrays = [(_curve_arrays(source), max(tolerance, lut.max_error)) for source, lut, tolerance in compiled]
+    while resolution < MAX_LUT_RESOLUTION and any(
+            _tabulate(times, values, resolution).max_error > target for (times, values), target in arrays):
+        resolution = min(resolution * 2, MAX_LUT_RESOLUTION)
+    return resolution
+
+
+class LifetimeCurves:
+    """Compiled size/opacity/color "over lifetime" curves for one emitter.
+
+    Tables are only recompiled when the source curve actually changes.
+    """
+
+    def __init__(self, tolerance: float = DEFAULT_CURVE_TOLERANCE):
+        self.tolerance: float = tolerance
+        self.size: Optional[CurveLUT] = None
+        self.opacity: Optional[CurveLUT] = None
+        self.color: Optional[CurveLUT] = None
+        self.version: int = 0 # Incremented whenever any table is recompiled
+        self._sources: dict = {"size": None, "opacity": None, "color": None}
+
+    def source(self, name: str) -> Optional[List[Tuple[float, Any]]]:
+        return self._sources[name]
+
+    def _compile_if_changed(self, name: str, curve: Optional[List[Tuple[float, Any]]]):
+        if not isinstance(curve, list) or not curve:
+            curve = None
+        if curve == self._sources[name]:
+            return
+        self._sources[name] = list(curve) if curve is not None else None
+        setattr(self, name, compile_curve(curve, self.tolerance) if curve is not None else None)
+        self.version += 1
+
+    def update(self, size_curve: Optional[List[Tuple[float, float]]],
+               opacity_curve: Optional[List[Tuple[float, float]]],
+               color_curve: Optional[List[Tuple[float, Tuple[float, float, float, float]]]]):
+        self._compile_if_changed("size", size_curve)
+        self._compile_if_changed("opacity", opacity_curve)
+        self._compile_if_changed("color", color_curve)
+
+
+class CurveBank:
+    """The same lifetime curve (e.g. size) of several emitters stacked into one table.
+
+    Particles from different emitters sharing one pool are sampled in a single
+    pass by offsetting each lookup with the particle's emitter index. Emitters
+    without a curve get a constant `default` row and `has_curve` False.
+    """
+
+    def __init__(self, curves: Sequence[Optional[Sequence[Tuple[float, Any]]]], channels: int,
+                 resolution: int, default: Any):
+        self.resolution: int = max(2, int(resolution))
+        self.channels: int = channels
+        grid = np.linspace(0.0, 1.0, self.resolution)
+        table = np.empty((len(curves), self.resolution, channels), dtype=np.float64)
+        table[...] = default
+        self.has_curve: np.ndarray = np.zeros(len(curves), dtype=np.bool_)
+        for e, curve in enumerate(curves):
+            if curve:
+                times, values = _curve_arrays(curve)
+                table[e] = _evaluate_exact(times, values, grid)
+                self.has_curve[e] = True
+        deltas = np.zeros_like(table)
+        deltas[:, :-1] = np.diff(table, axis=1)
+        # Per-channel flattened (emitter, sample) rows, contiguous for np.take
+        self._rows = np.ascontiguousarray(table.reshape(-1, channels).T)
+        self._deltas = np.ascontiguousarray(deltas.reshape(-1, channels).T)
+        self._offsets = np.arange(len(curves), dtype=np.float64) * self.resolution
+
+    def sample(self, normalized_times: np.ndarray, emitter_index: np.ndarray, out: np.ndarray,
+               workspace: CurveWorkspace) -> np.ndarray:
+        n = normalized_times.shape[0]
+        position, floor, index, lower, step = workspace.buffers(n)
+
+        np.clip(normalized_times, 0.0, 1.0, out=position)
+        position *= self.resolution - 1
+        np.floor(position, out=floor)
+        np.minimum(floor, self.resolution - 2, out=floor)
+        position -= floor
+        # Shift into the emitter's block of the flattened table
+        np.take(self._offsets, emitter_index, out=lower, mode="clip")
+        floor += lower
+        index[...] = floor
+        for c in range(self.channels):
+            np.take(self._rows[c], index, out=lower, mode="clip")
+            np.take(self._deltas[c], index, out=step, mode="clip")
+            step *= position
+            lower += step
+            out[:, c] = lower
+        return out
+
+
+class LifetimeCurveBanks:
+    """Size/opacity/color CurveBanks for a list of emitters, applied to a shared pool.
+
+    Banks are rebuilt only when an emitter's LifetimeCurves were recompiled
+    or the emitter list changed.
+    """
+
+    def __init__(self):
+        self.size: Optional[CurveBank] = None
+        self.opacity: Optional[CurveBank] = None
+        self.color: Optional[CurveBank] = None
+        self._versions: Optional[tuple] = None
+        self._workspace = CurveWorkspace()
+        self._scratch_color = np.empty((0, 4), dtype=np.float64)
+        self._mask = np.empty(0, dtype=np.bool_)
+
+    def update(self, curves: Sequence[LifetimeCurves]):
+        versions = tuple((id(c), c.version) for c in curves)
+        if versions == self._versions:
+            return
+        self._versions = versions
+
+        def bank(name: str, channels: int) -> Optional[CurveBank]:
+            sources = [c.source(name) for c in curves]
+            if not any(sources):
+                return None
+            return CurveBank(sources, channels, _bank_resolution(curves, name), 1.0)
+
+        self.size = bank("size", 1)
+        self.opacity = bank("opacity", 1)
+        self.color = bank("color", 4)
+
+    def apply(self, pool):
+        """Set size and color of every live row of `pool` (a ParticlePool) from its normalized age."""
+        n = pool.count
+        if n == 0:
+            return
+        if self._mask.shape[0] < n:
+            self._scratch_color = np.empty((pool.capacity, 4), dtype=np.float64)
+            self._mask = np.empty(pool.capacity, dtype=np.bool_)
+        norm_age = pool.normalized_age()
+        emitter_index = pool.emitter_index[:n]
+        workspace = self._workspace
+        has_curve = self._mask[:n, None]
+
+        # Size curve acts as a multiplier on initial_size (emitters without one get 1.0)
+        if self.size:
+            size = pool.size[:n]
+            self.size.sample(norm_age, emitter_index, out=size[:, None], workspace=workspace)
+            size *= pool.initial_size[:n]
+
+        # Base color comes from the color curve (full RGBA) or initial_color
+        color = pool.color[:n]
+        color[...] = pool.initial_color[:n]
+        if self.color:
+            sampled = self._scratch_color[:n]
+            self.color.sample(norm_age, emitter_index, out=sampled, workspace=workspace)
+            np.take(self.color.has_curve, emitter_index, out=has_curve[:, 0])
+            np.copyto(color, sampled, where=has_curve)
+
+        # Opacity curve directly sets the final alpha if present
+        if self.opacity:
+            sampled = self._scratch_color[:n, :1]
+            self.opacity.sample(norm_age, emitter_index, out=sampled, workspace=workspace)
+            np.take(self.opacity.has_curve, emitter_index, out=has_curve[:, 0])
+            np.copyto(color[:, 3:], sampled, where=has_curve)
@@ -0,0 +1,157 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .looping import TRACK_CHANNELS, BakedEmitter, LoopBake
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from looping import TRACK_CHANNELS, BakedEmitter, LoopBake
+
+# Channels whose error is the distance between points; the others use the largest component difference
+_EUCLIDEAN_CHANNELS = frozenset(("position",))
+
+
+@dataclass
+class DecimationTolerances:
+    """Largest error a removed key may introduce, per channel."""
+    position: float = 0.25 # Pixels
+    rotation: float = 0.5 # Degrees
+    size: float = 0.25 # Pixels
+    color: float = 0.01 # Largest RGBA component difference, on a 0-1 scale
+
+    def get(self, channel: str) -> float:
+        return float(getattr(self, channel))
+
+
+@dataclass
+class ChannelDecimation:
+    keys_before: int
+    keys_after: int
+    worst_error: np.ndarray # Per track, against every baked sample
+
+    @property
+    def keys_removed(self) -> int:
+        return self.keys_before - self.keys_after
+
+
+@dataclass
+class EmitterDecimation:
+    emitter_id: str
+    channels: Dict[str, ChannelDecimation] = field(default_factory=dict)
+
+
+@dataclass
+class DecimationReport:
+    """What decimate_bake() removed, and the error it left, per emitter and channel."""
+    tolerances: DecimationTolerances
+    emitters: List[EmitterDecimation] = field(default_factory=list)
+
+    def _channels(self, channel: Optional[str]) -> List[ChannelDecimation]:
+        names = TRACK_CHANNELS if channel is None else (channel,)
+        return [emitter.channels[name] for emitter in self.emitters for name in names]
+
+    def keys_before(self, channel: Optional[str] = None) -> int:
+        return sum(c.keys_before for c in self._channels(channel))
+
+    def keys_after(self, channel: Optional[str] = None) -> int:
+        return sum(c.keys_after for c in self._channels(channel))
+
+    def keys_removed(self, channel: Optional[str] = None) -> int:
+        return self.keys_before(channel) - self.keys_after(channel)
+
+    def worst_error(self, channel: str) -> float:
+        return max([float(c.worst_error.max()) for c in self._channels(channel) if c.worst_error.size] + [0.0])
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per channel: keys before and after, and the worst error of any track."""
+        return {name: {"keys_before": self.keys_before(name), "keys_after": self.keys_after(name),
+                       "worst_error": self.worst_error(name), "tolerance": self.tolerances.get(name)}
+                for name in TRACK_CHANNELS}
+
+
+def _sample_errors(values: np.ndarray, a: np.ndarray, b: np.ndarray, samples: np.ndarray,
+                   euclidean: bool) -> np.ndarray:
+    """Error at `samples` of the straight line between samples `a` and `b` (per sample)."""
+    span = np.maximum(b - a, 1)
+    t = ((samples - a) / span)[:, None]
+    difference = values[samples] - (values[a] + (values[b] - values[a]) * t)
+    if euclidean:
+        return np.sqrt(np.einsum("ij,ij->i", difference, difference))
+    return np.abs(difference).max(axis=1)
+
+
+def decimate_track_keys(values: np.ndarray, offsets: np.ndarray, keys: np.ndarray, tolerance: float,
+                        euclidean: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """Remove keys from every track at once while linear interpolation stays within `tolerance`.
+
+    `values` holds one sample per frame, tracks laid out as in BakedEmitter;
+    `keys` marks the samples currently keyed, including each track's first
+    and last sample. A key is removable when the line between its neighbours
+    passes within `tolerance` of every sample they span, measured against the
+    samples rather than the current keys, so errors never accumulate. Each
+    pass scores all keys with two vectorized interpolations and removes every
+    other key of each run of removable ones (neighbours cannot both go in one
+    pass, as each changes the other's line); passes repeat until none is left.
+
+    Returns (keys, worst error per track).
+    """
+    total = len(values)
+    keys = keys.copy()
+    track_count = len(offsets) - 1
+    if total == 0:
+        return keys, np.zeros(track_count)
+    values = values.reshape(total, -1)
+    samples = np.arange(total)
+    keys[offsets[:-1]] = keys[offsets[1:] - 1] = True
+    while True:
+        key_index = np.flatnonzero(keys)
+        key_count = len(key_index)
+        # Key j's segment: samples from key j up to (not including) key j + 1
+        segment = np.searchsorted(key_index, samples, side="right") - 1
+
+        def key_at(j):
+            return key_index[np.clip(j, 0, key_count - 1)]
+
+        # Removing key j joins keys j - 1 and j + 1; its segment and the one before are affected
+        on_removal = np.maximum.reduceat(
+            _sample_errors(values, key_at(segment - 1), key_at(segment + 1), samples, euclidean), key_index)
+        on_next_removal = np.maximum.reduceat(
+            _sample_errors(values, key_at(segment), key_at(segment + 2), samples, euclidean), key_index)
+        error = on_removal
+        error[1:] = np.maximum(error[1:], on_next_removal[:-1])
+        removable = error <= tolerance
+        removable[np.searchsorted(key_index, offsets[:-1])] = False # First and last key of each track stay
+        removable[np.searchsorted(key_index, offsets[1:] - 1)] = False
+        if not removable.any():
+            break
+        # Every other key of each run of removable keys, starting with the first
+        ranks = np.arange(key_count)
+        run_start = np.maximum.accumulate(np.where(removable, -1, ranks))
+        keys[key_index[removable & ((ranks - run_start) % 2 == 1)]] = False
+
+    key_index = np.flatnonzero(keys)
+    segment = np.searchsorted(key_index, samples, side="right") - 1
+    following = key_index[np.minimum(segment + 1, len(key_index) - 1)]
+    following = np.where(keys, samples, following) # Keyed samples are exact
+    errors = _sample_errors(values, key_index[segment], following, samples, euclidean)
+    return keys, np.maximum.reduceat(errors, offsets[:-1])
+
+
+def decimate_emitter(baked: BakedEmitter, tolerances: DecimationTolerances) -> EmitterDecimation:
+    """Decimate every channel of a BakedEmitter in place (its `keys`) and report the result."""
+    result = EmitterDecimation(baked.emitter_id)
+    for name in TRACK_CHANNELS:
+        before = baked.key_count(name)
+        keys, worst = decimate_track_keys(getattr(baked, name), baked.offsets, baked.keys[name],
+                                          tolerances.get(name), name in _EUCLIDEAN_CHANNELS)
+        baked.keys[name] = keys
+        result.channels[name] = ChannelDecimation(before, baked.key_count(name), worst)
+    return result
+
+
+def decimate_bake(bake: LoopBake, tolerances: Optional[DecimationTolerances] = None) -> DecimationReport:
+    """Decimate the keys of every emitter of a LoopBake in place."""
+    tolerances = tolerances or DecimationTolerances()
+    return DecimationReport(tolerances, [decimate_emitter(baked, tolerances) for baked in bake.emitters])
@@ -0,0 +1,267 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .asset_import import AssetImporter, load_rgba
+    from .atlas_packer import DEFAULT_ATLAS_PADDING, MAX_ATLAS_PAGES, AtlasPacker
+    from .decimation import DecimationTolerances, decimate_emitter
+    from .ir import EffectIR
+    from .layers import emitter_fingerprint
+    from .looping import BakedEmitter, LoopBake, LoopBaker
+    from .spine_export import (DEFAULT_ATTACHMENT, DEFAULT_ATTACHMENT_SIZE, SpineEmitterSections, SpineExportOptions,
+                               SpineExportStats, SpineJsonCompiler, needs_end_key)
+    from .sprite_batch import disc_pixels
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from asset_import import AssetImporter, load_rgba
+    from atlas_packer import DEFAULT_ATLAS_PADDING, MAX_ATLAS_PAGES, AtlasPacker
+    from decimation import DecimationTolerances, decimate_emitter
+    from ir import EffectIR
+    from layers import emitter_fingerprint
+    from looping import BakedEmitter, LoopBake, LoopBaker
+    from spine_export import (DEFAULT_ATTACHMENT, DEFAULT_ATTACHMENT_SIZE, SpineEmitterSections, SpineExportOptions,
+                              SpineExportStats, SpineJsonCompiler, needs_end_key)
+    from sprite_batch import disc_pixels
+
+BUDGET_PNG_BYTES = 2 * 1024 * 1024
+BUDGET_JSON_GZIP_BYTES = 5 * 1024
+BUDGET_ITEMS = ("json_gzip_bytes", "png_bytes", "atlas_pages")
+
+
+@dataclass
+class ExportBudget:
+    """Limits an exported effect must stay within."""
+    json_gzip_bytes: int = BUDGET_JSON_GZIP_BYTES
+    png_bytes: int = BUDGET_PNG_BYTES # All atlas pages together
+    atlas_pages: int = MAX_ATLAS_PAGES
+
+
+@dataclass
+class BudgetEstimate:
+    """Export size of an effect as BudgetEstimator last computed it.
+
+    JSON figures are those of export_spine_json() and atlas figures those
+    of AtlasPacker (sprites that do not fit in the page limit leave
+    `atlas_fits` False and the atlas figures at zero).
+    """
+    budget: ExportBudget
+    json_keys: int = 0
+    json_bytes: int = 0
+    json_gzip_bytes: int = 0
+    atlas_area: int = 0 # Pixels over all pages
+    atlas_pages: int = 0
+    png_bytes: int = 0
+    atlas_fits: bool = True
+    emitter_keys: Dict[str, int] = field(default_factory=dict) # Per emitter, to find the expensive ones
+    emitter_bytes: Dict[str, int] = field(default_factory=dict) # Uncompressed JSON, per emitter
+
+    def usage(self) -> Dict[str, float]:
+        """Fraction of each budget item used; above 1 is over budget."""
+        usage = {name: getattr(self, name) / max(getattr(self.budget, name), 1) for name in BUDGET_ITEMS}
+        if not self.atlas_fits:
+            usage["png_bytes"] = usage["atlas_pages"] = float("inf")
+        return usage
+
+    def over_budget(self) -> List[str]:
+        return [name for name, used in self.usage().items() if used > 1.0]
+
+    @property
+    def within_budget(self) -> bool:
+        return not self.over_budget()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per budget item: the estimate, its limit and the fraction used."""
+        return {name: {"estimate": getattr(self, name), "limit": getattr(self.budget, name), "usage": used}
+                for name, used in self.usage().items()}
+
+
+@dataclass
+class BudgetEstimatorStats:
+    bakes: int = 0 # Emitters baked and decimated since creation
+    compiles: int = 0 # Emitters compiled to JSON since creation
+    packs: int = 0 # Atlases packed since creation
+
+
+class _ByteCounter:
+    """Binary stream that only keeps count (JsonStreamWriter does the gzip sizing)."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        return len(data)
+
+
+class BudgetEstimator:
+    """Keeps running estimates of an effect's export size against an ExportBudget.
+
+    An estimate runs the export pipeline (LoopBaker, decimate_emitter,
+    SpineJsonCompiler, AtlasPacker) but caches each stage per emitter, keyed
+    by emitter_fingerprint(): after an edit only the emitters whose
+    parameters or timelines changed are baked again (in worker processes
+    when `workers` allows) and compiled, and emitters after them only if
+    their slot names shift. The JSON is then joined from cached sections,
+    so its size and gzip size are those of the real export. The atlas is
+    packed again only when sprites, their image files or the need for the
+    default particle disc change.
+
+    Use budget_estimator() to get the estimator attached to an EffectIR.
+    estimate() works on an EffectIR.snapshot(), so it can run in the
+    background while the effect is edited (edits from other threads must
+    hold `effect_ir.lock`, as SimulationWorker's do); an edit made during an
+    estimate is picked up by the next.
+    """
+
+    def __init__(self, effect_ir: EffectIR, budget: Optional[ExportBudget] = None,
+                 options: Optional[SpineExportOptions] = None,
+                 tolerances: Optional[DecimationTolerances] = None, workers: Optional[int] = None,
+                 importer: Optional[AssetImporter] = None, image_loader: Callable[[str], np.ndarray] = load_rgba,
+                 padding: int = DEFAULT_ATLAS_PADDING):
+        self.effect_ir: EffectIR = effect_ir
+        self.budget: ExportBudget = budget or ExportBudget()
+        self.options: SpineExportOptions = options or SpineExportOptions()
+        self.tolerances: DecimationTolerances = tolerances or DecimationTolerances()
+        self.workers: Optional[int] = workers
+        self.importer: Optional[AssetImporter] = importer
+        self.image_loader = image_loader
+        self.padding: int = padding
+        self.stats = BudgetEstimatorStats()
+        self.last_estimate: Optional[BudgetEstimate] = None
+        self._lock = threading.Lock()
+        self._bakes: Dict[str, Tuple[Hashable, BakedEmitter]] = {}
+        self._sections: Dict[str, Tuple[Hashable, SpineEmitterSections]] = {}
+        self._sprite_key: Optional[Hashable] = None
+        self._compiler: Optional[SpineJsonCompiler] = None
+        self._atlas: Optional[Tuple[Hashable, Tuple[bool, int, int, int]]] = None
+
+    @staticmethod
+    def _bake_keys(effect_ir: EffectIR, baker: LoopBaker) -> Dict[str, Hashable]:
+        settings = (baker.duration, baker.frame_count, baker.prewarm_frames)
+        return {emitter.emitter_id: (settings, emitter.blending_mode,
+                                     emitter_fingerprint(effect_ir, emitter.emitter_id))
+                for emitter in effect_ir.emitters}
+
+    @staticmethod
+    def _sprites_key(ir: EffectIR) -> Hashable:
+        files = []
+        for asset in ir.sprite_assets:
+            try:
+                stat = os.stat(asset.path)
+                files.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                files.append(None)
+        return repr((ir.sprite_assets, sorted(ir.sprite_definitions.items()), sorted(ir.flipbooks.items()), files))
+
+    @property
+    def stale(self) -> bool:
+        """Whether the effect changed since the last estimate (cheap; no baking)."""
+        if self.last_estimate is None:
+            return True
+        with self.effect_ir.lock:
+            if self._sprites_key(self.effect_ir) != self._sprite_key:
+                return True
+            keys = self._bake_keys(self.effect_ir, LoopBaker(self.effect_ir, workers=1))
+        return keys.keys() != self._bakes.keys() or any(self._bakes[i][0] != key for i, key in keys.items())
+
+    def estimate(self) -> BudgetEstimate:
+        """Bring the estimate up to date with the effect, redoing only what changed."""
+        with self._lock:
+            # Everything below works on a copy, so edits made meanwhile cannot tear it
+            effect_ir = self.effect_ir.snapshot()
+            baker = LoopBaker(effect_ir, workers=self.workers)
+            keys = self._bake_keys(effect_ir, baker)
+            sprite_key = self._sprites_key(effect_ir)
+            if sprite_key != self._sprite_key:
+                # Sprites change attachments, so every emitter compiles again
+                self._sprite_key = sprite_key
+                self._compiler = SpineJsonCompiler(effect_ir, self.options)
+                self._sections.clear()
+            self._compiler.effect_ir = effect_ir # Its sprite caches still hold
+
+            changed = [emitter_id for emitter_id, key in keys.items()
+                       if emitter_id not in self._bakes or self._bakes[emitter_id][0] != key]
+            if changed:
+                for baked in baker.bake(changed).emitters:
+                    decimate_emitter(baked, self.tolerances)
+                    self._bakes[baked.emitter_id] = (keys[baked.emitter_id], baked)
+                self.stats.bakes += len(changed)
+            for emitter_id in set(self._bakes) - set(keys):
+                del self._bakes[emitter_id]
+                self._sections.pop(emitter_id, None)
+            bake = LoopBake(baker.duration, baker.frame_count, baker.prewarm_frames * baker.frame_step,
+                            [self._bakes[emitter_id][1] for emitter_id in keys])
+
+            estimate = BudgetEstimate(self.budget)
+            json_stats = self._json_stats(bake, keys, estimate)
+            estimate.json_keys, estimate.json_bytes = json_stats.keys, json_stats.raw_bytes
+            estimate.json_gzip_bytes = json_stats.gzip_bytes
+            estimate.atlas_fits, estimate.atlas_pages, estimate.atlas_area, estimate.png_bytes = \
+                self._atlas_figures(effect_ir, sprite_key, self._needs_default_attachment(effect_ir, bake))
+            self.last_estimate = estimate
+            return estimate
+
+    def _json_stats(self, bake: LoopBake, keys: Dict[str, Hashable], estimate: BudgetEstimate) -> SpineExportStats:
+        end_key = needs_end_key(bake)
+        sections = []
+        first_name = 0
+        for baked in bake.emitters:
+            section_key = (keys[baked.emitter_id], first_name, end_key and first_name == 0)
+            cached = self._sections.get(baked.emitter_id)
+            if cached is None or cached[0] != section_key:
+                cached = self._sections[baked.emitter_id] = (section_key, self._compiler.compile_emitter(
+                    baked, bake, first_name, section_key[2]))
+                self.stats.compiles += 1
+            section = cached[1]
+            sections.append(section)
+            first_name += section.slot_count
+            estimate.emitter_keys[baked.emitter_id] = section.keys
+            estimate.emitter_bytes[baked.emitter_id] = sum(
+                len(part) for part in (section.bones, section.slots, section.skin, section.slot_timelines,
+                                       section.bone_timelines))
+        return self._compiler.write_skeleton(sections, _ByteCounter())
+
+    @staticmethod
+    def _needs_default_attachment(ir: EffectIR, bake: LoopBake) -> bool:
+        """Whether any particle is exported with the default disc (see SpineJsonCompiler)."""
+        for baked in bake.emitters:
+            for index in np.unique(baked.sprite_index):
+                sprite_id = baked.sprite_ids[index] if index >= 0 else None
+                flipbook = ir.get_flipbook(sprite_id) if sprite_id else None
+                frame_ids = flipbook.frame_ids if flipbook else [sprite_id]
+                if not all(frame_id and ir.get_sprite_definition(frame_id) for frame_id in frame_ids):
+                    return True
+        return False
+
+    def _atlas_figures(self, effect_ir: EffectIR, sprite_key: Hashable,
+                       default_attachment: bool) -> Tuple[bool, int, int, int]:
+        """(fits, pages, area, PNG bytes) of the effect's atlas."""
+        key = (sprite_key, default_attachment)
+        if self._atlas is None or self._atlas[0] != key:
+            extra = {DEFAULT_ATTACHMENT: disc_pixels(DEFAULT_ATTACHMENT_SIZE)} if default_attachment else None
+            packer = AtlasPacker(effect_ir, importer=self.importer, image_loader=self.image_loader,
+                                 padding=self.padding, max_pages=self.budget.atlas_pages, workers=self.workers,
+                                 extra_sprites=extra)
+            try:
+                atlas = packer.pack()
+                figures = (True, len(atlas.pages), atlas.area, sum(len(data) for data in atlas.png_bytes()))
+            except ValueError as e:
+                print(f"Warning: {e}")
+                figures = (False, 0, 0, 0)
+            self._atlas = (key, figures)
+            self.stats.packs += 1
+        return self._atlas[1]
+
+
+def budget_estimator(effect_ir: EffectIR, **kwargs) -> BudgetEstimator:
+    """The BudgetEstimator attached to an effect, created (with `kwargs`) on first use.
+
+    From a script: `budget_estimator(effect_ir).estimate().summary()`.
+    """
+    if effect_ir.budget_estimator is None:
+        effect_ir.budget_estimator = BudgetEstimator(effect_ir, **kwargs)
+    return effect_ir.budget_estimator
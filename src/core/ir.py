@@ -1,5 +1,9 @@
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Tuple, Optional
+from bisect import bisect_right
+import copy
+import threading
+import zlib
 from kivy.event import EventDispatcher # Import EventDispatcher
 from kivy.properties import NumericProperty, ObjectProperty, DictProperty # Added DictProperty
 
@@ -31,6 +35,9 @@ class EmitterProperties:
     name: str = "Default Emitter"
     parameters: Dict[str, EmitterParameter] = field(default_factory=dict)
     blending_mode: str = "alpha" # "alpha" for traditional, "additive" for bright effects
+    # Seed of this emitter's random stream; stored with the effect so simulations
+    # and loop bakes are reproducible. Defaults to a stable hash of emitter_id.
+    seed: Optional[int] = None
     # Example parameters that a source node might manage:
     # emission_rate: float = 10.0
     # lifespan: float = 2.0
@@ -41,6 +48,10 @@ class EmitterProperties:
     # For now, parameters will be stored in the dict above.
     # The direct attributes are commented out as they'd be represented in the dict.
 
+    def __post_init__(self):
+        if self.seed is None:
+            self.seed = zlib.crc32(self.emitter_id.encode("utf-8")) # hash() is salted per process
+
     def get_param_value(self, param_name: str, default: Any = None) -> Any:
         # This will return the BASE value, not the animated one.
         if param_name in self.parameters:
@@ -94,38 +105,111 @@ class AnimatedParameter:
             # For times at or after the last keyframe, use the last keyframe's value (hold)
             return self.keyframes[-1].value
 
-        # Find the two keyframes to interpolate between
-        for i in range(len(self.keyframes) - 1):
-            kf1 = self.keyframes[i]
-            kf2 = self.keyframes[i+1]
-            
-            if kf1.time <= time < kf2.time:
-                # Determine interpolation mode ( defaulting to kf1.interpolation_mode)
-                interp_mode = kf1.interpolation_mode
-
-                if interp_mode == "step":
-                    return kf1.value
-                
-                # Linear interpolation (default)
-                if kf2.time == kf1.time: # Avoid division by zero
-                    return kf1.value
-                t_ratio = (time - kf1.time) / (kf2.time - kf1.time)
-
-                # Numeric interpolation (float, int)
-                if isinstance(kf1.value, (int, float)) and isinstance(kf2.value, (int, float)):
-                    return kf1.value + (kf2.value - kf1.value) * t_ratio
-                
-                # Tuple/List interpolation (for Color, Vector2, etc.)
-                elif isinstance(kf1.value, (tuple, list)) and isinstance(kf2.value, (tuple, list)) and len(kf1.value) == len(kf2.value):
-                    try:
-                        interpolated_tuple = tuple(v1 + (v2 - v1) * t_ratio for v1, v2 in zip(kf1.value, kf2.value))
-                        return interpolated_tuple
-                    except TypeError: # In case tuple elements are not numbers
-                        return kf1.value # Fallback to step
-                
-                return kf1.value # Default fallback: step interpolation for other types
-        
-        return default_value # Should not be reached if logic above is correct
+        # Find the two keyframes to interpolate between (kf1.time <= time < kf2.time)
+        i = bisect_right(self.keyframes, time, key=lambda kf: kf.time) - 1
+        return _interpolate_keyframes(self.keyframes[i], self.keyframes[i + 1], time)
+
+
+def _interpolate_keyframes(kf1: TimelineKeyframe, kf2: TimelineKeyframe, time: float) -> Any:
+    # Determine interpolation mode ( defaulting to kf1.interpolation_mode)
+    interp_mode = kf1.interpolation_mode
+
+    if interp_mode == "step":
+        return kf1.value
+    
+    # Linear interpolation (default)
+    if kf2.time == kf1.time: # Avoid division by zero
+        return kf1.value
+    t_ratio = (time - kf1.time) / (kf2.time - kf1.time)
+
+    # Numeric interpolation (float, int)
+    if isinstance(kf1.value, (int, float)) and isinstance(kf2.value, (int, float)):
+        return kf1.value + (kf2.value - kf1.value) * t_ratio
+    
+    # Tuple/List interpolation (for Color, Vector2, etc.)
+    elif isinstance(kf1.value, (tuple, list)) and isinstance(kf2.value, (tuple, list)) and len(kf1.value) == len(kf2.value):
+        try:
+            interpolated_tuple = tuple(v1 + (v2 - v1) * t_ratio for v1, v2 in zip(kf1.value, kf2.value))
+            return interpolated_tuple
+        except TypeError: # In case tuple elements are not numbers
+            return kf1.value # Fallback to step
+    
+    return kf1.value # Default fallback: step interpolation for other types
+
+
+class CompiledTimeline:
+    """An AnimatedParameter with its keyframe times pre-extracted for bisection.
+
+    Keeps a reference to the source so in-place edits that replace or resize
+    the keyframe list are picked up without rebuilding the whole sampler.
+    """
+
+    __slots__ = ("source", "_keyframes", "_times")
+
+    def __init__(self, source: AnimatedParameter):
+        self.source = source
+        self._compile()
+
+    def _compile(self):
+        self._keyframes = self.source.keyframes
+        self._times = [kf.time for kf in self._keyframes]
+
+    def value_at(self, time: float, default_value: Any) -> Any:
+        keyframes = self.source.keyframes
+        if keyframes is not self._keyframes or len(keyframes) != len(self._times):
+            self._compile()
+        times = self._times
+        if not times:
+            return default_value
+        if time < times[0]:
+            return keyframes[0].value
+        if time >= times[-1]:
+            return keyframes[-1].value
+        i = bisect_right(times, time) - 1
+        return _interpolate_keyframes(keyframes[i], keyframes[i + 1], time)
+
+
+class ParameterSampler:
+    """Compiled, indexed view of an EffectIR for fast parameter lookup.
+
+    Emitters and timelines are indexed by id once; base values are still read
+    live from each emitter's parameters, so EmitterProperties.set_param_value
+    never requires a rebuild. Obtain one through EffectIR.get_sampler(), which
+    rebuilds it only when the IR's structure changes.
+    """
+
+    def __init__(self, effect_ir: "EffectIR"):
+        self.revision: int = effect_ir.revision
+        self._emitters: Dict[str, EmitterProperties] = {e.emitter_id: e for e in effect_ir.emitters}
+        # emitter_id -> {param_name: CompiledTimeline}
+        self._timelines: Dict[str, Dict[str, CompiledTimeline]] = {}
+        for parameter_path, timeline in effect_ir.timelines.items():
+            emitter_id, _, param_name = parameter_path.rpartition("/")
+            self._timelines.setdefault(emitter_id, {})[param_name] = CompiledTimeline(timeline)
+
+    def get_emitter(self, emitter_id: str) -> Optional[EmitterProperties]:
+        return self._emitters.get(emitter_id)
+
+    def value(self, emitter_id: str, param_name: str, time: float) -> Any:
+        """Same contract as EffectIR.get_animated_param_value."""
+        emitter = self._emitters.get(emitter_id)
+        if not emitter:
+            return None
+        base_value = emitter.get_param_value(param_name)
+        timeline = self._timelines.get(emitter_id, {}).get(param_name)
+        if timeline is None:
+            return base_value
+        return timeline.value_at(time, base_value)
+
+    def sample(self, emitter_id: str, time: float) -> Dict[str, Any]:
+        """Return every parameter of an emitter (base values overlaid with animation) at `time`."""
+        emitter = self._emitters.get(emitter_id)
+        if not emitter:
+            return {}
+        values = {name: param.value for name, param in emitter.parameters.items()}
+        for param_name, timeline in self._timelines.get(emitter_id, {}).items():
+            values[param_name] = timeline.value_at(time, values.get(param_name))
+        return values
 
 
 @dataclass
@@ -147,6 +231,16 @@ class SpriteDefinition:
     # Optional: name for easier lookup in editor, if different from definition_id
     name: Optional[str] = None 
 
+@dataclass
+class FlipbookDefinition:
+    definition_id: str # Used wherever a sprite_definition_id is expected, e.g., "sparkle_anim"
+    # IDs of the SpriteDefinitions shown in turn, usually regions of one atlas
+    frame_ids: List[str]
+    # Frames per second of particle age; 0 plays all frames once over the particle's lifespan
+    frame_rate: float = 0.0
+    loop: bool = True # With a frame rate: wrap around, or hold the last frame
+    name: Optional[str] = None
+
 
 class EffectIR(EventDispatcher):
     version = ObjectProperty("0.1.0") # Can be ObjectProperty for strings/other objects
@@ -162,16 +256,49 @@ class EffectIR(EventDispatcher):
     emitters: List[EmitterProperties] = field(default_factory=list) # Made this a field for clarity
     sprite_assets: List[SpriteAsset] = field(default_factory=list)
     sprite_definitions: Dict[str, SpriteDefinition] = field(default_factory=dict)
+    flipbooks: Dict[str, FlipbookDefinition] = field(default_factory=dict)
 
     def __init__(self, **kwargs):
+        # Bumped whenever emitters or timelines are added/replaced; see get_sampler()
+        self.revision = 0
+        self._sampler: Optional[ParameterSampler] = None
+        self.budget_estimator = None # Set by export_budget.budget_estimator()
+        # Held while edits are applied from another thread (see SimulationWorker.edit) and while
+        # a snapshot() is taken, so readers on other threads never see a half-applied edit
+        self.lock = threading.RLock()
         super().__init__(**kwargs) # Call EventDispatcher constructor
         self.emitters = [] # Initialize as plain list for now
         self.timelines = {} # Re-initialize if not relying on DictProperty solely for init
         self.sprite_assets = []
         self.sprite_definitions = {}
+        self.flipbooks = {}
+
+    def on_timelines(self, instance, value):
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        # Call after structural edits made outside the add_*/update methods
+        self.revision += 1
+
+    def snapshot(self) -> "EffectIR":
+        """Deep copy of the effect's data (emitters, timelines, sprites), taken under `lock`."""
+        with self.lock:
+            effect = EffectIR(version=self.version, loop_duration=self.loop_duration)
+            effect.emitters = copy.deepcopy(self.emitters)
+            effect.timelines = copy.deepcopy(dict(self.timelines))
+            effect.sprite_assets = copy.deepcopy(self.sprite_assets)
+            effect.sprite_definitions = copy.deepcopy(self.sprite_definitions)
+            effect.flipbooks = copy.deepcopy(self.flipbooks)
+        return effect
+
+    def get_sampler(self) -> ParameterSampler:
+        if self._sampler is None or self._sampler.revision != self.revision:
+            self._sampler = ParameterSampler(self)
+        return self._sampler
 
     def add_emitter(self, emitter_props: EmitterProperties):
         self.emitters.append(emitter_props)
+        self.mark_dirty()
         # If emitters were a ListProperty, you might do: self.emitters.append(emitter_props)
         # and that could trigger bindings if needed.
 
@@ -182,37 +309,14 @@ class EffectIR(EventDispatcher):
         return None
 
     def get_animated_param_value(self, emitter_id: str, param_name: str, time: float) -> Any:
-        emitter = self.get_emitter(emitter_id)
-        if not emitter:
-            print(f"DEBUG EffectIR: Emitter '{emitter_id}' not found")
-            return None # Emitter not found
-
-        base_value = emitter.get_param_value(param_name) # Get the non-animated base value as default
-        print(f"DEBUG EffectIR: Base value for '{emitter_id}/{param_name}': {base_value}")
-
-        param_path = f"{emitter_id}/{param_name}"
-        print(f"DEBUG EffectIR: Looking for timeline path '{param_path}' at time {time:.2f}")
-        print(f"DEBUG EffectIR: Available timelines: {list(self.timelines.keys())}")
-        
-        if param_path in self.timelines:
-            animated_param = self.timelines[param_path]
-            print(f"DEBUG EffectIR: Found animated parameter with {len(animated_param.keyframes)} keyframes")
-            for i, kf in enumerate(animated_param.keyframes):
-                print(f"  Keyframe {i}: time={kf.time:.2f}, value={kf.value}")
-            
-            # Ensure keyframes are sorted by time - ideally do this when keyframes are added/modified
-            # For simplicity now, we might sort here or assume sorted.
-            # animated_param.keyframes.sort(key=lambda kf: kf.time) # Costly if done every call
-            result = animated_param.get_value_at_time(time, default_value=base_value)
-            print(f"DEBUG EffectIR: Animated value at T={time:.2f}: {result}")
-            return result
-        
-        print(f"DEBUG EffectIR: No animation found for '{param_path}', returning base value: {base_value}")
-        return base_value # No animation found for this parameter, return its base value
+        # Returns the animated value at `time`, the base value if the parameter is not
+        # animated, or None if the emitter does not exist.
+        return self.get_sampler().value(emitter_id, param_name, time)
 
     def add_or_update_timeline(self, parameter_path: str, timeline: AnimatedParameter):
         timeline.sort_keyframes()
         self.timelines[parameter_path] = timeline
+        self.mark_dirty() # Also covers re-registering the same (edited) timeline object
         # This should trigger Kivy bindings if anything is bound to the timelines DictProperty directly
         # or to specific keys if Kivy supports that deeply.
 
@@ -241,6 +345,21 @@ class EffectIR(EventDispatcher):
     def get_sprite_definition(self, definition_id: str) -> Optional[SpriteDefinition]:
         return self.sprite_definitions.get(definition_id)
 
+    def add_flipbook(self, flipbook: FlipbookDefinition):
+        if flipbook.definition_id in self.sprite_definitions:
+            print(f"Error: Cannot add flipbook '{flipbook.definition_id}'. A SpriteDefinition has the same id.")
+            return
+        missing = [frame_id for frame_id in flipbook.frame_ids if frame_id not in self.sprite_definitions]
+        if missing or not flipbook.frame_ids:
+            print(f"Error: Cannot add flipbook '{flipbook.definition_id}'. Unknown or no frames: {missing}")
+            return
+        if flipbook.definition_id in self.flipbooks:
+            print(f"Warning: Flipbook with id '{flipbook.definition_id}' already exists. Overwriting.")
+        self.flipbooks[flipbook.definition_id] = flipbook
+
+    def get_flipbook(self, definition_id: str) -> Optional[FlipbookDefinition]:
+        return self.flipbooks.get(definition_id)
+
 # Example Usage would remain similar, but instantiation of EffectIR is now of an EventDispatcher
 if __name__ == '__main__':
     ir = EffectIR(loop_duration=3.0)
@@ -0,0 +1,109 @@
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .ir import EffectIR
+    from .simulator import EmitterParticles
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from ir import EffectIR
+    from simulator import EmitterParticles
+
+
+def emitter_fingerprint(effect_ir: EffectIR, emitter_id: str) -> int:
+    """Hash of everything that determines an emitter's particles.
+
+    Each emitter draws from its own seeded random stream, so its particles at
+    a given step depend only on these inputs. The blending mode is left out
+    (layer_keys() adds it), so it can be hashed once per edit.
+    """
+    emitter = effect_ir.get_emitter(emitter_id)
+    if emitter is None:
+        return 0
+    parameters = tuple(sorted((name, repr(p.value)) for name, p in emitter.parameters.items()))
+    prefix = emitter_id + "/"
+    timelines = tuple(sorted(
+        (path, tuple((k.time, repr(k.value), k.interpolation_mode) for k in timeline.keyframes))
+        for path, timeline in effect_ir.timelines.items() if path.startswith(prefix)))
+    return hash((emitter.emitter_type, emitter.seed, parameters, timelines))
+
+
+def emitter_fingerprints(effect_ir: EffectIR, emitter_ids: Sequence[str], coupled: bool = False) -> Dict[str, int]:
+    """emitter_fingerprint() of each emitter.
+
+    With `coupled` (see EffectSimulator.saturated) emitters share a full pool
+    and change what the others can spawn, so every emitter gets the combined
+    fingerprint of all of them: editing any emitter re-renders every layer.
+    """
+    fingerprints = {emitter_id: emitter_fingerprint(effect_ir, emitter_id) for emitter_id in emitter_ids}
+    if coupled:
+        combined = hash(tuple(fingerprints.items()))
+        fingerprints = dict.fromkeys(fingerprints, combined)
+    return fingerprints
+
+
+def draw_order(pool, rows: np.ndarray) -> np.ndarray:
+    """`rows` sorted by birth (particle id), oldest first.
+
+    Pool compaction moves rows around, so row order depends on every
+    emitter's deaths; birth order is a property of the emitter alone, which
+    keeps a layer's content reproducible while other emitters are edited.
+    """
+    return rows[np.argsort(pool.particle_id[rows], kind="stable")]
+
+
+class LayerTracker:
+    """Decides which per-emitter layers must be re-rendered.
+
+    A layer is identified by its emitter id and described by a content key;
+    it is dirty when the key differs from the one it was last rendered with.
+    Keys come from layer_keys(), so stepping the simulation dirties only the
+    emitters that have particles, and editing one emitter leaves the layers
+    of the others (re-simulated to the same step) untouched.
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, Hashable] = {}
+        self.renders: int = 0 # Layers re-rendered since creation
+        self.reuses: int = 0 # Layers composited from cache since creation
+
+    def update(self, keys: Dict[str, Hashable]) -> List[str]:
+        """Record the current keys; returns the ids of layers to re-render, in `keys` order."""
+        for layer_id in list(self._keys):
+            if layer_id not in keys:
+                del self._keys[layer_id]
+        dirty = [layer_id for layer_id, key in keys.items() if self._keys.get(layer_id, self) != key]
+        for layer_id in dirty:
+            self._keys[layer_id] = keys[layer_id]
+        self.renders += len(dirty)
+        self.reuses += len(keys) - len(dirty)
+        return dirty
+
+    def invalidate(self, layer_id: Optional[str] = None):
+        """Force a re-render of one layer, or of all layers (e.g. after a resize)."""
+        if layer_id is None:
+            self._keys.clear()
+        else:
+            self._keys.pop(layer_id, None)
+
+
+def layer_keys(effect_ir: EffectIR, views: Sequence[EmitterParticles], step: int,
+               fingerprints: Optional[Dict[str, int]] = None, coupled: bool = False) -> Dict[str, Tuple]:
+    """Content key per emitter layer for `views` (see EffectSimulator.emitter_views) at `step`.
+
+    Empty layers keep one key whatever the step, so idle emitters are not
+    re-rendered during playback. The blending mode is part of the key since a
+    layer is rendered (and cleared) differently per mode. `fingerprints`
+    overrides emitter_fingerprints(effect_ir, ..., coupled) for views
+    simulated from an earlier state of the effect.
+    """
+    if fingerprints is None:
+        fingerprints = emitter_fingerprints(effect_ir, [view.emitter_id for view in views], coupled)
+    keys = {}
+    for view in views:
+        if len(view) == 0:
+            keys[view.emitter_id] = (view.blending_mode,)
+            continue
+        keys[view.emitter_id] = (view.blending_mode, fingerprints.get(view.emitter_id, 0), step, len(view))
+    return keys
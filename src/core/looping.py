@@ -0,0 +1,293 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from .analytic import particle_motion, record_spawns
+    from .curves import LifetimeCurveBanks, DEFAULT_CURVE_TOLERANCE
+    from .ir import AnimatedParameter, EffectIR, EmitterProperties
+    from .particle_pool import ParticlePool
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from analytic import particle_motion, record_spawns
+    from curves import LifetimeCurveBanks, DEFAULT_CURVE_TOLERANCE
+    from ir import AnimatedParameter, EffectIR, EmitterProperties
+    from particle_pool import ParticlePool
+
+DEFAULT_LOOP_FRAME_STEP = 1.0 / 60.0
+DEFAULT_LOOP_TOLERANCE = 0.001 # Same as ParticleLoopOptimizer in loop.ts
+TRACK_CHANNELS = ("position", "rotation", "size", "color")
+
+
+@dataclass
+class BakedEmitter:
+    """Per-particle transform tracks of one emitter over one loop.
+
+    A track is one particle during one pass of the loop. Particles still alive
+    at the seam continue in a track of the next `cycle`, which starts at frame
+    0; a particle outliving the loop spans several cycles, and one born on
+    frame 0 also appears on the seam frame, as cycle -1. Samples of track k
+    are rows offsets[k]:offsets[k + 1] of the sample columns, one per frame it
+    is visible at, in frame order. `keys` marks, per channel, the samples kept
+    as keyframes.
+    """
+    emitter_id: str
+    blending_mode: str
+    sprite_ids: List[Optional[str]] # Resolves sprite_index
+    offsets: np.ndarray
+    # Per track
+    particle_id: np.ndarray
+    cycle: np.ndarray
+    birth_time: np.ndarray # Loop time of the particle's birth as seen from the track's cycle
+    lifespan: np.ndarray
+    sprite_index: np.ndarray
+    # Per sample
+    frame: np.ndarray
+    position: np.ndarray
+    rotation: np.ndarray # Degrees, unwrapped along each track
+    size: np.ndarray
+    color: np.ndarray
+    keys: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def track_count(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def sample_count(self) -> int:
+        return int(self.offsets[-1])
+
+    def sample_tracks(self) -> np.ndarray:
+        """Track index of every sample."""
+        return np.repeat(np.arange(self.track_count), np.diff(self.offsets))
+
+    def key_count(self, channel: Optional[str] = None) -> int:
+        channels = TRACK_CHANNELS if channel is None else (channel,)
+        return sum(int(np.count_nonzero(self.keys[name])) for name in channels)
+
+
+@dataclass
+class LoopBake:
+    """Result of LoopBaker.bake(): one BakedEmitter per emitter, in EffectIR order.
+
+    Frames are `duration / frame_count` apart; frame `frame_count` is the
+    seam, where the loop wraps back to frame 0.
+    """
+    duration: float
+    frame_count: int
+    prewarm: float
+    emitters: List[BakedEmitter] = field(default_factory=list)
+
+    @property
+    def frame_step(self) -> float:
+        return self.duration / self.frame_count
+
+    def times(self) -> np.ndarray:
+        return np.arange(self.frame_count + 1) * self.frame_step
+
+    @property
+    def track_count(self) -> int:
+        return sum(emitter.track_count for emitter in self.emitters)
+
+    def key_count(self, channel: Optional[str] = None) -> int:
+        return sum(emitter.key_count(channel) for emitter in self.emitters)
+
+    def get_emitter(self, emitter_id: str) -> Optional[BakedEmitter]:
+        for emitter in self.emitters:
+            if emitter.emitter_id == emitter_id:
+                return emitter
+        return None
+
+
+@dataclass
+class _EmitterJob:
+    """Everything needed to bake one emitter; picklable, unlike EffectIR."""
+    emitter: EmitterProperties
+    timelines: Dict[str, AnimatedParameter]
+    duration: float
+    frame_count: int
+    prewarm_frames: int
+    tolerance: float
+    curve_tolerance: float
+
+
+class LoopBaker:
+    """Bakes an EffectIR into seamless per-particle loops (SparcleFlowChart.ini §4).
+
+    1. Pre-warm: every emitter runs for `prewarm` seconds (default: one loop)
+       so emission reaches its steady state. Timelines repeat every loop,
+       the loop's frame 0 sampling them at time 0.
+    2. Sample: the particles born during the following loop are sampled at
+       every frame in [0, duration) with the closed-form motion of
+       AnalyticSimulator, all tracks and frames of an emitter at once.
+    3. Seal: births are wrapped around the loop. A particle alive at the seam
+       gets a key at frame D holding its state there, and carries on from
+       frame 0 in its next cycle, so frame D shows exactly what frame 0 does.
+    4. Trim: trailing keys that repeat a track's last key within `tolerance`
+       are dropped, keeping the one that starts the hold.
+
+    Emitters are independent, so each is baked in its own worker process
+    when `workers` (default: one per CPU) is more than one.
+    """
+
+    def __init__(self, effect_ir: EffectIR, duration: Optional[float] = None,
+                 frame_step: float = DEFAULT_LOOP_FRAME_STEP, prewarm: Optional[float] = None,
+                 tolerance: float = DEFAULT_LOOP_TOLERANCE, workers: Optional[int] = None,
+                 curve_tolerance: float = DEFAULT_CURVE_TOLERANCE):
+        if frame_step <= 0:
+            raise ValueError("frame_step must be positive")
+        self.effect_ir: EffectIR = effect_ir
+        self.duration: float = float(effect_ir.loop_duration if duration is None else duration)
+        if self.duration <= 0:
+            raise ValueError("Loop duration must be positive")
+        # Whole frames per loop, so frame D lands exactly on the seam
+        self.frame_count: int = max(1, int(round(self.duration / frame_step)))
+        self.prewarm: float = self.duration if prewarm is None else max(0.0, float(prewarm))
+        self.tolerance: float = tolerance
+        self.workers: Optional[int] = workers
+        self.curve_tolerance: float = curve_tolerance
+
+    @property
+    def frame_step(self) -> float:
+        return self.duration / self.frame_count
+
+    @property
+    def prewarm_frames(self) -> int:
+        return int(round(self.prewarm / self.frame_step))
+
+    def _jobs(self, emitter_ids: Optional[Sequence[str]] = None) -> List[_EmitterJob]:
+        jobs = []
+        for emitter in self.effect_ir.emitters:
+            if emitter_ids is not None and emitter.emitter_id not in emitter_ids:
+                continue
+            timelines = {path: timeline for path, timeline in self.effect_ir.timelines.items()
+                         if path.rpartition("/")[0] == emitter.emitter_id}
+            jobs.append(_EmitterJob(emitter, timelines, self.duration, self.frame_count, self.prewarm_frames,
+                                    self.tolerance, self.curve_tolerance))
+        return jobs
+
+    def bake(self, emitter_ids: Optional[Sequence[str]] = None) -> LoopBake:
+        """Bake every emitter, or only those in `emitter_ids` (e.g. the ones edited since a previous bake)."""
+        jobs = self._jobs(emitter_ids)
+        workers = self.workers if self.workers is not None else (os.cpu_count() or 1)
+        workers = min(workers, len(jobs))
+        emitters = None
+        if workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    emitters = list(executor.map(_bake_emitter, jobs))
+            except (OSError, NotImplementedError, BrokenProcessPool) as e:
+                print(f"Warning: Could not bake in worker processes ({e}); baking in this process")
+        if emitters is None:
+            emitters = [_bake_emitter(job) for job in jobs]
+        return LoopBake(self.duration, self.frame_count, self.prewarm_frames * self.frame_step, emitters)
+
+
+def _bake_emitter(job: _EmitterJob) -> BakedEmitter:
+    effect_ir = EffectIR(loop_duration=job.duration)
+    effect_ir.add_emitter(job.emitter)
+    for path, timeline in job.timelines.items():
+        effect_ir.add_or_update_timeline(path, timeline)
+    duration, frame_count = job.duration, job.frame_count
+    step = duration / frame_count
+    prewarm = job.prewarm_frames * step
+    # Timelines repeat every loop, frame 0 of the loop sampling them at 0
+    records, systems = record_spawns(effect_ir, prewarm + duration, step, curve_tolerance=job.curve_tolerance,
+                                     loop_duration=duration, loop_start=prewarm)
+
+    # Particles born during the loop. Frames are counted from the loop start
+    # without wrapping: a particle is visible from the first frame at or after
+    # its birth up to the last one before its death.
+    first = np.searchsorted(records.birth_time, prewarm - 1e-9 * step)
+    born = np.arange(first, records.count)
+    birth = records.birth_time[born] - prewarm
+    first_frame = np.ceil(birth / step).astype(np.int64)
+    end_frame = np.ceil((birth + records.lifespan[born]) / step).astype(np.int64)
+
+    # One track per cycle; cycle c shows frames c*N to (c+1)*N, the seam frame
+    # belonging to both cycles around it. A particle born on frame 0 is also
+    # born on the seam of cycle -1.
+    first_cycle = (first_frame - 1) // frame_count
+    cycles = np.where(end_frame > first_frame, (end_frame - 1) // frame_count - first_cycle + 1, 0)
+    particle = np.repeat(born, cycles)
+    owner = np.repeat(np.arange(len(born)), cycles)
+    cycle = np.arange(len(particle)) - np.repeat(np.cumsum(cycles) - cycles, cycles) + first_cycle[owner]
+    cycle_start = cycle * frame_count
+    start = np.maximum(first_frame[owner], cycle_start) - cycle_start
+    end = np.minimum(end_frame[owner], cycle_start + frame_count + 1) - cycle_start
+    visible = end > start
+    particle, owner, cycle, start, end = particle[visible], owner[visible], cycle[visible], start[visible], end[visible]
+    track_birth = birth[owner] - cycle * duration
+    lifespan = records.lifespan[particle]
+    counts = end - start
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    total = int(offsets[-1])
+    track_of = np.repeat(np.arange(len(counts)), counts)
+    frame = (np.arange(total) - offsets[:-1][track_of] + start[track_of]).astype(np.int32)
+
+    # Every sample of every track in one evaluation; ages come from unwrapped
+    # frames, so both sides of the seam agree exactly
+    age = np.maximum((frame + cycle[track_of] * frame_count) * step - birth[owner][track_of], 0.0)
+    sampled = particle[track_of]
+    position, _velocity, rotation = particle_motion(records, sampled, age, wrap_rotation=False)
+    rotation = _unwrap_degrees(rotation, offsets, track_of)
+    pool = ParticlePool(capacity=total)
+    pool.spawn(total, age=age, lifespan=records.lifespan[sampled], emitter_index=0,
+               initial_size=records.initial_size[sampled], size=records.initial_size[sampled],
+               initial_color=records.initial_color[sampled])
+    curve_banks = LifetimeCurveBanks()
+    curve_banks.update([system.lifetime_curves for system in systems])
+    curve_banks.apply(pool)
+    size, color = pool.size[:total].copy(), pool.color[:total].copy()
+
+    keys = {name: _trim_trailing_keys(values, offsets, track_of, job.tolerance)
+            for name, values in (("position", position), ("rotation", rotation), ("size", size), ("color", color))}
+    return BakedEmitter(
+        emitter_id=job.emitter.emitter_id,
+        blending_mode=job.emitter.blending_mode,
+        sprite_ids=list(records.sprite_ids),
+        offsets=offsets,
+        particle_id=records.particle_id[particle],
+        cycle=cycle,
+        birth_time=track_birth,
+        lifespan=lifespan,
+        sprite_index=records.sprite_index[particle],
+        frame=frame,
+        position=position,
+        rotation=rotation,
+        size=size,
+        color=color,
+        keys=keys,
+    )
+
+
+def _unwrap_degrees(rotation: np.ndarray, offsets: np.ndarray, track_of: np.ndarray) -> np.ndarray:
+    """Remove 360 degree jumps between consecutive samples of each track."""
+    if rotation.size < 2:
+        return rotation
+    delta = np.diff(rotation)
+    correction = np.zeros_like(rotation)
+    correction[1:] = np.mod(delta + 180.0, 360.0) - 180.0 - delta
+    correction[offsets[1:-1]] = 0.0 # No correction across tracks
+    correction = np.cumsum(correction)
+    return rotation + correction - correction[offsets[:-1]][track_of]
+
+
+def _trim_trailing_keys(values: np.ndarray, offsets: np.ndarray, track_of: np.ndarray,
+                        tolerance: float) -> np.ndarray:
+    """Key mask keeping every sample except the repeats of each track's last value at its end."""
+    total = len(values)
+    if total == 0:
+        return np.zeros(0, dtype=np.bool_)
+    values = values.reshape(total, -1)
+    last = offsets[1:] - 1
+    index = np.arange(total)
+    repeats = np.all(np.abs(values - values[last][track_of]) <= tolerance, axis=1)
+    # The trailing hold starts after the last sample that differs from the track's last value
+    last_change = np.maximum.reduceat(np.where(repeats, -1, index), offsets[:-1])
+    hold_start = np.maximum(last_change + 1, offsets[:-1])
+    return (index <= hold_start[track_of]) | (index == last[track_of])
@@ -0,0 +1,301 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Column layout for ParticlePool: (name, dtype, per-particle shape, default value).
+# Every column is one contiguous NumPy array; live particles occupy rows [0, count).
+PARTICLE_COLUMNS: Tuple[Tuple[str, Any, Tuple[int, ...], Any], ...] = (
+    ("particle_id", np.int64, (), -1),  # Monotonically increasing per pool
+    ("position", np.float64, (2,), (0.0, 0.0)),
+    ("velocity", np.float64, (2,), (0.0, 0.0)),
+    ("acceleration", np.float64, (2,), (0.0, 0.0)),
+    ("age", np.float64, (), 0.0),
+    ("lifespan", np.float64, (), 2.0),
+    ("rotation", np.float64, (), 0.0),  # In degrees
+    ("angular_velocity", np.float64, (), 0.0),  # In degrees per second
+    ("size", np.float64, (), 5.0),
+    ("initial_size", np.float64, (), 5.0),
+    ("color", np.float64, (4,), (1.0, 1.0, 1.0, 1.0)),  # RGBA
+    ("initial_color", np.float64, (4,), (1.0, 1.0, 1.0, 1.0)),
+    ("sprite_index", np.int32, (), -1),  # Index into ParticlePool.sprite_ids, -1 = no sprite
+    ("emitter_index", np.int32, (), 0),  # Owning emitter when several emitters share one pool
+    ("orient_to_velocity", np.bool_, (), False),
+)
+
+_COLUMN_NAMES = tuple(column[0] for column in PARTICLE_COLUMNS)
+
+
+class ParticlePool:
+    """Structure-of-arrays particle storage.
+
+    Each particle attribute lives in its own contiguous array so the simulation
+    can advance every live particle with a handful of vectorized operations
+    instead of one Python call per particle.
+
+    With `fixed_capacity=True` the columns and all scratch buffers are
+    allocated once; integrate(), remove_dead() and normalized_age() then work
+    in place and allocate nothing per frame. Spawns beyond capacity are
+    dropped. Otherwise the pool doubles its capacity as needed.
+    """
+
+    def __init__(self, capacity: int = 256, fixed_capacity: bool = False):
+        self.capacity: int = max(1, int(capacity))
+        self.fixed_capacity: bool = fixed_capacity
+        self.count: int = 0
+        self._next_id: int = 0
+        # Sprite definition ids are interned so particles only carry a small int.
+        self.sprite_ids: List[Optional[str]] = []
+        self._sprite_lookup: Dict[Optional[str], int] = {}
+        for name, dtype, shape, default in PARTICLE_COLUMNS:
+            column = np.empty((self.capacity,) + shape, dtype=dtype)
+            column[...] = default
+            setattr(self, name, column)
+        self._allocate_scratch()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _allocate_scratch(self):
+        capacity = self.capacity
+        self._scratch_vec = np.empty((capacity, 2), dtype=np.float64)
+        self._scratch = np.empty(capacity, dtype=np.float64)
+        self._norm_age = np.empty(capacity, dtype=np.float64)
+        self._mask = np.empty(capacity, dtype=np.bool_)
+        self._mask_b = np.empty(capacity, dtype=np.bool_)
+        self._id_ramp = np.arange(capacity, dtype=np.int64)
+
+    def _reserve(self, required: int):
+        if required <= self.capacity:
+            return
+        new_capacity = self.capacity
+        while new_capacity < required:
+            new_capacity *= 2
+        for name, dtype, shape, default in PARTICLE_COLUMNS:
+            old_column = getattr(self, name)
+            column = np.empty((new_capacity,) + shape, dtype=dtype)
+            column[:self.count] = old_column[:self.count]
+            column[self.count:] = default
+            setattr(self, name, column)
+        self.capacity = new_capacity
+        self._allocate_scratch()
+
+    def intern_sprite(self, sprite_definition_id: Optional[str]) -> int:
+        if sprite_definition_id is None:
+            return -1
+        index = self._sprite_lookup.get(sprite_definition_id)
+        if index is None:
+            index = len(self.sprite_ids)
+            self.sprite_ids.append(sprite_definition_id)
+            self._sprite_lookup[sprite_definition_id] = index
+        return index
+
+    def spawn(self, count: int = 1, sprite_definition_id: Optional[str] = None, **columns: Any) -> slice:
+        """Append `count` particles and return the slice of rows they occupy.
+
+        Column values may be scalars/tuples (broadcast to every new particle) or
+        arrays with one row per new particle. Omitted columns use their defaults
+        and particle ids are assigned automatically. A fixed-capacity pool
+        spawns only as many particles as still fit, so the returned slice may
+        be shorter than `count`.
+        """
+        count = int(count)
+        start = self.count
+        if self.fixed_capacity:
+            count = min(count, self.capacity - start)
+        if count <= 0:
+            return slice(start, start)
+        for name in columns:
+            if name not in _COLUMN_NAMES:
+                raise TypeError(f"Unknown particle column '{name}'")
+
+        self._reserve(start + count)
+        end = start + count
+        for name, _dtype, shape, default in PARTICLE_COLUMNS:
+            value = columns.get(name, default)
+            if np.ndim(value) > len(shape):
+                value = value[:count] # Per-particle arrays are trimmed to what fit
+            getattr(self, name)[start:end] = value
+        if "sprite_index" not in columns:
+            self.sprite_index[start:end] = self.intern_sprite(sprite_definition_id)
+        if "particle_id" not in columns:
+            np.add(self._id_ramp[:count], self._next_id, out=self.particle_id[start:end])
+            self._next_id += count
+        self.count = end
+        return slice(start, end)
+
+    def integrate(self, dt: Any, start: int = 0):
+        """Advance age, velocity, position and rotation of live particles.
+
+        `dt` is a scalar or an array with one step per row in [start, count);
+        the latter lets freshly spawned particles be advanced by individual
+        sub-frame amounts.
+        """
+        n = self.count
+        if n <= start:
+            return
+        rows = slice(start, n)
+        m = n - start
+        dt_column = dt[:, None] if np.ndim(dt) else dt
+        step_vec = self._scratch_vec[:m]
+        step = self._scratch[:m]
+
+        self.age[rows] += dt
+
+        velocity = self.velocity[rows]
+        np.multiply(self.acceleration[rows], dt_column, out=step_vec)
+        velocity += step_vec
+        np.multiply(velocity, dt_column, out=step_vec)
+        self.position[rows] += step_vec
+
+        rotation = self.rotation[rows]
+        np.multiply(self.angular_velocity[rows], dt, out=step)
+        rotation += step
+        np.mod(rotation, 360.0, out=rotation)
+
+        # Orient to velocity where flagged and the velocity is non-zero
+        orient = self._mask[:m]
+        moving = self._mask_b[:m]
+        np.not_equal(velocity[:, 0], 0.0, out=orient)
+        np.not_equal(velocity[:, 1], 0.0, out=moving)
+        np.logical_or(orient, moving, out=orient)
+        np.logical_and(orient, self.orient_to_velocity[rows], out=orient)
+        if orient.any():
+            np.arctan2(velocity[:, 1], velocity[:, 0], out=step)
+            np.degrees(step, out=step)
+            np.copyto(rotation, step, where=orient)
+
+    def alive_mask(self) -> np.ndarray:
+        n = self.count
+        return np.less(self.age[:n], self.lifespan[:n], out=self._mask[:n])
+
+    def normalized_age(self) -> np.ndarray:
+        """age / lifespan clamped to [0, 1] for every live particle.
+
+        The result is a view of an internal buffer, valid until the next call.
+        """
+        n = self.count
+        norm_age = self._norm_age[:n]
+        positive = np.greater(self.lifespan[:n], 0.0, out=self._mask[:n])
+        norm_age.fill(1.0) # Zero lifespans count as end of life
+        np.divide(self.age[:n], self.lifespan[:n], out=norm_age, where=positive)
+        return np.clip(norm_age, 0.0, 1.0, out=norm_age)
+
+    def remove_dead(self) -> int:
+        """Remove dead particles by moving live rows from the tail into their slots.
+
+        Work and temporary memory scale with the number of deaths, not with the
+        number of live particles; the price is that rows are not kept in birth
+        order. Returns the number of particles removed.
+        """
+        n = self.count
+        if n == 0:
+            return 0
+        dead = np.greater_equal(self.age[:n], self.lifespan[:n], out=self._mask[:n])
+        dead_count = int(np.count_nonzero(dead))
+        if dead_count == 0:
+            return 0
+        alive_count = n - dead_count
+        # Dead slots below the new end are filled by live rows at or above it
+        holes = np.flatnonzero(dead[:alive_count])
+        if holes.size:
+            tail_alive = np.logical_not(dead[alive_count:n], out=self._mask_b[:dead_count])
+            movers = np.flatnonzero(tail_alive)
+            movers += alive_count
+            for name in _COLUMN_NAMES:
+                column = getattr(self, name)
+                column[holes] = column[movers]
+        self.count = alive_count
+        return dead_count
+
+    def clear(self, rewind_ids: bool = False):
+        self.count = 0
+        if rewind_ids:
+            self._next_id = 0
+
+    def views(self) -> List["ParticleView"]:
+        return [ParticleView(self, i) for i in range(self.count)]
+
+
+class ParticleView:
+    """Read-only, per-particle facade over a ParticlePool row.
+
+    Exposes per-particle attributes (position, color, size, ...) so code
+    written against particle objects (e.g. PreviewWidget.draw_particles) keeps working.
+    A view is only valid until the pool is next updated, since removing dead
+    particles moves rows.
+    """
+
+    __slots__ = ("_pool", "_index")
+
+    def __init__(self, pool: ParticlePool, index: int):
+        self._pool = pool
+        self._index = index
+
+    @property
+    def id(self) -> int:
+        return int(self._pool.particle_id[self._index])
+
+    @property
+    def position(self) -> Tuple[float, float]:
+        x, y = self._pool.position[self._index]
+        return (float(x), float(y))
+
+    @property
+    def velocity(self) -> Tuple[float, float]:
+        x, y = self._pool.velocity[self._index]
+        return (float(x), float(y))
+
+    @property
+    def acceleration(self) -> Tuple[float, float]:
+        x, y = self._pool.acceleration[self._index]
+        return (float(x), float(y))
+
+    @property
+    def color(self) -> Tuple[float, float, float, float]:
+        r, g, b, a = self._pool.color[self._index]
+        return (float(r), float(g), float(b), float(a))
+
+    @property
+    def initial_color(self) -> Tuple[float, float, float, float]:
+        r, g, b, a = self._pool.initial_color[self._index]
+        return (float(r), float(g), float(b), float(a))
+
+    @property
+    def size(self) -> float:
+        return float(self._pool.size[self._index])
+
+    @property
+    def initial_size(self) -> float:
+        return float(self._pool.initial_size[self._index])
+
+    @property
+    def age(self) -> float:
+        return float(self._pool.age[self._index])
+
+    @property
+    def lifespan(self) -> float:
+        return float(self._pool.lifespan[self._index])
+
+    @property
+    def is_alive(self) -> bool:
+        return bool(self._pool.age[self._index] < self._pool.lifespan[self._index])
+
+    @property
+    def rotation(self) -> float:
+        return float(self._pool.rotation[self._index])
+
+    @property
+    def angular_velocity(self) -> float:
+        return float(self._pool.angular_velocity[self._index])
+
+    @property
+    def orient_to_velocity(self) -> bool:
+        return bool(self._pool.orient_to_velocity[self._index])
+
+    @property
+    def sprite_definition_id(self) -> Optional[str]:
+        sprite_index = int(self._pool.sprite_index[self._index])
+        return self._pool.sprite_ids[sprite_index] if sprite_index >= 0 else None
+
+    def __repr__(self):
+        return f"ParticleView(index={self._index}, position={self.position}, age={self.age:.2f})"
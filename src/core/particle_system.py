@@ -1,9 +1,19 @@
 from dataclasses import dataclass, field
 from typing import List, Tuple, Any, Optional
-import uuid
-import random
 import math
 
+import numpy as np
+
+try:
+    from .particle_pool import ParticlePool, ParticleView
+    from .curves import CurveWorkspace, LifetimeCurves, DEFAULT_CURVE_TOLERANCE
+    from .rng import RandomStream
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from particle_pool import ParticlePool, ParticleView
+    from curves import CurveWorkspace, LifetimeCurves, DEFAULT_CURVE_TOLERANCE
+    from rng import RandomStream
+
 # Attempt to import EmitterProperties and EffectIR for type hinting and potential use.
 # This might require adjustments based on actual file structure and circular dependencies.
 try:
@@ -34,106 +44,40 @@ except ImportError:
     EffectIR = EffectIRPlaceholder # type: ignore
 
 
-@dataclass
-class Particle:
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
-    position: Tuple[float, float] = (0.0, 0.0)
-    velocity: Tuple[float, float] = (0.0, 0.0)
-    acceleration: Tuple[float, float] = (0.0, 0.0) # Optional simple physics
-    color: Tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0) # RGBA
-    size: float = 5.0
-    age: float = 0.0  # Current age in seconds
-    lifespan: float = 2.0  # Total lifespan in seconds
-    is_alive: bool = True
-    rotation: float = 0.0  # In degrees
-    angular_velocity: float = 0.0 # In degrees per second
-
-    # Fields for "over lifetime" behavior
-    initial_size: float = 5.0 # Size at birth
-    initial_color: Tuple[float, float, float, float] = (1.0, 1.0, 1.0, 1.0) # Color at birth
-
-    size_curve: Optional[List[Tuple[float, float]]] = None # List of (time_norm, size_multiplier)
-    opacity_curve: Optional[List[Tuple[float, float]]] = None # List of (time_norm, opacity_value)
-    color_curve: Optional[List[Tuple[float, Tuple[float, float, float, float]]]] = None # List of (time_norm, rgba_color)
-
-    # Sprite information
-    sprite_definition_id: Optional[str] = None
-
-    # Behavior flags
-    orient_to_velocity: bool = False
-
-    def update(self, dt: float):
-        if not self.is_alive:
-            return
-
-        self.age += dt
-        if self.age >= self.lifespan:
-            self.is_alive = False
-            return
-
-        # Update velocity with acceleration
-        self.velocity = (
-            self.velocity[0] + self.acceleration[0] * dt,
-            self.velocity[1] + self.acceleration[1] * dt
-        )
-        # Update position with velocity
-        self.position = (
-            self.position[0] + self.velocity[0] * dt,
-            self.position[1] + self.velocity[1] * dt
-        )
-        # Update rotation
-        self.rotation = (self.rotation + self.angular_velocity * dt) % 360
-
-        # Orient to velocity if flag is set
-        if self.orient_to_velocity:
-            if self.velocity[0] != 0 or self.velocity[1] != 0: # Check for non-zero velocity
-                self.rotation = math.degrees(math.atan2(self.velocity[1], self.velocity[0]))
-
-        # Affect over lifetime
-        if self.lifespan > 0: # Avoid division by zero if lifespan is 0
-            norm_age = min(1.0, max(0.0, self.age / self.lifespan))
-        else:
-            norm_age = 1.0 # Consider it at the end of its life if lifespan is zero
-
-        # Apply size curve (as multiplier to initial_size)
-        if self.size_curve:
-            current_size_multiplier = _interpolate_scalar_curve(self.size_curve, norm_age)
-            self.size = self.initial_size * current_size_multiplier
-        # else: self.size remains initial_size or set directly if no curve logic is used for size elsewhere
-
-        # Determine current base color (from color_curve or initial_color)
-        current_base_color_rgb = (self.initial_color[0], self.initial_color[1], self.initial_color[2])
-        current_base_alpha = self.initial_color[3]
-
-        if self.color_curve:
-            interpolated_color = _interpolate_color_curve(self.color_curve, norm_age)
-            current_base_color_rgb = (interpolated_color[0], interpolated_color[1], interpolated_color[2])
-            current_base_alpha = interpolated_color[3] # Color curve defines full RGBA
-        
-        # Apply opacity curve (modulates the alpha of the current_base_color)
-        if self.opacity_curve:
-            current_opacity = _interpolate_scalar_curve(self.opacity_curve, norm_age)
-            final_alpha = current_base_alpha * current_opacity # Modulate if color curve also had alpha
-                                                              # Or directly use current_opacity if that logic is preferred
-                                                              # For now, let opacity_curve be the dominant controller of final alpha if it exists.
-            final_alpha = current_opacity # Let opacity curve directly set final alpha if present
-        else:
-            final_alpha = current_base_alpha
-        
-        self.color = (current_base_color_rgb[0], current_base_color_rgb[1], current_base_color_rgb[2], final_alpha)
-
-
 class ParticleSystem:
     def __init__(self, 
                  effect_ir: Optional[EffectIR] = None, 
                  emitter_id: Optional[str] = None,
-                 max_particles: int = 1000):
-        self.particles: List[Particle] = []
+                 max_particles: int = 1000,
+                 curve_tolerance: float = DEFAULT_CURVE_TOLERANCE,
+                 fixed_capacity: bool = True,
+                 seed: Optional[int] = None,
+                 pool: Optional[ParticlePool] = None,
+                 emitter_index: int = 0):
+        # Live particles are stored column-wise; see ParticlePool. In fixed-capacity
+        # mode all storage is sized to max_particles up front, so a warm system
+        # does not allocate per frame. A `pool` shared with other emitters (see
+        # EffectSimulator) is only emitted into; its owner advances it.
+        self.owns_pool: bool = pool is None
+        if pool is not None:
+            self.pool: ParticlePool = pool
+        elif fixed_capacity:
+            self.pool = ParticlePool(capacity=max_particles, fixed_capacity=True)
+        else:
+            self.pool = ParticlePool(capacity=min(max_particles, 256))
+        self.emitter_index: int = emitter_index # Tag written into pool.emitter_index
         self.effect_ir: Optional[EffectIR] = effect_ir
         self.emitter_id: Optional[str] = emitter_id
         self.max_particles: int = max_particles
         self._emission_debt: float = 0.0 # For fractional particle emission
 
+        # "Over lifetime" curves are emitter-level: the most recently emitted
+        # particle's curves drive every live particle of this system. They are
+        # compiled into lookup tables, recompiled only when a curve changes.
+        self.lifetime_curves: LifetimeCurves = LifetimeCurves(tolerance=curve_tolerance)
+        # Only the pool's owner applies curves (EffectSimulator uses LifetimeCurveBanks)
+        self._curve_workspace: Optional[CurveWorkspace] = CurveWorkspace(self.pool.capacity) if self.owns_pool else None
+
         self.emitter_properties: Optional[EmitterProperties] = None
         if self.effect_ir and self.emitter_id:
             self.emitter_properties = self.effect_ir.get_emitter(self.emitter_id) # type: ignore
@@ -143,6 +87,13 @@ class ParticleSystem:
         if not self.emitter_properties and not isinstance(self.effect_ir, EffectIRPlaceholder): # Avoid warning if using placeholder
             print(f"Warning: ParticleSystem initialized without valid EmitterProperties for emitter_id '{self.emitter_id}'. Emission may not work as expected.")
 
+        # Counter-based random stream: the random attributes of the k-th emitted
+        # particle depend only on (seed, k), so runs are reproducible.
+        if seed is None:
+            seed = getattr(self.emitter_properties, "seed", None)
+        self.random_stream: RandomStream = RandomStream(seed if seed is not None else 0)
+        self._emitted_count: int = 0 # Counter of the next particle's random values
+
 
     def _get_param_value_at_time(self, param_name: str, time: float, default: Any) -> Any:
         if self.effect_ir and self.emitter_id:
@@ -161,84 +112,92 @@ class ParticleSystem:
         # print(f"DEBUG PS: Param '{param_name}' returning default: {default}")
         return default
 
-    def emit_particle(self, current_time: float):
-        if len(self.particles) >= self.max_particles:
-            return
+    def _get_params_at_time(self, time: float) -> dict:
+        if self.effect_ir and self.emitter_id and hasattr(self.effect_ir, "get_sampler"):
+            return self.effect_ir.get_sampler().sample(self.emitter_id, time)
+        # Placeholder IR (standalone demo): base values only
+        if self.emitter_properties:
+            return {name: self._get_param_value_at_time(name, time, None) for name in self.emitter_properties.parameters}
+        return {}
 
-        # Get initial properties from EmitterProperties, potentially animated via EffectIR
-        initial_pos = self._get_param_value_at_time("emitter_position", current_time, (0.0, 0.0))
+    @property
+    def particles(self) -> List[ParticleView]:
+        return self.pool.views()
+
+    def emit_particle(self, current_time: float):
+        self.emit_batch(1, current_time, current_time)
+
+    def emit_batch(self, count: int, t0: float, t1: float, advance: bool = True,
+                   live_count: Optional[int] = None) -> slice:
+        """Emit up to `count` particles born evenly over [t0, t1), each advanced to t1.
+
+        Parameters are sampled once (at t0) and every random attribute is drawn
+        as a vector, so a burst costs a fixed number of NumPy calls. Returns the
+        pool rows of the new particles. With `advance=False` the particles keep
+        their birth state; particle k of the batch is born at
+        t0 + k * (t1 - t0) / count.
+
+        At most max_particles of this system's particles are alive at once;
+        `live_count` is how many are already alive (counted in the pool when
+        omitted). A fixed-capacity pool also caps the batch at its free rows.
+        """
+        if live_count is None:
+            live_count = self.live_count()
+        count = min(int(count), self.max_particles - live_count)
+        if self.pool.fixed_capacity:
+            count = min(count, self.pool.capacity - self.pool.count)
+        if count <= 0:
+            return slice(self.pool.count, self.pool.count)
+
+        # Get initial properties from EmitterProperties, potentially animated via EffectIR.
+        # All parameters are fetched in one sampler call.
+        params = self._get_params_at_time(t0)
+        stream = self.random_stream
+        first = self._emitted_count
+        self._emitted_count += count
+        initial_pos = _param(params, "emitter_position", (0.0, 0.0))
 
         # Lifespan
-        lifespan_val = self._get_param_value_at_time("lifespan_range", current_time, None)
-        if isinstance(lifespan_val, tuple) and len(lifespan_val) == 2:
-            particle_lifespan = random.uniform(lifespan_val[0], lifespan_val[1])
-        else:
-            particle_lifespan = self._get_param_value_at_time("lifespan", current_time, 2.0)
-        particle_lifespan = max(0.001, particle_lifespan) # Ensure lifespan is positive
+        particle_lifespan = _draw_range(stream, _RNG_LIFESPAN, first, params.get("lifespan_range"), count, _param(params, "lifespan", 2.0))
+        particle_lifespan = np.maximum(particle_lifespan, 0.001) # Ensure lifespan is positive
 
         # Velocity
-        direction_vec_val = self._get_param_value_at_time("initial_direction_vector", current_time, (0.0, 1.0)) # Default up
-        speed_range_val = self._get_param_value_at_time("speed_range", current_time, (50.0, 150.0))
-        emission_angle_range_deg_val = self._get_param_value_at_time("emission_angle_range_deg", current_time, (0.0, 0.0))
+        dir_x, dir_y = _param(params, "initial_direction_vector", (0.0, 1.0)) # Default up
+        speed_range_val = _param(params, "speed_range", (50.0, 150.0))
+        emission_angle_range_deg_val = _param(params, "emission_angle_range_deg", (0.0, 0.0))
 
-        speed = random.uniform(speed_range_val[0], speed_range_val[1])
-        emission_angle_offset_deg = random.uniform(emission_angle_range_deg_val[0], emission_angle_range_deg_val[1])
-        
-        # Normalize direction_vec_val
-        dir_x, dir_y = direction_vec_val
-        len_dir = math.sqrt(dir_x**2 + dir_y**2)
-        if len_dir == 0: # Avoid division by zero, default to (0,1) if zero vector
-            norm_dir_x, norm_dir_y = 0.0, 1.0
-        else:
-            norm_dir_x, norm_dir_y = dir_x / len_dir, dir_y / len_dir
-            
-        base_angle_rad = math.atan2(norm_dir_y, norm_dir_x)
-        final_angle_rad = base_angle_rad + math.radians(emission_angle_offset_deg)
-        
-        initial_vel = (
-            speed * math.cos(final_angle_rad),
-            speed * math.sin(final_angle_rad)
-        )
+        speed = stream.uniform(_RNG_SPEED, first, count, speed_range_val[0], speed_range_val[1])
+        emission_angle_offset_deg = stream.uniform(_RNG_ANGLE, first, count,
+                                                   emission_angle_range_deg_val[0], emission_angle_range_deg_val[1])
+
+        # A zero direction vector defaults to straight up
+        base_angle_rad = math.atan2(dir_y, dir_x) if (dir_x or dir_y) else math.pi / 2
+        final_angle_rad = base_angle_rad + np.radians(emission_angle_offset_deg)
+        initial_vel = np.column_stack((speed * np.cos(final_angle_rad), speed * np.sin(final_angle_rad)))
 
         # Initial Size (base for size_over_lifespan curve)
-        size_val = self._get_param_value_at_time("size_range", current_time, None)
-        if isinstance(size_val, tuple) and len(size_val) == 2:
-            born_size = random.uniform(size_val[0], size_val[1])
-        else:
-            born_size = self._get_param_value_at_time("particle_size", current_time, 5.0)
+        born_size = _draw_range(stream, _RNG_SIZE, first, params.get("size_range"), count, _param(params, "particle_size", 5.0))
         
         # Initial Color (base for color/opacity_over_lifespan curves)
-        born_color = self._get_param_value_at_time("particle_color", current_time, (1.0, 1.0, 1.0, 1.0))
+        born_color = _param(params, "particle_color", (1.0, 1.0, 1.0, 1.0))
 
-        # Rotation
-        rot_val = self._get_param_value_at_time("rotation_range_deg", current_time, None)
-        if isinstance(rot_val, tuple) and len(rot_val) == 2:
-            initial_rotation = random.uniform(rot_val[0], rot_val[1])
-        else:
-            initial_rotation = self._get_param_value_at_time("initial_rotation_deg", current_time, 0.0)
-
-        # Angular Velocity
-        ang_vel_val = self._get_param_value_at_time("angular_velocity_range_dps", current_time, None)
-        if isinstance(ang_vel_val, tuple) and len(ang_vel_val) == 2:
-            initial_angular_velocity = random.uniform(ang_vel_val[0], ang_vel_val[1])
-        else:
-            initial_angular_velocity = self._get_param_value_at_time("initial_angular_velocity_dps", current_time, 0.0)
+        # Rotation and Angular Velocity
+        initial_rotation = _draw_range(stream, _RNG_ROTATION, first, params.get("rotation_range_deg"), count, _param(params, "initial_rotation_deg", 0.0))
+        initial_angular_velocity = _draw_range(stream, _RNG_ANGULAR_VELOCITY, first, params.get("angular_velocity_range_dps"),
+                                               count, _param(params, "initial_angular_velocity_dps", 0.0))
             
         # Acceleration
-        particle_acceleration = self._get_param_value_at_time("acceleration_vector", current_time, (0.0, 0.0))
-
-        # Fetch "over lifetime" curve data
-        p_size_curve = self._get_param_value_at_time("size_over_lifespan", current_time, None)
-        p_opacity_curve = self._get_param_value_at_time("opacity_over_lifespan", current_time, None)
-        p_color_curve = self._get_param_value_at_time("color_over_lifespan", current_time, None)
+        particle_acceleration = _param(params, "acceleration_vector", (0.0, 0.0))
 
-        # Fetch Sprite Definition ID
-        p_sprite_definition_id = self._get_param_value_at_time("sprite_definition_id", current_time, None)
+        # "Over lifetime" curve data
+        self.lifetime_curves.update(params.get("size_over_lifespan"), params.get("opacity_over_lifespan"),
+                                    params.get("color_over_lifespan"))
 
-        # Fetch Behavior Flags
-        p_orient_to_velocity = self._get_param_value_at_time("orient_to_velocity", current_time, False)
+        p_sprite_definition_id = params.get("sprite_definition_id")
+        p_orient_to_velocity = params.get("orient_to_velocity", False)
 
-        particle = Particle(
+        rows = self.pool.spawn(
+            count,
             position=initial_pos,
             velocity=initial_vel,
             acceleration=particle_acceleration,
@@ -250,93 +209,105 @@ class ParticleSystem:
             color=born_color, # Set initial effective color
             rotation=initial_rotation,
             angular_velocity=initial_angular_velocity,
-            size_curve=p_size_curve if isinstance(p_size_curve, list) else None,
-            opacity_curve=p_opacity_curve if isinstance(p_opacity_curve, list) else None,
-            color_curve=p_color_curve if isinstance(p_color_curve, list) else None,
             sprite_definition_id=p_sprite_definition_id if isinstance(p_sprite_definition_id, str) else None,
-            orient_to_velocity=p_orient_to_velocity if isinstance(p_orient_to_velocity, bool) else False
+            orient_to_velocity=p_orient_to_velocity if isinstance(p_orient_to_velocity, bool) else False,
+            emitter_index=self.emitter_index
         )
-        self.particles.append(particle)
+
+        # Particle k is born at t0 + k * (t1 - t0) / count and has lived until t1
+        if advance and t1 > t0:
+            elapsed = (t1 - t0) * (1.0 - np.arange(count) / count)
+            self.pool.integrate(elapsed, start=rows.start)
+        return rows
 
     def update(self, dt: float, current_time: float):
-        # 1. Emit new particles
+        # 1. Advance every live particle at once
+        self.pool.integrate(dt)
+
+        # 2. Emit new particles spread over this step, already advanced to its end
+        self.emit_step(dt, current_time)
+
+        # 3. Remove dead particles (in-place compaction)
+        self.pool.remove_dead()
+
+        # 4. Apply "over lifetime" curves to the survivors
+        self._apply_lifetime_curves()
+
+    def live_count(self) -> int:
+        """Particles of this system in the pool (all of them when the pool is its own)."""
+        n = self.pool.count
+        if self.owns_pool:
+            return n
+        return int(np.count_nonzero(self.pool.emitter_index[:n] == self.emitter_index))
+
+    def emit_step(self, dt: float, current_time: float, advance: bool = True,
+                  live_count: Optional[int] = None) -> slice:
+        """Emit this step's share of emission_rate, born over [current_time, current_time + dt).
+
+        `live_count` is passed on to emit_batch.
+        """
         if self.emitter_properties:
             emission_rate = self._get_param_value_at_time("emission_rate", current_time, 10.0)
             num_to_emit_float = emission_rate * dt + self._emission_debt
             num_to_emit_int = math.floor(num_to_emit_float)
             self._emission_debt = num_to_emit_float - num_to_emit_int
+            if num_to_emit_int > 0:
+                return self.emit_batch(num_to_emit_int, current_time, current_time + dt, advance,
+                                       live_count) # Capped at max_particles
+        return slice(self.pool.count, self.pool.count)
+
+    def reset(self):
+        """Drop all particles and rewind emission, so the next run replays identically."""
+        self.pool.clear()
+        self._emission_debt = 0.0
+        self._emitted_count = 0
+
+    def _apply_lifetime_curves(self):
+        pool = self.pool
+        n = pool.count
+        if n == 0:
+            return
+        norm_age = pool.normalized_age()
+        curves = self.lifetime_curves
 
-            for _ in range(num_to_emit_int):
-                if len(self.particles) < self.max_particles:
-                    self.emit_particle(current_time) 
-                else:
-                    break # Stop emitting if max particles reached
-        
-        # 2. Update existing particles
-        # Iterate backwards if removing items, or create a new list
-        # For now, just update and then filter
-        for p in self.particles:
-            p.update(dt)
-            # TODO: Apply affectors or update properties over lifetime based on timelines
-            # e.g., color_over_life, size_over_life from emitter/effect_ir
-
-        # 3. Remove dead particles
-        self.particles = [p for p in self.particles if p.is_alive]
-
-    def get_alive_particles(self) -> List[Particle]:
-        # This could simply return self.particles if removal is handled in update.
-        # Or, if filtering is preferred here:
-        return [p for p in self.particles if p.is_alive]
+        workspace = self._curve_workspace
 
-    def __repr__(self):
-        return f"<ParticleSystem emitter_id='{self.emitter_id}' particles={len(self.particles)} alive={len(self.get_alive_particles())}>"
+        # Size curve acts as a multiplier on initial_size
+        if curves.size:
+            size = pool.size[:n]
+            curves.size.sample(norm_age, out=size[:, None], workspace=workspace)
+            size *= pool.initial_size[:n]
 
-# --- Interpolation Helper Functions ---
+        # Base color comes from the color curve (full RGBA) or initial_color
+        color = pool.color[:n]
+        if curves.color:
+            curves.color.sample(norm_age, out=color, workspace=workspace)
+        else:
+            color[...] = pool.initial_color[:n]
 
-def _interpolate_scalar_curve(curve_points: List[Tuple[float, float]], normalized_time: float) -> float:
-    if not curve_points:
-        return 1.0 # Default to 1.0 (no change) if no curve
+        # Opacity curve directly sets the final alpha if present
+        if curves.opacity:
+            curves.opacity.sample(norm_age, out=color[:, 3:], workspace=workspace)
 
-    curve_points.sort(key=lambda p: p[0]) # Ensure sorted by time
+    def get_alive_particles(self) -> List[ParticleView]:
+        # Dead particles are compacted away in update(), so every pooled row is alive.
+        return self.pool.views()
 
-    if normalized_time <= curve_points[0][0]:
-        return curve_points[0][1]
-    if normalized_time >= curve_points[-1][0]:
-        return curve_points[-1][1]
+    def __repr__(self):
+        return f"<ParticleSystem emitter_id='{self.emitter_id}' particles={self.pool.count}>"
 
-    for i in range(len(curve_points) - 1):
-        p1 = curve_points[i]
-        p2 = curve_points[i+1]
-        if p1[0] <= normalized_time < p2[0]:
-            if p2[0] == p1[0]: # Avoid division by zero if times are identical
-                return p1[1]
-            t_ratio = (normalized_time - p1[0]) / (p2[0] - p1[0])
-            return p1[1] + (p2[1] - p1[1]) * t_ratio
-    
-    return curve_points[-1][1] # Should ideally be caught by checks above
-
-def _interpolate_color_curve(curve_points: List[Tuple[float, Tuple[float,float,float,float]]], normalized_time: float) -> Tuple[float,float,float,float]:
-    if not curve_points:
-        return (1.0, 1.0, 1.0, 1.0) # Default to white if no curve
-
-    curve_points.sort(key=lambda p: p[0]) # Ensure sorted by time
-
-    if normalized_time <= curve_points[0][0]:
-        return curve_points[0][1]
-    if normalized_time >= curve_points[-1][0]:
-        return curve_points[-1][1]
-
-    for i in range(len(curve_points) - 1):
-        p1_time, p1_color = curve_points[i]
-        p2_time, p2_color = curve_points[i+1]
-        if p1_time <= normalized_time < p2_time:
-            if p2_time == p1_time: # Avoid division by zero
-                return p1_color
-            t_ratio = (normalized_time - p1_time) / (p2_time - p1_time)
-            interpolated_rgba = tuple(c1 + (c2 - c1) * t_ratio for c1, c2 in zip(p1_color, p2_color))
-            return interpolated_rgba # type: ignore
-            
-    return curve_points[-1][1] # Should ideally be caught by checks above
+def _param(params: dict, param_name: str, default: Any) -> Any:
+    val = params.get(param_name)
+    return default if val is None else val
+
+# Random stream channels, one per randomized particle attribute
+_RNG_LIFESPAN, _RNG_SPEED, _RNG_ANGLE, _RNG_SIZE, _RNG_ROTATION, _RNG_ANGULAR_VELOCITY = range(6)
+
+def _draw_range(stream: RandomStream, channel: int, first: int, range_val: Any, count: int, fallback: Any) -> Any:
+    # (min, max) tuples are drawn uniformly per particle; anything else falls back to a fixed value
+    if isinstance(range_val, tuple) and len(range_val) == 2:
+        return stream.uniform(channel, first, count, range_val[0], range_val[1])
+    return fallback
 
 if __name__ == '__main__':
     print("Running Particle System Demo...")
@@ -431,7 +402,7 @@ if __name__ == '__main__':
         max_particles_seen = max(max_particles_seen, alive_count)
         
         if current_time == 0 or (int(current_time / dt) % 30 == 0) : # Print every 30 frames approx
-             print(f"Time: {current_time:.2f}s, Particles Alive: {alive_count}, Total in system: {len(ps.particles)}")
+             print(f"Time: {current_time:.2f}s, Particles Alive: {alive_count}, Total in system: {ps.pool.count}")
         
         # Example of accessing particle data (e.g., for rendering)
         # if alive_count > 0 and (int(current_time / dt) % 60 == 0):
@@ -0,0 +1,196 @@
+import contextlib
+import csv
+import gc
+import json
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+# Preview frame phases, in pipeline order
+PROFILE_PHASES = ("emit", "update", "curves", "vertices", "draw")
+DEFAULT_PROFILE_FRAMES = 600 # Ten seconds at 60 fps
+
+NO_PROFILE = contextlib.nullcontext() # Stand-in for FrameProfiler.phase() when not profiling
+
+
+class FrameProfiler:
+    """Per-frame timings and counters in a fixed-size ring buffer.
+
+    Phase times may be added from any thread (the simulation worker adds
+    emit/update/curves, the UI thread vertices/draw); they accumulate until
+    end_frame() commits them as one row together with the frame time, the
+    canvas instruction count, draw calls and GL state changes saved by
+    batching, particle counts per emitter and the time spent in garbage
+    collection since the previous frame. Only the newest
+    `capacity` frames are kept.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_PROFILE_FRAMES, phases: Sequence[str] = PROFILE_PHASES):
+        self.capacity: int = capacity
+        self.phases: Sequence[str] = tuple(phases)
+        self._phase_index: Dict[str, int] = {name: i for i, name in enumerate(self.phases)}
+        self.phase_times = np.zeros((capacity, len(self.phases))) # Seconds
+        self.frame_times = np.zeros(capacity) # Seconds between frames
+        self.instruction_counts = np.zeros(capacity, dtype=np.int64)
+        self.draw_calls = np.zeros(capacity, dtype=np.int64)
+        self.state_changes_saved = np.zeros(capacity, dtype=np.int64) # See core.render_queue
+        self.gc_times = np.zeros(capacity)
+        self.gc_collections = np.zeros(capacity, dtype=np.int64)
+        self.particle_counts: Dict[str, np.ndarray] = {} # emitter_id -> counts, 0 while absent
+        self.frames: int = 0 # Frames committed since creation
+        self._lock = threading.Lock()
+        self._pending = np.zeros(len(self.phases))
+        self._pending_gc = 0.0
+        self._pending_collections = 0
+        self._gc_started: Optional[float] = None
+        self._last_frame: Optional[float] = None
+        self._gc_hooked = False
+
+    def __len__(self) -> int:
+        return min(self.frames, self.capacity)
+
+    # --- Recording ---------------------------------------------------------
+
+    def add(self, phase: str, seconds: float):
+        with self._lock:
+            self._pending[self._phase_index[phase]] += seconds
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def end_frame(self, particle_counts: Optional[Dict[str, int]] = None, instruction_count: int = 0,
+                  draw_calls: int = 0, state_changes_saved: int = 0):
+        """Commit everything recorded since the previous call as one frame."""
+        now = time.perf_counter()
+        row = self.frames % self.capacity
+        with self._lock:
+            self.phase_times[row] = self._pending
+            self._pending[:] = 0.0
+            self.gc_times[row] = self._pending_gc
+            self.gc_collections[row] = self._pending_collections
+            self._pending_gc = 0.0
+            self._pending_collections = 0
+        self.frame_times[row] = now - self._last_frame if self._last_frame is not None else 0.0
+        self._last_frame = now
+        self.instruction_counts[row] = instruction_count
+        self.draw_calls[row] = draw_calls
+        self.state_changes_saved[row] = state_changes_saved
+        for counts in self.particle_counts.values():
+            counts[row] = 0
+        for emitter_id, count in (particle_counts or {}).items():
+            counts = self.particle_counts.get(emitter_id)
+            if counts is None:
+                counts = self.particle_counts[emitter_id] = np.zeros(self.capacity, dtype=np.int64)
+            counts[row] = count
+        self.frames += 1
+
+    def hook_gc(self):
+        """Start measuring garbage collection pauses (see gc.callbacks)."""
+        if not self._gc_hooked:
+            gc.callbacks.append(self._on_gc)
+            self._gc_hooked = True
+
+    def unhook_gc(self):
+        if self._gc_hooked:
+            gc.callbacks.remove(self._on_gc)
+            self._gc_hooked = False
+            self._gc_started = None
+
+    def _on_gc(self, event: str, info: dict):
+        if event == "start":
+            self._gc_started = time.perf_counter()
+        elif self._gc_started is not None:
+            pause = time.perf_counter() - self._gc_started
+            self._gc_started = None
+            with self._lock:
+                self._pending_gc += pause
+                self._pending_collections += 1
+
+    def clear(self):
+        with self._lock:
+            self._pending[:] = 0.0
+            self._pending_gc = 0.0
+            self._pending_collections = 0
+        self.particle_counts.clear()
+        self.frames = 0
+        self._last_frame = None
+
+    # --- Reading -----------------------------------------------------------
+
+    def _order(self) -> np.ndarray:
+        # Ring rows from oldest to newest
+        count = len(self)
+        return (np.arange(count) + self.frames - count) % self.capacity
+
+    def recent(self, name: str) -> np.ndarray:
+        """Values of a phase, 'frame', 'gc', 'instructions', 'draw_calls' or
+        'state_changes_saved', oldest frame first."""
+        order = self._order()
+        if name == "frame":
+            return self.frame_times[order]
+        if name == "gc":
+            return self.gc_times[order]
+        if name == "instructions":
+            return self.instruction_counts[order]
+        if name == "draw_calls":
+            return self.draw_calls[order]
+        if name == "state_changes_saved":
+            return self.state_changes_saved[order]
+        return self.phase_times[order, self._phase_index[name]]
+
+    def latest_particle_counts(self) -> Dict[str, int]:
+        if not self.frames:
+            return {}
+        row = (self.frames - 1) % self.capacity
+        return {emitter_id: int(counts[row]) for emitter_id, counts in self.particle_counts.items()}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Mean, 95th percentile and maximum of every phase, the frame time and GC, in seconds."""
+        result = {}
+        if not len(self):
+            return result
+        for name in self.phases + ("frame", "gc"):
+            values = self.recent(name)
+            result[name] = {"mean": float(values.mean()), "p95": float(np.percentile(values, 95)),
+                            "max": float(values.max())}
+        return result
+
+    def rows(self) -> List[Dict[str, float]]:
+        """One dict per buffered frame, oldest first."""
+        order = self._order()
+        first = self.frames - len(self)
+        emitter_ids = list(self.particle_counts)
+        rows = []
+        for offset, row in enumerate(order.tolist()):
+            record = {"frame": first + offset, "frame_ms": self.frame_times[row] * 1000.0}
+            for i, name in enumerate(self.phases):
+                record[f"{name}_ms"] = self.phase_times[row, i] * 1000.0
+            record["gc_ms"] = self.gc_times[row] * 1000.0
+            record["gc_collections"] = int(self.gc_collections[row])
+            record["instructions"] = int(self.instruction_counts[row])
+            record["draw_calls"] = int(self.draw_calls[row])
+            record["state_changes_saved"] = int(self.state_changes_saved[row])
+            for emitter_id in emitter_ids:
+                record[f"particles:{emitter_id}"] = int(self.particle_counts[emitter_id][row])
+            rows.append(record)
+        return rows
+
+    def export(self, path: str):
+        """Write the buffered frames to `path`: JSON if it ends in .json, CSV otherwise."""
+        rows = self.rows()
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"phases": list(self.phases), "summary": self.summary(), "frames": rows}, f, indent=1)
+            return
+        fieldnames = list(rows[0]) if rows else ["frame", "frame_ms"]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
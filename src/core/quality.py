@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+try:
+    from .particle_pool import ParticlePool
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from particle_pool import ParticlePool
+
+DEFAULT_FRAME_BUDGET = 0.010 # Seconds of preview work per frame, leaving the rest of 1/60 s to the editor
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    name: str
+    particle_stride: int = 1 # Draw every n-th particle (by particle id, so the choice is stable)
+    min_pixel_size: float = 0.0 # Skip particles smaller than this on screen
+    resolution_scale: float = 1.0 # Render target size relative to the preview
+
+
+# Cheapest degradations first; each level keeps the savings of the previous ones
+QUALITY_LEVELS = (
+    QualityLevel("full"),
+    QualityLevel("1/2 particles", particle_stride=2),
+    QualityLevel("1/2 particles, no sub-pixel", particle_stride=2, min_pixel_size=1.0),
+    QualityLevel("1/2 particles, half resolution", particle_stride=2, min_pixel_size=1.0, resolution_scale=0.5),
+    QualityLevel("1/4 particles, half resolution", particle_stride=4, min_pixel_size=1.0, resolution_scale=0.5),
+)
+
+
+def select_particles(pool: ParticlePool, rows: np.ndarray, level: QualityLevel, size_scale: float = 1.0) -> np.ndarray:
+    """The subset of `rows` drawn at `level`, in the same order."""
+    if level.particle_stride > 1:
+        rows = rows[pool.particle_id[rows] % level.particle_stride == 0]
+    if level.min_pixel_size > 0.0:
+        rows = rows[pool.size[rows] * size_scale >= level.min_pixel_size]
+    return rows
+
+
+class AdaptiveQuality:
+    """Picks a QualityLevel from measured frame times.
+
+    record() takes the time spent simulating and drawing each frame. When
+    both the frame and the smoothed time are over `budget` for
+    `degrade_frames` frames in a row (so isolated spikes are ignored),
+    quality drops one level; when the smoothed time stays under
+    `headroom * budget` for `restore_frames` frames, it goes back up one
+    level. The smoothing restarts after every change so each level is judged
+    on its own frames.
+
+    Only drawing is degraded: the simulation always runs at full fidelity so
+    scrubbing and export stay exact.
+    """
+
+    def __init__(self, budget: float = DEFAULT_FRAME_BUDGET, levels: Sequence[QualityLevel] = QUALITY_LEVELS,
+                 smoothing: float = 0.25, headroom: float = 0.6, degrade_frames: int = 3,
+                 restore_frames: int = 60):
+        if not levels:
+            raise ValueError("At least one quality level is required")
+        self.budget: float = budget
+        self.levels: Sequence[QualityLevel] = tuple(levels)
+        self.smoothing: float = smoothing
+        self.headroom: float = headroom
+        self.degrade_frames: int = degrade_frames
+        self.restore_frames: int = restore_frames
+        self.enabled: bool = True
+        self.index: int = 0
+        self.frame_time: Optional[float] = None # Smoothed seconds per frame at the current level
+        self._over: int = 0
+        self._under: int = 0
+
+    @property
+    def level(self) -> QualityLevel:
+        return self.levels[self.index] if self.enabled else self.levels[0]
+
+    def reset(self):
+        self.index = 0
+        self._restart()
+
+    def record(self, seconds: float) -> bool:
+        """Account one frame's work; returns True when the quality level changed."""
+        if not self.enabled:
+            return False
+        if self.frame_time is None:
+            self.frame_time = seconds
+        else:
+            self.frame_time += self.smoothing * (seconds - self.frame_time)
+
+        if self.frame_time > self.budget and seconds > self.budget:
+            self._over += 1
+            self._under = 0
+            if self._over >= self.degrade_frames and self.index < len(self.levels) - 1:
+                self.index += 1
+                self._restart()
+                return True
+        elif self.frame_time < self.headroom * self.budget and seconds < self.budget:
+            self._under += 1
+            self._over = 0
+            if self._under >= self.restore_frames and self.index > 0:
+                self.index -= 1
+                self._restart()
+                return True
+        else:
+            self._over = self._under = 0
+        return False
+
+    def _restart(self):
+        self.frame_time = None
+        self._over = self._under = 0
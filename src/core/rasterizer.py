@@ -0,0 +1,330 @@
+import os
+import struct
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .asset_import import AssetImporter, ImportedAsset, load_rgba
+    from .particle_pool import ParticlePool
+    from .sprite_batch import SpriteTable, disc_pixels, expand_flipbooks, quad_corners
+    from .simulator import EffectSimulator, EmitterParticles
+    from .checkpoints import CheckpointTimeline
+    from .ir import EffectIR
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from asset_import import AssetImporter, ImportedAsset, load_rgba
+    from particle_pool import ParticlePool
+    from sprite_batch import SpriteTable, disc_pixels, expand_flipbooks, quad_corners
+    from simulator import EffectSimulator, EmitterParticles
+    from checkpoints import CheckpointTimeline
+    from ir import EffectIR
+
+BLEND_MODES = ("alpha", "additive", "multiply", "screen")
+# Upper bound on candidate pixels processed at once (memory vs. NumPy call overhead)
+DEFAULT_MAX_FRAGMENTS = 1 << 21
+
+
+def encode_png(pixels: np.ndarray, level: int = 6) -> bytes:
+    """A (height, width, 4) uint8 array, top row first, as RGBA PNG file contents."""
+    height, width = pixels.shape[:2]
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8) # Filter byte 0 (None) per row
+    raw[:, 1:] = np.ascontiguousarray(pixels, dtype=np.uint8).reshape(height, width * 4)
+
+    def chunk(tag: bytes, payload: bytes) -> bytes:
+        return struct.pack(">I", len(payload)) + tag + payload + struct.pack(">I", zlib.crc32(tag + payload) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0) # 8-bit RGBA
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw.tobytes(), level))
+            + chunk(b"IEND", b""))
+
+
+def write_png(path: str, pixels: np.ndarray):
+    """Write a (height, width, 4) uint8 array, top row first, as an RGBA PNG."""
+    with open(path, "wb") as f:
+        f.write(encode_png(pixels))
+
+
+class SoftwareRasterizer:
+    """Composites particle sprites into an RGBA frame with NumPy only.
+
+    Sprites come from the EffectIR's SpriteDefinition regions (nearest
+    sampling, like the preview), flipbooks from their current frame's
+    region; particles without a sprite are drawn as discs. Sprite images
+    are used in render format (premultiplied, see core.asset_import), read
+    through `importer` when one is given and decoded with `image_loader`
+    otherwise. Blend modes follow the preview's premultiplied-alpha GL blend
+    functions (mesh_renderer.BLEND_FUNCS).
+
+    Every particle covers its quad's bounding box with candidate pixels; all
+    candidates of a batch are transformed, sampled and composited in a few
+    vectorized passes. Order-dependent blending is exact: fragments of a
+    pixel are folded in draw order as a product of per-fragment affine maps
+    (dst' = dst * m + b).
+
+    Simulation coordinates map to pixels as (position - origin) * scale with
+    y up; frames are returned top row first.
+    """
+
+    def __init__(self, effect_ir: EffectIR, width: int, height: int,
+                 origin: Tuple[float, float] = (0.0, 0.0), scale: float = 1.0,
+                 background: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0),
+                 image_loader: Callable[[str], np.ndarray] = load_rgba,
+                 max_fragments: int = DEFAULT_MAX_FRAGMENTS, importer: Optional[AssetImporter] = None):
+        self.effect_ir: EffectIR = effect_ir
+        self.width: int = int(width)
+        self.height: int = int(height)
+        self.origin: Tuple[float, float] = origin
+        self.scale: float = scale
+        self.background: Tuple[float, float, float, float] = background
+        self.image_loader = image_loader
+        self.importer: Optional[AssetImporter] = importer
+        self.max_fragments: int = max_fragments
+        self._asset_images: Dict[str, Optional[ImportedAsset]] = {}
+        self._sprite_key: Optional[tuple] = None
+        self._build_sprite_atlas([])
+
+    def set_asset_image(self, asset_id: str, pixels: np.ndarray):
+        """Use `pixels` ((h, w, 4) uint8 straight alpha, top row first) instead of loading the asset's file."""
+        self._asset_images[asset_id] = ImportedAsset.from_pixels(asset_id, pixels)
+        self._sprite_key = None
+
+    def _asset_image(self, asset_id: str) -> Optional[ImportedAsset]:
+        if asset_id not in self._asset_images:
+            asset = self.effect_ir.get_sprite_asset(asset_id)
+            image = None
+            if asset:
+                try:
+                    if self.importer:
+                        image = self.importer.load(asset)
+                    else:
+                        image = ImportedAsset.from_pixels(asset_id, self.image_loader(asset.path))
+                except Exception as e:
+                    print(f"Warning: Could not load sprite asset '{asset.path}': {e}")
+            self._asset_images[asset_id] = image
+        return self._asset_images[asset_id]
+
+    def _build_sprite_atlas(self, sprite_ids: Sequence[Optional[str]]):
+        # All sprite regions flattened into one texel array; the last entry is the disc
+        row_ids, flipbooks = expand_flipbooks(sprite_ids, self.effect_ir)
+        self._sprite_table = SpriteTable(len(row_ids)) # Only its flipbook frames are used
+        for flipbook in flipbooks:
+            self._sprite_table.set_flipbook(*flipbook)
+        regions: List[np.ndarray] = []
+        pivots = []
+        for sprite_id in row_ids:
+            region = pivot = None
+            definition = self.effect_ir.get_sprite_definition(sprite_id) if sprite_id else None
+            if definition:
+                image = self._asset_image(definition.asset_id)
+                _, _, w, h = definition.region
+                if image is not None and w > 0 and h > 0:
+                    region, pivot = image.crop(definition.region), definition.pivot
+            regions.append(region if region is not None else disc_pixels())
+            pivots.append(pivot if pivot is not None else (0.5, 0.5))
+        regions.append(disc_pixels())
+        pivots.append((0.5, 0.5))
+
+        self._region_height = np.array([r.shape[0] for r in regions], dtype=np.int64)
+        self._region_width = np.array([r.shape[1] for r in regions], dtype=np.int64)
+        self._region_offset = np.concatenate([[0], np.cumsum(self._region_height * self._region_width)[:-1]])
+        self._texels = np.concatenate([r.reshape(-1, 4) for r in regions]).astype(np.float64) / 255.0
+        self._pivot = np.array(pivots, dtype=np.float64)
+        self._aspect = self._region_height / self._region_width
+
+    def _update_sprites(self, pool: ParticlePool):
+        key = (len(pool.sprite_ids), len(self.effect_ir.sprite_definitions), len(self.effect_ir.flipbooks))
+        if key != self._sprite_key:
+            self._sprite_key = key
+            self._build_sprite_atlas(pool.sprite_ids)
+
+    def new_frame(self) -> np.ndarray:
+        """Float framebuffer, (height * width, 4), bottom row first, filled with the background."""
+        frame = np.empty((self.height * self.width, 4), dtype=np.float64)
+        frame[:] = self.background
+        return frame
+
+    def render(self, pool: ParticlePool, groups: Sequence[Tuple[str, object]]) -> np.ndarray:
+        """Render (blend_mode, rows) groups in draw order; returns (height, width, 4) uint8."""
+        frame = self.new_frame()
+        for blend_mode, rows in groups:
+            self.composite(frame, pool, rows, blend_mode)
+        return self.to_image(frame)
+
+    def render_views(self, pool: ParticlePool, views: Sequence[EmitterParticles]) -> np.ndarray:
+        return self.render(pool, [(view.blending_mode, view.rows) for view in views])
+
+    def to_image(self, frame: np.ndarray) -> np.ndarray:
+        image = np.clip(frame * 255.0 + 0.5, 0, 255).astype(np.uint8).reshape(self.height, self.width, 4)
+        return np.ascontiguousarray(image[::-1]) # Framebuffer is y-up
+
+    def composite(self, frame: np.ndarray, pool: ParticlePool, rows, blend_mode: str):
+        """Blend the particles at `rows` (slice or index array, in draw order) into `frame`."""
+        if isinstance(rows, slice):
+            rows = np.arange(*rows.indices(pool.count))
+        if len(rows) == 0:
+            return
+        self._update_sprites(pool)
+        sprite = self._sprite_table.sprite_rows(pool, rows).astype(np.int64)
+        sprite[sprite < 0] = len(self._region_width) - 1 # Disc
+        position = (pool.position[rows] - self.origin) * self.scale
+        size = pool.size[rows] * self.scale
+        rotation = pool.rotation[rows]
+        color = pool.color[rows] # Premultiplied, like the sprite texels
+        color[:, :3] *= color[:, 3:]
+        pivot = self._pivot[sprite]
+        aspect = self._aspect[sprite]
+
+        x, y = quad_corners(position, size, rotation, pivot, aspect)
+        x0 = np.clip(np.floor(x.min(axis=1)), 0, self.width).astype(np.int64)
+        x1 = np.clip(np.ceil(x.max(axis=1)), 0, self.width).astype(np.int64)
+        y0 = np.clip(np.floor(y.min(axis=1)), 0, self.height).astype(np.int64)
+        y1 = np.clip(np.ceil(y.max(axis=1)), 0, self.height).astype(np.int64)
+        box_w, box_h = x1 - x0, y1 - y0
+        visible = np.flatnonzero((box_w > 0) & (box_h > 0) & (size > 0))
+        if visible.size == 0:
+            return
+
+        # Bucket particles by bounding-box side (powers of two) so small
+        # particles do not pay for the largest one's candidate grid.
+        side = np.maximum(box_w[visible], box_h[visible])
+        bucket = np.ceil(np.log2(side)).astype(np.int64)
+        # Chunks bound the candidate grids; covered fragments of all chunks are
+        # folded together since the draw order spans chunks.
+        fragments = []
+        for b in np.unique(bucket).tolist():
+            members = visible[bucket == b]
+            grid = 1 << b
+            per_chunk = max(1, self.max_fragments // (grid * grid))
+            for start in range(0, members.size, per_chunk):
+                fragments.append(self._fragments(members[start:start + per_chunk], grid, x0, y0, box_w, box_h,
+                                                 position, size, rotation, pivot, aspect, sprite, color))
+        pixel = np.concatenate([f[0] for f in fragments])
+        order_key = np.concatenate([f[1] for f in fragments])
+        src = np.concatenate([f[2] for f in fragments])
+        if pixel.size:
+            _fold_fragments(frame, pixel, order_key, src, blend_mode)
+
+    def _fragments(self, chunk, grid, x0, y0, box_w, box_h, position, size, rotation, pivot, aspect, sprite, color):
+        # Candidate pixels of each particle's bounding box -> covered fragments with source colors
+        dy, dx = np.divmod(np.arange(grid * grid), grid)
+        inside_box = (dx[None, :] < box_w[chunk, None]) & (dy[None, :] < box_h[chunk, None])
+        particle, cell = np.nonzero(inside_box)
+        p = chunk[particle]
+        px = x0[p] + dx[cell]
+        py = y0[p] + dy[cell]
+
+        # Pixel center in the sprite's local frame (inverse of quad_corners)
+        radians = np.radians(rotation[p])
+        cos, sin = np.cos(radians), np.sin(radians)
+        ox = px + 0.5 - position[p, 0]
+        oy = py + 0.5 - position[p, 1]
+        width = size[p]
+        u = (ox * cos + oy * sin) / width + pivot[p, 0]
+        v = (oy * cos - ox * sin) / (width * aspect[p]) + pivot[p, 1]
+        covered = (u >= 0.0) & (u < 1.0) & (v >= 0.0) & (v < 1.0)
+        p, px, py, u, v = p[covered], px[covered], py[covered], u[covered], v[covered]
+
+        s = sprite[p]
+        column = np.minimum((u * self._region_width[s]).astype(np.int64), self._region_width[s] - 1)
+        row = np.minimum(((1.0 - v) * self._region_height[s]).astype(np.int64), self._region_height[s] - 1)
+        texel = self._texels[self._region_offset[s] + row * self._region_width[s] + column]
+        return py * self.width + px, p, color[p] * texel
+
+
+def _blend_terms(src: np.ndarray, blend_mode: str) -> Tuple[np.ndarray, np.ndarray]:
+    # Per-fragment affine map dst' = dst * m + b for each GL blend function; `src` is premultiplied
+    sa = src[:, 3:4]
+    m = np.empty_like(src)
+    b = np.empty_like(src)
+    if blend_mode == "additive": # (ONE, ONE)
+        m[:] = 1.0
+        b[:] = src
+    elif blend_mode == "multiply": # (DST_COLOR, ONE_MINUS_SRC_ALPHA) / (ZERO, ONE)
+        m[:, :3] = src[:, :3] + 1.0 - sa
+        m[:, 3:] = 1.0
+        b[:] = 0.0
+    elif blend_mode == "screen": # (ONE, ONE_MINUS_SRC_COLOR) / (ONE, ONE_MINUS_SRC_ALPHA)
+        m[:, :3] = 1.0 - src[:, :3]
+        m[:, 3:] = 1.0 - sa
+        b[:] = src
+    else: # "alpha" and unknown modes: (ONE, ONE_MINUS_SRC_ALPHA)
+        m[:] = 1.0 - sa
+        b[:] = src
+    return m, b
+
+
+def _fold_fragments(frame: np.ndarray, pixel: np.ndarray, order_key: np.ndarray, src: np.ndarray, blend_mode: str):
+    # Applying dst' = dst * m_i + b_i for fragments i = 1..k of a pixel, in
+    # order, gives dst * prod(m) + sum_i b_i * prod_{j > i} m_j. The suffix
+    # products are computed for all pixels at once from segmented sums of
+    # log(m); zero factors are counted separately so they stay exact.
+    m, b = _blend_terms(src, blend_mode)
+    order = np.lexsort((order_key, pixel))
+    pixel, m, b = pixel[order], m[order], b[order]
+    count = pixel.size
+    starts = np.flatnonzero(np.concatenate(([True], pixel[1:] != pixel[:-1])))
+    lengths = np.diff(np.append(starts, count))
+    ends = starts + lengths - 1
+
+    zero = m <= 0.0
+    log_m = np.log(np.where(zero, 1.0, m))
+    log_prefix = np.vstack([np.zeros((1, 4)), np.cumsum(log_m, axis=0)])
+    zero_prefix = np.vstack([np.zeros((1, 4), dtype=np.int64), np.cumsum(zero, axis=0)])
+
+    segment_end = np.repeat(ends, lengths) + 1
+    inclusive = np.arange(1, count + 1)
+    suffix_log = log_prefix[segment_end] - log_prefix[inclusive]
+    suffix_zero = zero_prefix[segment_end] - zero_prefix[inclusive]
+    weight = np.where(suffix_zero > 0, 0.0, np.exp(suffix_log))
+    added = np.add.reduceat(b * weight, starts, axis=0)
+
+    total_log = log_prefix[ends + 1] - log_prefix[starts]
+    total_zero = zero_prefix[ends + 1] - zero_prefix[starts]
+    product = np.where(total_zero > 0, 0.0, np.exp(total_log))
+
+    targets = pixel[starts]
+    result = frame[targets] * product + added
+    np.clip(result, 0.0, 1.0, out=result) # Fixed-point framebuffer; only additive can exceed 1
+    frame[targets] = result
+
+
+class EffectFrameRenderer:
+    """Renders an EffectIR at arbitrary times without a GPU.
+
+    Simulation runs through a CheckpointTimeline, so frames match the
+    interactive preview step for step and out-of-order requests stay cheap.
+    """
+
+    def __init__(self, effect_ir: EffectIR, width: int, height: int, dt: float = 1.0 / 60.0,
+                 max_particles: int = 10000, **rasterizer_options):
+        self.simulator: EffectSimulator = EffectSimulator(effect_ir, max_particles=max_particles)
+        self.timeline: CheckpointTimeline = CheckpointTimeline(self.simulator, dt=dt)
+        self.rasterizer: SoftwareRasterizer = SoftwareRasterizer(effect_ir, width, height, **rasterizer_options)
+
+    def frame(self, time: float) -> np.ndarray:
+        """(height, width, 4) uint8 RGBA frame of the effect at `time`."""
+        simulator = self.timeline.seek(time)
+        return self.rasterizer.render_views(simulator.pool, simulator.emitter_views())
+
+    def thumbnail(self, time: float, size: int = 128) -> np.ndarray:
+        """Frame at `time` downsampled (box filter) so its longer side is at most `size`."""
+        image = self.frame(time)
+        factor = max(1, -(-max(image.shape[:2]) // size))
+        height, width = image.shape[0] // factor * factor, image.shape[1] // factor * factor
+        blocks = image[:height, :width].reshape(height // factor, factor, width // factor, factor, 4)
+        return (blocks.mean(axis=(1, 3)) + 0.5).astype(np.uint8)
+
+    def export_sequence(self, directory: str, fps: float = 30.0, start: float = 0.0,
+                        end: Optional[float] = None, prefix: str = "frame") -> List[str]:
+        """Write PNG frames for [start, end) (default: one loop) and return their paths."""
+        if end is None:
+            end = self.simulator.effect_ir.loop_duration
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for index in range(int(np.ceil((end - start) * fps - 1e-9))):
+            path = os.path.join(directory, f"{prefix}_{index:04d}.png")
+            write_png(path, self.frame(start + index / fps))
+            paths.append(path)
+        return paths
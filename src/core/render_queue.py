@@ -0,0 +1,77 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Sequence, Tuple
+
+# Blend modes whose result does not depend on draw order (dst + src, dst * src)
+ORDER_INDEPENDENT_BLEND_MODES = frozenset(("additive", "multiply"))
+_UNSET = object()
+
+
+@dataclass
+class DrawBatch:
+    blend_mode: str
+    texture_key: Hashable
+    payloads: List[Any] = field(default_factory=list) # Merged items, in draw order
+
+
+@dataclass
+class RenderQueueStats:
+    items: int = 0 # Draws without batching
+    draws: int = 0
+    state_changes: int = 0 # Blend switches and texture binds
+    unbatched_state_changes: int = 0
+
+    @property
+    def state_changes_saved(self) -> int:
+        return self.unbatched_state_changes - self.state_changes
+
+    def add(self, other: "RenderQueueStats"):
+        self.items += other.items
+        self.draws += other.draws
+        self.state_changes += other.state_changes
+        self.unbatched_state_changes += other.unbatched_state_changes
+
+
+def build_render_queue(items: Sequence[Tuple[str, Hashable, Any]]) -> List[DrawBatch]:
+    """Merge (blend_mode, texture_key, payload) draw items, given in draw order, into batches.
+
+    Consecutive items with the same blend mode and texture always merge.
+    Within a run of consecutive items of an order-independent blend mode,
+    all items of a texture merge into one batch wherever they appear, since
+    reordering them cannot change the result. Order-dependent modes (alpha,
+    screen) keep the artist's order exactly.
+    """
+    batches: List[DrawBatch] = []
+    run: Dict[Hashable, DrawBatch] = {} # texture_key -> batch of the current blend mode run
+    for blend_mode, texture_key, payload in items:
+        last = batches[-1] if batches else None
+        if last is not None and last.blend_mode != blend_mode:
+            run = {}
+        if blend_mode in ORDER_INDEPENDENT_BLEND_MODES:
+            batch = run.get(texture_key)
+        else:
+            batch = last if last is not None and (last.blend_mode, last.texture_key) == (blend_mode, texture_key) else None
+        if batch is None:
+            batch = DrawBatch(blend_mode, texture_key)
+            batches.append(batch)
+            run[texture_key] = batch
+        batch.payloads.append(payload)
+    return batches
+
+
+def count_state_changes(states: Sequence[Tuple[str, Hashable]]) -> int:
+    """GL state changes to draw (blend_mode, texture_key) pairs in order, switching
+    only what differs from the previous draw and restoring the UI's blend state at the end."""
+    changes = 0
+    blend_mode = texture_key = _UNSET # Particle blend functions differ from the UI's
+    for next_blend, next_texture in states:
+        changes += (next_blend != blend_mode) + (next_texture != texture_key)
+        blend_mode, texture_key = next_blend, next_texture
+    return changes + (blend_mode is not _UNSET)
+
+
+def render_queue_stats(item_count: int, batches: Sequence[DrawBatch]) -> RenderQueueStats:
+    """Stats of drawing `batches` versus one draw per item that sets its blend
+    function, binds its texture and restores the default blend function."""
+    return RenderQueueStats(items=item_count, draws=len(batches),
+                            state_changes=count_state_changes([(b.blend_mode, b.texture_key) for b in batches]),
+                            unbatched_state_changes=3 * item_count)
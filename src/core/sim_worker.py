@@ -0,0 +1,258 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .checkpoints import CheckpointTimeline
+    from .ir import EffectIR
+    from .layers import emitter_fingerprints
+    from .particle_pool import ParticlePool
+    from .simulator import EffectSimulator, EmitterParticles, group_emitter_rows
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from checkpoints import CheckpointTimeline
+    from ir import EffectIR
+    from layers import emitter_fingerprints
+    from particle_pool import ParticlePool
+    from simulator import EffectSimulator, EmitterParticles, group_emitter_rows
+
+# Columns a renderer needs; the rest of the simulation state stays in the worker
+FRAME_COLUMNS = ("particle_id", "emitter_index", "position", "size", "rotation", "color", "sprite_index",
+                 "age", "lifespan") # Age and lifespan pick flipbook frames
+
+
+class SimulationFrame:
+    """Drawable copy of one simulation step, published by a SimulationWorker."""
+
+    def __init__(self, capacity: int):
+        self.pool: ParticlePool = ParticlePool(capacity, fixed_capacity=True)
+        self.serial: int = 0 # Increases with every published frame
+        self.step: int = 0
+        self.time: float = 0.0
+        self.emitter_ids: List[str] = []
+        self.blending_modes: List[str] = []
+        self.fingerprints: Dict[str, int] = {} # emitter_fingerprints() of the simulated effect
+
+    def views(self) -> List[EmitterParticles]:
+        """One view per emitter, in draw order, like EffectSimulator.emitter_views()."""
+        return [EmitterParticles(emitter_id, index, self.blending_modes[index], self.pool, rows)
+                for index, (emitter_id, rows) in
+                enumerate(zip(self.emitter_ids, group_emitter_rows(self.pool, len(self.emitter_ids))))]
+
+    def copy_from(self, simulator: EffectSimulator, step: int, fingerprints: Dict[str, int]):
+        source, target = simulator.pool, self.pool
+        n = source.count
+        for name in FRAME_COLUMNS:
+            getattr(target, name)[:n] = getattr(source, name)[:n]
+        target.count = n
+        target.sprite_ids = list(source.sprite_ids)
+        self.step = step
+        self.time = simulator.time
+        self.emitter_ids = simulator.emitter_ids
+        self.blending_modes = [getattr(system.emitter_properties, "blending_mode", "alpha")
+                               for system in simulator.systems]
+        self.fingerprints = fingerprints
+
+
+class SimulationWorker:
+    """Runs an effect's simulation on a background thread.
+
+    The worker owns an EffectSimulator and its CheckpointTimeline. Every
+    step it copies the drawable columns into a back SimulationFrame and
+    swaps it with the front one, which the UI reads between acquire_frame()
+    and release_frame(); a swap waits for a read in progress, so neither side
+    ever sees a half-written frame and the UI thread only uploads and draws.
+
+    The UI steers the worker through a command queue: play(), pause(),
+    seek(), invalidate() and edit(). Commands run on the worker thread
+    between steps, and consecutive seeks are coalesced. Parameter changes
+    should go through edit(fn), which applies `fn` there and re-simulates;
+    structural edits made on the UI thread must be followed by invalidate().
+
+    While playing, steps are paced to `dt` of wall-clock time, wrapping at
+    the effect's loop duration. A step that takes longer delays the
+    following ones instead of queuing them up.
+
+    A command or step that raises pauses playback; the worker keeps serving
+    commands, and raise_error() re-raises the exception on the UI thread.
+    """
+
+    def __init__(self, effect_ir: EffectIR, max_particles: int = 10000, dt: float = 1.0 / 60.0,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.effect_ir: EffectIR = effect_ir
+        self.simulator: EffectSimulator = EffectSimulator(effect_ir, max_particles=max_particles)
+        self.timeline: CheckpointTimeline = CheckpointTimeline(self.simulator, dt=dt)
+        self.clock = clock
+        self.playing: bool = False
+        self.step_seconds: float = 0.0 # Wall time of the most recent simulation step
+        self._commands: "queue.Queue" = queue.Queue()
+        self._frames = [SimulationFrame(max_particles), SimulationFrame(max_particles)]
+        self._front: int = 0 # Index of the frame the UI may read
+        self._readers: int = 0
+        self._serial: int = 0
+        self._frame_ready = threading.Condition()
+        self._fingerprints: Dict[str, int] = {}
+        self._fingerprint_key: Optional[tuple] = None # (effect revision, simulator saturated)
+        self._thread: Optional[threading.Thread] = None
+        self._running: bool = False
+        self._error: Optional[Exception] = None # Raised by the worker thread, not yet reported
+
+    @property
+    def dt(self) -> float:
+        return self.timeline.dt
+
+    # --- UI thread ---------------------------------------------------------
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="SimulationWorker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 1.0):
+        if self._thread is None:
+            return
+        self._commands.put(("stop",))
+        self._thread.join(timeout)
+        self._thread = None
+
+    def play(self):
+        self._commands.put(("play",))
+
+    def pause(self):
+        self._commands.put(("pause",))
+
+    def seek(self, time: float):
+        """Show the state at `time`; playback, if on, continues from there."""
+        self._commands.put(("seek", time))
+
+    def invalidate(self):
+        """Re-simulate the current time after the effect was edited."""
+        self._commands.put(("invalidate",))
+
+    def edit(self, apply: Callable[[], None]):
+        """Run `apply()` (an IR change) on the worker thread, then re-simulate."""
+        self._commands.put(("edit", apply))
+
+    @property
+    def serial(self) -> int:
+        """Serial of the latest published frame (0 before the first)."""
+        return self._serial
+
+    def acquire_frame(self) -> SimulationFrame:
+        """The latest frame; valid until release_frame(), which must follow."""
+        with self._frame_ready:
+            self._readers += 1
+            return self._frames[self._front]
+
+    def release_frame(self):
+        with self._frame_ready:
+            self._readers -= 1
+            self._frame_ready.notify_all()
+
+    def raise_error(self):
+        """Re-raise the exception that last paused playback, if any (each is raised once)."""
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def wait_for_frame(self, after_serial: int, timeout: Optional[float] = None) -> bool:
+        """Block until a frame newer than `after_serial` is published; False on timeout."""
+        with self._frame_ready:
+            return self._frame_ready.wait_for(lambda: self._serial > after_serial, timeout)
+
+    # --- Worker thread -----------------------------------------------------
+
+    def _run(self):
+        next_step = self.clock()
+        while self._running:
+            timeout = max(0.0, next_step - self.clock()) if self.playing else None
+            try:
+                commands = [self._commands.get(timeout=timeout)]
+            except queue.Empty:
+                commands = []
+            while True:
+                try:
+                    commands.append(self._commands.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if commands:
+                    self.process(commands)
+                    next_step = max(next_step, self.clock() - self.dt)
+                if self.playing and self.clock() >= next_step:
+                    self.advance()
+                    next_step += self.dt
+                    # Behind by more than a step (slow step, debugger): resync rather than catch up
+                    next_step = max(next_step, self.clock() - self.dt)
+            except Exception as e:
+                # Keep serving commands; playback resumes with the next play()
+                self._error = e
+                self.playing = False
+
+    def process(self, commands: List[tuple]):
+        """Apply queued commands in order and publish the resulting frame.
+
+        An edit that raises is still followed by the re-simulation (it may have
+        changed the effect part way), and its exception is raised afterwards.
+        """
+        target = None
+        error = None
+        for command in commands:
+            kind = command[0]
+            if kind == "stop":
+                self._running = False
+                return
+            elif kind == "play":
+                self.playing = True
+            elif kind == "pause":
+                self.playing = False
+            elif kind == "seek":
+                target = command[1]
+            elif kind in ("invalidate", "edit"):
+                if kind == "edit":
+                    try:
+                        with self.effect_ir.lock: # Other threads snapshot the effect under it
+                            command[1]()
+                    except Exception as e:
+                        error = error or e
+                target = self.timeline.current_time if target is None else target
+                self.timeline.invalidate()
+                self._fingerprint_key = None
+        if target is not None:
+            self._timed(lambda: self.timeline.seek(target))
+            self._publish()
+        if error is not None:
+            raise error
+
+    def advance(self):
+        """One playback step, wrapping at the loop end, then publish."""
+        timeline = self.timeline
+        if timeline.current_time + timeline.dt > self.effect_ir.loop_duration:
+            self._timed(lambda: timeline.seek(0.0))
+        else:
+            self._timed(timeline.step)
+        self._publish()
+
+    def _timed(self, work: Callable):
+        started = time.perf_counter()
+        work()
+        self.step_seconds = time.perf_counter() - started
+
+    def _publish(self):
+        fingerprint_key = (self.effect_ir.revision, self.simulator.saturated)
+        if self._fingerprint_key != fingerprint_key:
+            self._fingerprints = emitter_fingerprints(self.effect_ir, self.simulator.emitter_ids,
+                                                      self.simulator.saturated)
+            self._fingerprint_key = fingerprint_key
+        back = self._frames[1 - self._front]
+        back.copy_from(self.simulator, self.timeline.current_step, self._fingerprints)
+        with self._frame_ready:
+            # The old front becomes the next back buffer, so no reader may hold it
+            self._frame_ready.wait_for(lambda: self._readers == 0)
+            self._serial += 1
+            back.serial = self._serial
+            self._front = 1 - self._front
+            self._frame_ready.notify_all()
@@ -0,0 +1,265 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .particle_pool import PARTICLE_COLUMNS, ParticlePool, ParticleView
+    from .particle_system import ParticleSystem
+    from .curves import LifetimeCurveBanks, DEFAULT_CURVE_TOLERANCE
+    from .ir import EffectIR
+    from .profiler import NO_PROFILE, FrameProfiler
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from particle_pool import PARTICLE_COLUMNS, ParticlePool, ParticleView
+    from particle_system import ParticleSystem
+    from curves import LifetimeCurveBanks, DEFAULT_CURVE_TOLERANCE
+    from ir import EffectIR
+    from profiler import NO_PROFILE, FrameProfiler
+
+
+@dataclass
+class EmitterParticles:
+    """The rows of one emitter inside the simulator's shared pool.
+
+    Column properties return copies gathered with `rows`, ready to hand to a
+    renderer or exporter. Only valid until the simulator is next stepped.
+    """
+    emitter_id: str
+    emitter_index: int
+    blending_mode: str
+    pool: ParticlePool
+    rows: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def particle_id(self) -> np.ndarray:
+        return self.pool.particle_id[self.rows]
+
+    @property
+    def position(self) -> np.ndarray:
+        return self.pool.position[self.rows]
+
+    @property
+    def color(self) -> np.ndarray:
+        return self.pool.color[self.rows]
+
+    @property
+    def size(self) -> np.ndarray:
+        return self.pool.size[self.rows]
+
+    @property
+    def rotation(self) -> np.ndarray:
+        return self.pool.rotation[self.rows]
+
+    @property
+    def sprite_index(self) -> np.ndarray:
+        return self.pool.sprite_index[self.rows]
+
+    def views(self) -> List[ParticleView]:
+        return [ParticleView(self.pool, int(i)) for i in self.rows]
+
+
+@dataclass
+class SimulationSnapshot:
+    """Complete state of an EffectSimulator at one instant; see EffectSimulator.snapshot()."""
+    time: float
+    revision: int
+    count: int
+    next_id: int
+    columns: Dict[str, np.ndarray] = field(default_factory=dict) # Live rows only
+    # Per emitter: (emission debt, emitted count, lifetime curve sources)
+    emitters: List[Tuple[float, int, Tuple[Any, Any, Any]]] = field(default_factory=list)
+    saturated: bool = False
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+
+def group_emitter_rows(pool: ParticlePool, emitter_count: int) -> List[np.ndarray]:
+    """Row indices of each emitter's particles in `pool`, in row order."""
+    emitter_index = pool.emitter_index[:pool.count]
+    # One stable sort groups every emitter's rows instead of a scan per emitter
+    order = np.argsort(emitter_index, kind="stable")
+    bounds = np.searchsorted(emitter_index[order], np.arange(emitter_count + 1))
+    return [order[bounds[index]:bounds[index + 1]] for index in range(emitter_count)]
+
+
+class EffectSimulator:
+    """Steps every emitter of an EffectIR together.
+
+    All emitters write into one shared ParticlePool, each particle tagged with
+    its emitter's index. A step integrates, compacts and applies the lifetime
+    curves of every particle with a single set of vectorized operations; the
+    only per-emitter work is computing how many particles to emit, so adding
+    emitters adds almost nothing to the cost of a frame.
+
+    Emission itself is delegated to one ParticleSystem per emitter (sharing
+    the pool), so random streams, emission debt and parameter sampling behave
+    exactly as for a standalone system.
+    """
+
+    def __init__(self, effect_ir: EffectIR, max_particles: int = 10000,
+                 curve_tolerance: float = DEFAULT_CURVE_TOLERANCE):
+        self.effect_ir: EffectIR = effect_ir
+        self.max_particles: int = max_particles
+        self.curve_tolerance: float = curve_tolerance
+        self.pool: ParticlePool = ParticlePool(capacity=max_particles, fixed_capacity=True)
+        self.time: float = 0.0
+        self.systems: List[ParticleSystem] = []
+        self._index_by_id: Dict[str, int] = {}
+        self._revision: Optional[int] = None
+        self.profiler: Optional[FrameProfiler] = None # Receives emit/update/curves timings when set
+        # The pool filled up since reset(): emission may have been cut short, so
+        # from then on each emitter's particles also depend on the others
+        self.saturated: bool = False
+
+        # Lifetime curves of all emitters, stacked and applied in one pass
+        self.curve_banks: LifetimeCurveBanks = LifetimeCurveBanks()
+        self._sync_emitters()
+
+    @property
+    def emitter_ids(self) -> List[str]:
+        return [system.emitter_id for system in self.systems]
+
+    def _sync_emitters(self):
+        """Match self.systems to effect_ir.emitters, keeping live particles of surviving emitters."""
+        self._revision = self.effect_ir.revision
+        emitter_ids = [emitter.emitter_id for emitter in self.effect_ir.emitters]
+        if emitter_ids == self.emitter_ids:
+            return
+        old_systems = {system.emitter_id: system for system in self.systems}
+        # Map old emitter indices to new ones; -1 marks removed emitters
+        remap = np.full(max(len(self.systems), 1), -1, dtype=np.int32)
+        systems = []
+        for index, emitter_id in enumerate(emitter_ids):
+            system = old_systems.get(emitter_id)
+            if system is None:
+                system = ParticleSystem(effect_ir=self.effect_ir, emitter_id=emitter_id,
+                                        max_particles=self.max_particles,
+                                        curve_tolerance=self.curve_tolerance,
+                                        pool=self.pool, emitter_index=index)
+            else:
+                remap[system.emitter_index] = index
+                system.emitter_index = index
+            systems.append(system)
+
+        n = self.pool.count
+        if n and old_systems:
+            emitter_index = self.pool.emitter_index[:n]
+            np.take(remap, emitter_index, out=emitter_index)
+            orphans = emitter_index < 0
+            if orphans.any():
+                self.pool.age[:n][orphans] = self.pool.lifespan[:n][orphans] # Dropped on removal
+                self.pool.remove_dead()
+        self.systems = systems
+        self._index_by_id = {emitter_id: index for index, emitter_id in enumerate(emitter_ids)}
+
+    def step(self, dt: float, current_time: Optional[float] = None):
+        """Advance the whole effect by `dt`; parameters are sampled at `current_time`."""
+        if current_time is None:
+            current_time = self.time
+        if self.effect_ir.revision != self._revision:
+            self._sync_emitters()
+
+        profiler = self.profiler
+        # 1. Advance every live particle of every emitter at once
+        with profiler.phase("update") if profiler else NO_PROFILE:
+            self.pool.integrate(dt)
+
+        # 2. Per-emitter emission, already advanced to the end of the step; each
+        #    emitter is capped by its own particles, not by the whole pool
+        with profiler.phase("emit") if profiler else NO_PROFILE:
+            emitter_rows = group_emitter_rows(self.pool, len(self.systems))
+            for system, rows in zip(self.systems, emitter_rows):
+                system.emit_step(dt, current_time, live_count=len(rows))
+            if self.pool.count >= self.pool.capacity:
+                self.saturated = True
+
+        # 3. Remove dead particles (in-place compaction)
+        with profiler.phase("update") if profiler else NO_PROFILE:
+            self.pool.remove_dead()
+
+        # 4. "Over lifetime" curves, every emitter in one pass
+        with profiler.phase("curves") if profiler else NO_PROFILE:
+            self._apply_lifetime_curves()
+        self.time = current_time + dt
+
+    def reset(self):
+        """Drop all particles and rewind emission and particle ids, so the next run replays identically."""
+        if self.effect_ir.revision != self._revision:
+            self._sync_emitters() # Snapshots taken after a reset must carry the current revision
+        self.pool.clear(rewind_ids=True)
+        for system in self.systems:
+            system.reset()
+        self.time = 0.0
+        self.saturated = False
+
+    def snapshot(self) -> SimulationSnapshot:
+        """Copy the live particles and per-emitter emission state."""
+        n = self.pool.count
+        return SimulationSnapshot(
+            time=self.time,
+            revision=self._revision,
+            count=n,
+            next_id=self.pool._next_id,
+            columns={name: getattr(self.pool, name)[:n].copy() for name, _d, _s, _v in PARTICLE_COLUMNS},
+            emitters=[(system._emission_debt, system._emitted_count,
+                       tuple(system.lifetime_curves.source(name) for name in ("size", "opacity", "color")))
+                      for system in self.systems],
+            saturated=self.saturated,
+        )
+
+    def restore(self, snapshot: SimulationSnapshot):
+        """Return to the state captured by snapshot(); the emitter list must not have changed since."""
+        if self.effect_ir.revision != self._revision:
+            self._sync_emitters()
+        if snapshot.revision != self._revision or len(snapshot.emitters) != len(self.systems):
+            raise ValueError("Snapshot was taken from a different version of the effect")
+        n = snapshot.count
+        for name, column in snapshot.columns.items():
+            getattr(self.pool, name)[:n] = column
+        self.pool.count = n
+        self.pool._next_id = snapshot.next_id # Sprite interning only ever appends, so indices stay valid
+        for system, (debt, emitted, sources) in zip(self.systems, snapshot.emitters):
+            system._emission_debt = debt
+            system._emitted_count = emitted
+            system.lifetime_curves.update(*sources)
+        self.time = snapshot.time
+        self.saturated = snapshot.saturated
+
+    def _apply_lifetime_curves(self):
+        self.curve_banks.update([system.lifetime_curves for system in self.systems])
+        self.curve_banks.apply(self.pool)
+
+    def emitter_index(self, emitter_id: str) -> int:
+        index = self._index_by_id.get(emitter_id)
+        if index is None:
+            raise KeyError(f"Emitter '{emitter_id}' is not part of this simulation")
+        return index
+
+    def emitter_view(self, emitter_id: str) -> EmitterParticles:
+        index = self.emitter_index(emitter_id)
+        rows = np.flatnonzero(self.pool.emitter_index[:self.pool.count] == index)
+        return self._make_view(index, rows)
+
+    def emitter_views(self) -> List[EmitterParticles]:
+        """One view per emitter, in EffectIR order (i.e. draw order)."""
+        return [self._make_view(index, rows)
+                for index, rows in enumerate(group_emitter_rows(self.pool, len(self.systems)))]
+
+    def _make_view(self, index: int, rows: np.ndarray) -> EmitterParticles:
+        system = self.systems[index]
+        blending_mode = getattr(system.emitter_properties, "blending_mode", "alpha")
+        return EmitterParticles(system.emitter_id, index, blending_mode, self.pool, rows)
+
+    def get_alive_particles(self, emitter_id: Optional[str] = None) -> List[ParticleView]:
+        if emitter_id is None:
+            return self.pool.views()
+        return self.emitter_view(emitter_id).views()
+
+    def __repr__(self):
+        return f"<EffectSimulator emitters={len(self.systems)} particles={self.pool.count}>"
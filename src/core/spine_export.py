@@ -0,0 +1,450 @@
+import heapq
+import itertools
+import json
+import zlib
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .decimation import DecimationTolerances, decimate_bake
+    from .ir import EffectIR
+    from .looping import BakedEmitter, LoopBake, LoopBaker
+    from .sprite_batch import flipbook_frames
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from decimation import DecimationTolerances, decimate_bake
+    from ir import EffectIR
+    from looping import BakedEmitter, LoopBake, LoopBaker
+    from sprite_batch import flipbook_frames
+
+SPINE_VERSION = "4.1.00"
+# Region drawn for particles without a sprite (see sprite_batch.disc_pixels)
+DEFAULT_ATTACHMENT = "particle"
+DEFAULT_ATTACHMENT_SIZE = 32
+# Spine slot blend modes; other blending modes draw as Spine's default, "normal"
+SPINE_BLEND_MODES = {"additive": "additive", "multiply": "multiply", "screen": "screen"}
+_NAME_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+_FLUSH_SIZE = 1 << 16
+# Lists of a skeleton that every slot adds an entry to, in file order
+_SKELETON_PARTS = ("bones", "slots", "skin", "slot_timelines", "bone_timelines")
+
+
+@dataclass
+class SpineExportOptions:
+    precision: int = 2 # Decimals of positions, rotations and attachment geometry
+    scale_precision: int = 3
+    time_precision: int = 4
+    animation_name: str = "loop"
+    images_path: str = "./"
+
+
+@dataclass
+class SpineExportStats:
+    raw_bytes: int = 0
+    gzip_bytes: int = 0 # Compressed so far; final once the writer is closed
+    bones: int = 0 # Besides the root
+    slots: int = 0
+    keys: int = 0
+
+
+class JsonStreamWriter:
+    """Writes text to a binary stream in chunks, counting raw and gzipped bytes as it goes.
+
+    The gzipped size is that of the whole output compressed as one gzip
+    member at `level`, computed incrementally without keeping the output.
+    """
+
+    def __init__(self, stream: BinaryIO, stats: Optional[SpineExportStats] = None, level: int = 9):
+        self.stream: BinaryIO = stream
+        self.stats: SpineExportStats = stats or SpineExportStats()
+        self._gzip = zlib.compressobj(level, zlib.DEFLATED, 31) # 31: gzip container
+        self._pending: List[str] = []
+        self._pending_size: int = 0
+
+    def write(self, text: str):
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size >= _FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        data = "".join(self._pending).encode("utf-8")
+        self._pending, self._pending_size = [], 0
+        self.stream.write(data)
+        self.stats.raw_bytes += len(data)
+        self.stats.gzip_bytes += len(self._gzip.compress(data))
+
+    def close(self) -> SpineExportStats:
+        self.flush()
+        self.stats.gzip_bytes += len(self._gzip.flush())
+        return self.stats
+
+
+def short_names() -> Iterator[str]:
+    """Unique names, shortest first: "a" ... "9", "aa", ...; never "root"."""
+    for length in itertools.count(1):
+        for letters in itertools.product(_NAME_ALPHABET, repeat=length):
+            name = "".join(letters)
+            if name != "root":
+                yield name
+
+
+def format_number(value: float, precision: int) -> str:
+    """`value` rounded to `precision` decimals, without trailing zeros."""
+    text = f"{value:.{precision}f}"
+    if precision > 0:
+        text = text.rstrip("0").rstrip(".")
+    return "0" if text == "-0" else text
+
+
+def assign_slots(start: np.ndarray, end: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Share slots between tracks whose frame ranges [start, end) do not overlap.
+
+    Returns (slot of each track, slot count). Tracks take the slot that has
+    been free the longest, so a few slots carry every particle of an emitter.
+    """
+    slot_of = np.empty(len(start), dtype=np.int64)
+    free: List[Tuple[int, int]] = [] # (frame the slot frees up, slot)
+    slot_count = 0
+    for track in np.lexsort((np.arange(len(start)), start)):
+        if free and free[0][0] <= start[track]:
+            slot = heapq.heappop(free)[1]
+        else:
+            slot, slot_count = slot_count, slot_count + 1
+        slot_of[track] = slot
+        heapq.heappush(free, (int(end[track]), slot))
+    return slot_of, slot_count
+
+
+def needs_end_key(bake: LoopBake) -> bool:
+    """Whether a key must be added on the seam.
+
+    Spine takes an animation's duration from its last key, so one must sit
+    on the seam: a track shown on frame D, or hidden there after its last frame.
+    """
+    return not any(np.any(baked.frame >= bake.frame_count - 1) for baked in bake.emitters)
+
+
+@dataclass
+class _Sprite:
+    frame_names: List[str] # Attachment names, one per flipbook frame
+    reference_width: float # Attachment width; bone scale = particle size / this
+    frame_rate: float = 0.0
+    loop: bool = True
+    flipbook: bool = False
+
+
+@dataclass
+class SpineEmitterSections:
+    """What one emitter adds to each list of a skeleton, entries comma-separated.
+
+    Sections only depend on the emitter's bake, the name of its first slot
+    and the effect's sprites, so they can be cached per emitter and joined
+    by write_skeleton().
+    """
+    emitter_id: str
+    slot_count: int = 0 # Also its number of bones
+    keys: int = 0
+    bones: str = ""
+    slots: str = ""
+    skin: str = ""
+    slot_timelines: str = ""
+    bone_timelines: str = ""
+
+
+@dataclass
+class _Slot:
+    name: str
+    emitter: BakedEmitter
+    tracks: np.ndarray # In frame order
+    attachments: List[str]
+
+
+class SpineJsonCompiler:
+    """Compiles a LoopBake into Spine skeleton JSON, written as it is generated.
+
+    Every track becomes the bone and slot of one particle; tracks of an
+    emitter that never overlap in time share a bone and slot, showing and
+    hiding its attachment (a region named after the sprite definition) as
+    they start and end. Only keyed samples (see looping and decimation) are
+    written; between two tracks of a slot the bone holds with stepped keys.
+
+    Output is kept small: numbers are rounded to the configured precision,
+    fields equal to Spine's defaults (time 0, zero offsets, unit scale, white
+    color, normal blending, linear curves) are left out, bones and slots get
+    the shortest unique names, and repeated names and attachment bodies are
+    encoded once. Spine loops an animation by its caller's choice, so the
+    player must set loop = true for the animation.
+    """
+
+    def __init__(self, effect_ir: EffectIR, options: Optional[SpineExportOptions] = None):
+        self.effect_ir: EffectIR = effect_ir
+        self.options: SpineExportOptions = options or SpineExportOptions()
+        self._sprites: Dict[Optional[str], _Sprite] = {}
+        self._attachment_bodies: Dict[str, str] = {}
+        self._quoted: Dict[Optional[str], str] = {}
+
+    def quote(self, name: Optional[str]) -> str:
+        quoted = self._quoted.get(name)
+        if quoted is None:
+            quoted = self._quoted[name] = json.dumps(name)
+        return quoted
+
+    def _number(self, value: float) -> str:
+        return format_number(value, self.options.precision)
+
+    def _sprite(self, sprite_id: Optional[str]) -> _Sprite:
+        sprite = self._sprites.get(sprite_id)
+        if sprite is None:
+            sprite = self._sprites[sprite_id] = self._resolve_sprite(sprite_id)
+        return sprite
+
+    def _resolve_sprite(self, sprite_id: Optional[str]) -> _Sprite:
+        flipbook = self.effect_ir.get_flipbook(sprite_id) if sprite_id else None
+        frame_ids = flipbook.frame_ids if flipbook else [sprite_id]
+        definitions = [self.effect_ir.get_sprite_definition(frame_id) if frame_id else None for frame_id in frame_ids]
+        if not all(definitions):
+            if sprite_id:
+                print(f"Warning: Sprite '{sprite_id}' has no sprite definition; exporting '{DEFAULT_ATTACHMENT}'")
+            self._attachment_bodies.setdefault(
+                DEFAULT_ATTACHMENT, f'{{"width":{DEFAULT_ATTACHMENT_SIZE},"height":{DEFAULT_ATTACHMENT_SIZE}}}')
+            return _Sprite([DEFAULT_ATTACHMENT], float(DEFAULT_ATTACHMENT_SIZE))
+        # Quads are as wide as the particle's size whatever the frame, like the preview
+        reference_width = float(definitions[0].region[2])
+        for definition in definitions:
+            width = reference_width
+            height = reference_width * definition.region[3] / max(definition.region[2], 1)
+            fields = []
+            x, y = (0.5 - definition.pivot[0]) * width, (0.5 - definition.pivot[1]) * height
+            if self._number(x) != "0":
+                fields.append(f'"x":{self._number(x)}')
+            if self._number(y) != "0":
+                fields.append(f'"y":{self._number(y)}')
+            fields.append(f'"width":{self._number(width)},"height":{self._number(height)}')
+            self._attachment_bodies.setdefault(definition.definition_id, "{" + ",".join(fields) + "}")
+        if flipbook:
+            return _Sprite(list(frame_ids), reference_width, flipbook.frame_rate, flipbook.loop, flipbook=True)
+        return _Sprite([sprite_id], reference_width)
+
+    def _track_sprite(self, baked: BakedEmitter, track: int) -> _Sprite:
+        index = int(baked.sprite_index[track])
+        return self._sprite(baked.sprite_ids[index] if index >= 0 else None)
+
+    def _emitter_slots(self, baked: BakedEmitter, names: Iterator[str]) -> List[_Slot]:
+        if baked.track_count == 0:
+            return []
+        first = baked.offsets[:-1]
+        start = baked.frame[first].astype(np.int64)
+        end = baked.frame[baked.offsets[1:] - 1].astype(np.int64) + 1
+        slot_of, slot_count = assign_slots(start, end)
+        order = np.lexsort((start, slot_of))
+        bounds = np.searchsorted(slot_of[order], np.arange(slot_count + 1))
+        slots = []
+        for slot in range(slot_count):
+            tracks = order[bounds[slot]:bounds[slot + 1]]
+            attachments = []
+            for track in tracks:
+                for name in self._track_sprite(baked, track).frame_names:
+                    if name not in attachments:
+                        attachments.append(name)
+            slots.append(_Slot(next(names), baked, tracks, attachments))
+        return slots
+
+    def compile(self, bake: LoopBake, stream: BinaryIO) -> SpineExportStats:
+        """Write the skeleton JSON of `bake` to a binary stream; returns the final stats.
+
+        Every slot's entries are generated as they are written, so memory
+        stays flat however big the bake.
+        """
+        names = short_names()
+        slots = [slot for baked in bake.emitters for slot in self._emitter_slots(baked, names)]
+        end_key = needs_end_key(bake)
+
+        def entries(part: str, stats: SpineExportStats) -> Iterator[str]:
+            for index, slot in enumerate(slots):
+                yield self._slot_entry(part, slot, bake, stats, end_key and index == 0)
+
+        return self._write_skeleton(stream, len(slots), entries)
+
+    def compile_emitter(self, baked: BakedEmitter, bake: LoopBake, first_name: int = 0,
+                        end_key: bool = False) -> SpineEmitterSections:
+        """JSON of one emitter's bones, slots and timelines, naming its slots from short name `first_name` on.
+
+        `end_key` adds the key on the seam that sets the animation's duration
+        (see needs_end_key()) to the emitter's first slot. Sections are held
+        in memory, for callers that cache them (see write_skeleton()).
+        """
+        slots = self._emitter_slots(baked, itertools.islice(short_names(), first_name, None))
+        stats = SpineExportStats()
+        section = SpineEmitterSections(emitter_id=baked.emitter_id, slot_count=len(slots))
+        for part in _SKELETON_PARTS:
+            entries = (self._slot_entry(part, slot, bake, stats, end_key and index == 0)
+                       for index, slot in enumerate(slots))
+            setattr(section, part, ",".join(entry for entry in entries if entry))
+        section.keys = stats.keys
+        return section
+
+    def write_skeleton(self, sections: Sequence[SpineEmitterSections], stream: BinaryIO) -> SpineExportStats:
+        """Write a skeleton made of compiled emitter sections to a binary stream; returns the final stats."""
+
+        def entries(part: str, stats: SpineExportStats) -> Iterator[str]:
+            return (getattr(section, part) for section in sections)
+
+        stats = self._write_skeleton(stream, sum(section.slot_count for section in sections), entries)
+        stats.keys = sum(section.keys for section in sections)
+        return stats
+
+    def _slot_entry(self, part: str, slot: _Slot, bake: LoopBake, stats: SpineExportStats, end_key: bool) -> str:
+        """One slot's entry in a part of the skeleton (see _SKELETON_PARTS); empty if it has none."""
+        if part == "bones":
+            return f'{{"name":"{slot.name}","parent":"root"}}'
+        if part == "slots":
+            blend = SPINE_BLEND_MODES.get(slot.emitter.blending_mode)
+            blend = f',"blend":"{blend}"' if blend else ""
+            return f'{{"name":"{slot.name}","bone":"{slot.name}"{blend}}}'
+        if part == "skin":
+            attachments = ",".join(f"{self.quote(name)}:{self._attachment_bodies[name]}" for name in slot.attachments)
+            return f'"{slot.name}":{{{attachments}}}'
+        if part == "slot_timelines":
+            return f'"{slot.name}":{{{self._slot_timelines(slot, bake, stats, end_key=end_key)}}}'
+        timelines = self._bone_timelines(slot, bake, stats)
+        return f'"{slot.name}":{{{timelines}}}' if timelines else ""
+
+    def _write_skeleton(self, stream: BinaryIO, slot_count: int,
+                        entries: Callable[[str, SpineExportStats], Iterable[str]]) -> SpineExportStats:
+        """Write the skeleton around `entries(part, stats)`, comma-joined, writing each as it comes."""
+        writer = JsonStreamWriter(stream)
+        stats = writer.stats
+        stats.bones = stats.slots = slot_count
+
+        def write_list(part: str, written: int = 0):
+            for entry in entries(part, stats):
+                if entry:
+                    writer.write(("," if written else "") + entry)
+                    written += 1
+
+        writer.write(f'{{"skeleton":{{"spine":"{SPINE_VERSION}","images":{self.quote(self.options.images_path)}}},')
+        writer.write('"bones":[{"name":"root"}')
+        write_list("bones", written=1)
+        writer.write('],"slots":[')
+        write_list("slots")
+        writer.write('],"skins":[{"name":"default","attachments":{')
+        write_list("skin")
+        writer.write(f'}}}}],"animations":{{{self.quote(self.options.animation_name)}:{{"slots":{{')
+        write_list("slot_timelines")
+        writer.write('},"bones":{')
+        write_list("bone_timelines")
+        writer.write("}}}}")
+        return writer.close()
+
+    def _time(self, frame: int, bake: LoopBake) -> str:
+        """'"time":t,' for a key, or nothing at time 0."""
+        if frame == 0:
+            return ""
+        return f'"time":{format_number(frame * bake.frame_step, self.options.time_precision)},'
+
+    def _keyed_rows(self, slot: _Slot, channel: str) -> Iterator[Tuple[int, np.ndarray, bool]]:
+        """(track, keyed sample rows, followed by another track) for each track of a slot."""
+        baked = slot.emitter
+        keys = baked.keys[channel]
+        for position, track in enumerate(slot.tracks):
+            start, stop = baked.offsets[track], baked.offsets[track + 1]
+            yield int(track), start + np.flatnonzero(keys[start:stop]), position + 1 < len(slot.tracks)
+
+    def _channel_keys(self, slot: _Slot, channel: str, bake: LoopBake, format_value,
+                      default: str = "") -> Tuple[List[str], bool]:
+        """Keys of one channel of a slot, and whether any leaves the setup pose (`default` fields)."""
+        keys = []
+        changed = False
+        frames = slot.emitter.frame
+        for track, rows, followed in self._keyed_rows(slot, channel):
+            values = format_value(track, rows)
+            for k, (row, fields) in enumerate(zip(rows, values)):
+                changed = changed or fields != default
+                key = self._time(int(frames[row]), bake) + fields
+                if followed and k == len(rows) - 1:
+                    key += '"curve":"stepped",' # Hold until the next track on this slot starts
+                keys.append("{" + key.rstrip(",") + "}")
+        return keys, changed
+
+    def _slot_timelines(self, slot: _Slot, bake: LoopBake, stats: SpineExportStats, end_key: bool = False) -> str:
+        baked = slot.emitter
+        attachment_keys = []
+        for position, track in enumerate(slot.tracks):
+            start, stop = baked.offsets[track], baked.offsets[track + 1]
+            frames = baked.frame[start:stop]
+            sprite = self._track_sprite(baked, track)
+            if sprite.flipbook:
+                age = frames * bake.frame_step - baked.birth_time[track]
+                shown = flipbook_frames(age, np.full(len(age), baked.lifespan[track]), np.full(len(age), len(sprite.frame_names)),
+                                        np.full(len(age), sprite.frame_rate), np.full(len(age), sprite.loop))
+                changes = np.flatnonzero(np.diff(shown, prepend=-1))
+            else:
+                shown, changes = np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64)
+            for change in changes:
+                name = self.quote(sprite.frame_names[shown[change]])
+                attachment_keys.append(f'{{{self._time(int(frames[change]), bake)}"name":{name}}}')
+            end = int(frames[-1]) + 1
+            next_start = int(baked.frame[baked.offsets[slot.tracks[position + 1]]]) if position + 1 < len(slot.tracks) else None
+            if end <= bake.frame_count and next_start != end:
+                attachment_keys.append("{" + self._time(end, bake).rstrip(",") + "}") # No name: hidden
+        if end_key:
+            attachment_keys.append("{" + self._time(bake.frame_count, bake).rstrip(",") + "}")
+
+        def rgba(track, rows):
+            color = np.rint(np.clip(baked.color[rows], 0.0, 1.0) * 255.0).astype(np.int64)
+            return ['"color":"%02x%02x%02x%02x",' % tuple(c) for c in color]
+
+        stats.keys += len(attachment_keys)
+        timelines = [f'"attachment":[{",".join(attachment_keys)}]']
+        color_keys, changed = self._channel_keys(slot, "color", bake, rgba, default='"color":"ffffffff",')
+        if changed:
+            timelines.append(f'"rgba":[{",".join(color_keys)}]')
+            stats.keys += len(color_keys)
+        return ",".join(timelines)
+
+    def _bone_timelines(self, slot: _Slot, bake: LoopBake, stats: SpineExportStats) -> str:
+        baked = slot.emitter
+        number = self._number
+        scale_precision = self.options.scale_precision
+
+        def translate(track, rows):
+            values = []
+            for x, y in baked.position[rows]:
+                x, y = number(x), number(y)
+                values.append((f'"x":{x},' if x != "0" else "") + (f'"y":{y},' if y != "0" else ""))
+            return values
+
+        def rotate(track, rows):
+            return [f'"value":{v},' if v != "0" else "" for v in map(number, baked.rotation[rows])]
+
+        def scale(track, rows):
+            width = self._track_sprite(baked, track).reference_width
+            values = []
+            for size in baked.size[rows]:
+                s = format_number(size / width, scale_precision)
+                values.append(f'"x":{s},"y":{s},' if s != "1" else "")
+            return values
+
+        timelines = []
+        for name, channel, format_value in (("translate", "position", translate), ("rotate", "rotation", rotate),
+                                            ("scale", "size", scale)):
+            keys, changed = self._channel_keys(slot, channel, bake, format_value)
+            if changed: # A timeline that never leaves the setup pose is left out
+                timelines.append(f'"{name}":[{",".join(keys)}]')
+                stats.keys += len(keys)
+        return ",".join(timelines)
+
+
+def export_spine_json(effect_ir: EffectIR, path: str, options: Optional[SpineExportOptions] = None,
+                      tolerances: Optional[DecimationTolerances] = None,
+                      workers: Optional[int] = None) -> SpineExportStats:
+    """Bake, decimate (with DecimationTolerances() unless `tolerances` is given) and write an effect as Spine JSON."""
+    bake = LoopBaker(effect_ir, workers=workers).bake()
+    decimate_bake(bake, tolerances)
+    with open(path, "wb") as f:
+        return SpineJsonCompiler(effect_ir, options).compile(bake, f)
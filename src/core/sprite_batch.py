@@ -0,0 +1,149 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Interleaved vertex layout written by fill_quad_vertices: x, y, u, v, r, g, b, a
+VERTEX_STRIDE = 8
+# Kivy meshes index vertices with unsigned shorts
+MAX_QUADS_PER_MESH = 65536 // 4
+
+# Corner order shared by tex_coords tuples: bottom-left, bottom-right, top-right, top-left
+_CORNER_X = np.array([0.0, 1.0, 1.0, 0.0])
+_CORNER_Y = np.array([0.0, 0.0, 1.0, 1.0])
+
+
+class SpriteTable:
+    """Per-sprite lookup arrays, indexed by ParticlePool.sprite_index.
+
+    Row -1 (the last row) describes particles without a sprite. `slot` maps
+    each sprite to an index in `textures` (e.g. one per atlas page), or -1
+    when the sprite has no texture.
+
+    A flipbook row points at a run of frame rows (see expand_flipbooks());
+    sprite_rows() picks every particle's current frame from its age, so an
+    animated sprite costs one extra gather per particle.
+    """
+
+    def __init__(self, sprite_count: int):
+        rows = sprite_count + 1
+        self.tex_coords = np.tile(np.array([0, 0, 1, 0, 1, 1, 0, 1], dtype=np.float64), (rows, 1))
+        self.pivot = np.full((rows, 2), 0.5)
+        self.aspect = np.ones(rows) # Height / width of the sprite region
+        self.slot = np.full(rows, -1, dtype=np.int32)
+        self.textures: List[object] = []
+        self.texture_keys: List[object] = []
+        self._slot_by_key: Dict[object, int] = {}
+        # Flipbook frames; a static sprite is its own single frame
+        self.first_frame = np.arange(rows, dtype=np.int64)
+        self.first_frame[-1] = -1
+        self.frame_count = np.ones(rows, dtype=np.int64)
+        self.frame_rate = np.zeros(rows) # 0 = all frames over the lifespan
+        self.frame_loop = np.ones(rows, dtype=np.bool_)
+        self.has_flipbooks: bool = False
+
+    def set_sprite(self, index: int, texture_key: object, texture: object,
+                   tex_coords: Sequence[float], pivot: Tuple[float, float] = (0.5, 0.5),
+                   aspect: float = 1.0):
+        slot = self._slot_by_key.get(texture_key)
+        if slot is None:
+            slot = len(self.textures)
+            self.textures.append(texture)
+            self.texture_keys.append(texture_key)
+            self._slot_by_key[texture_key] = slot
+        self.slot[index] = slot
+        self.tex_coords[index] = tex_coords
+        self.pivot[index] = pivot
+        self.aspect[index] = aspect
+
+    def set_flipbook(self, index: int, first_row: int, frame_count: int, frame_rate: float = 0.0,
+                     loop: bool = True):
+        self.first_frame[index] = first_row
+        self.frame_count[index] = frame_count
+        self.frame_rate[index] = frame_rate
+        self.frame_loop[index] = loop
+        self.has_flipbooks = True
+
+    def sprite_rows(self, pool, rows) -> np.ndarray:
+        """Table row of each particle at `rows`: its sprite, or its flipbook's current frame."""
+        sprite_index = pool.sprite_index[rows]
+        if not self.has_flipbooks:
+            return sprite_index
+        frame = flipbook_frames(pool.age[rows], pool.lifespan[rows], self.frame_count[sprite_index],
+                                self.frame_rate[sprite_index], self.frame_loop[sprite_index])
+        return self.first_frame[sprite_index] + frame
+
+
+def expand_flipbooks(sprite_ids: Sequence[Optional[str]],
+                     effect_ir=None) -> Tuple[List[Optional[str]], List[Tuple[int, int, int, float, bool]]]:
+    """Sprite table rows for `sprite_ids`: the ids themselves, then the frames of
+    the flipbooks among them.
+
+    Returns (row_ids, flipbooks) with one (index, first_row, frame_count,
+    frame_rate, loop) entry per flipbook, for SpriteTable.set_flipbook().
+    """
+    row_ids = list(sprite_ids)
+    flipbooks = []
+    for index, sprite_id in enumerate(sprite_ids):
+        flipbook = effect_ir.get_flipbook(sprite_id) if effect_ir and sprite_id else None
+        if flipbook:
+            flipbooks.append((index, len(row_ids), len(flipbook.frame_ids), flipbook.frame_rate, flipbook.loop))
+            row_ids.extend(flipbook.frame_ids)
+    return row_ids, flipbooks
+
+
+def flipbook_frames(age: np.ndarray, lifespan: np.ndarray, frame_count: np.ndarray,
+                    frame_rate: np.ndarray, loop: np.ndarray) -> np.ndarray:
+    """Current frame of each particle: `frame_rate` frames per second of age,
+    wrapping when `loop` (else holding the last frame), or with a rate of 0
+    every frame once over the lifespan."""
+    timed = frame_rate > 0.0
+    progress = np.where(timed, age * frame_rate, age / np.maximum(lifespan, 1e-9) * frame_count)
+    frame = np.floor(progress).astype(np.int64)
+    return np.where(timed & loop, frame % frame_count, np.clip(frame, 0, frame_count - 1))
+
+
+def quad_corners(position: np.ndarray, size: np.ndarray, rotation: np.ndarray,
+                 pivot: np.ndarray, aspect: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """World-space corners of rotated sprite quads, as (x, y) arrays of shape (n, 4).
+
+    A quad is `size` wide and `size * aspect` tall, its `pivot` (normalized,
+    from the bottom-left) sits on `position` and it is rotated
+    counter-clockwise by `rotation` degrees around the pivot, matching
+    Translate + Rotate(origin=pivot) + Rectangle in Kivy.
+    """
+    width = size[:, None]
+    height = (size * aspect)[:, None]
+    local_x = (_CORNER_X - pivot[:, 0:1]) * width
+    local_y = (_CORNER_Y - pivot[:, 1:2]) * height
+    radians = np.radians(rotation)[:, None]
+    cos, sin = np.cos(radians), np.sin(radians)
+    x = position[:, 0:1] + local_x * cos - local_y * sin
+    y = position[:, 1:2] + local_x * sin + local_y * cos
+    return x, y
+
+
+def fill_quad_vertices(out: np.ndarray, position: np.ndarray, size: np.ndarray, rotation: np.ndarray,
+                       color: np.ndarray, tex_coords: np.ndarray, pivot: np.ndarray,
+                       aspect: np.ndarray) -> np.ndarray:
+    """Write interleaved vertices for n quads into `out`, shape (n, 4, VERTEX_STRIDE)."""
+    n = position.shape[0]
+    out[:, :, 0], out[:, :, 1] = quad_corners(position, size, rotation, pivot, aspect)
+    out[:, :, 2:4] = tex_coords.reshape(n, 4, 2)
+    out[:, :, 4:8] = color[:, None, :]
+    return out
+
+
+def quad_indices(quad_count: int) -> np.ndarray:
+    """Triangle indices (two per quad) for vertices laid out by fill_quad_vertices."""
+    base = np.arange(quad_count, dtype=np.uint32)[:, None] * 4
+    return (base + np.array([0, 1, 2, 2, 3, 0], dtype=np.uint32)).ravel()
+
+
+def disc_pixels(size: int = 32) -> np.ndarray:
+    """(size, size, 4) uint8 white anti-aliased disc on transparent, premultiplied, for particles without a sprite."""
+    center = (size - 1) / 2.0
+    y, x = np.mgrid[0:size, 0:size]
+    alpha = np.clip(size / 2.0 - np.hypot(x - center, y - center), 0.0, 1.0)
+    pixels = np.empty((size, size, 4), dtype=np.uint8)
+    pixels[...] = (alpha * 255).astype(np.uint8)[..., None]
+    return pixels
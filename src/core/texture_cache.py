@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    from .ir import EffectIR, SpriteAsset, SpriteDefinition
+except ImportError:
+    # Standalone execution: the script directory is on sys.path
+    from ir import EffectIR, SpriteAsset, SpriteDefinition
+
+DEFAULT_TEXTURE_BUDGET = 256 * 1024 * 1024 # Bytes of decoded atlas pixels kept resident
+
+
+@dataclass
+class TextureCacheStats:
+    hits: int = 0 # Region lookups served by a resident atlas
+    misses: int = 0 # Lookups that had to load their atlas
+    evictions: int = 0
+    failures: int = 0 # Atlases that could not be loaded
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclass
+class _Atlas:
+    texture: Any
+    nbytes: int
+    regions: Dict[str, Any] = field(default_factory=dict) # definition_id -> region texture
+
+
+class TextureCache:
+    """Sprite textures keyed by SpriteAsset, each atlas loaded once.
+
+    `load_atlas(asset)` returns (texture, nbytes) or raises; region textures
+    are cut lazily from the resident atlas with `make_region(texture, asset,
+    definition)` the first time a sprite is looked up. Atlases are kept in
+    least-recently-used order and evicted once their total size exceeds
+    `budget_bytes`; the atlas in use is never evicted, even if it alone is
+    over budget.
+
+    Behaves like a read-only mapping of definition_id -> region texture
+    (get(), `in`), so it can be handed to the particle renderers directly.
+    `generation` changes whenever textures appear or go away.
+    """
+
+    def __init__(self, effect_ir: EffectIR, load_atlas: Callable[[SpriteAsset], Tuple[Any, int]],
+                 make_region: Callable[[Any, SpriteAsset, SpriteDefinition], Any],
+                 budget_bytes: int = DEFAULT_TEXTURE_BUDGET):
+        self.effect_ir: EffectIR = effect_ir
+        self.load_atlas = load_atlas
+        self.make_region = make_region
+        self.budget_bytes: int = budget_bytes
+        self.bytes_used: int = 0
+        self.generation: int = 0
+        self.stats: TextureCacheStats = TextureCacheStats()
+        self._atlases: "OrderedDict[str, _Atlas]" = OrderedDict()
+        self._failed: Dict[str, str] = {} # asset_id -> path that failed, to avoid retrying every frame
+
+    def __len__(self) -> int:
+        return len(self._atlases)
+
+    def __contains__(self, definition_id) -> bool:
+        return self.get(definition_id) is not None
+
+    @property
+    def resident_assets(self):
+        """Asset ids of loaded atlases, least recently used first."""
+        return list(self._atlases)
+
+    def get(self, definition_id: Optional[str], default=None):
+        """Region texture of a SpriteDefinition, loading its atlas if needed."""
+        definition = self.effect_ir.get_sprite_definition(definition_id) if definition_id else None
+        if definition is None:
+            return default
+        atlas = self._atlas(definition.asset_id)
+        if atlas is None:
+            return default
+        region = atlas.regions.get(definition_id)
+        if region is None:
+            region = self.make_region(atlas.texture, self.effect_ir.get_sprite_asset(definition.asset_id), definition)
+            atlas.regions[definition_id] = region
+        return region
+
+    def _atlas(self, asset_id: str) -> Optional[_Atlas]:
+        atlas = self._atlases.get(asset_id)
+        if atlas is not None:
+            self.stats.hits += 1
+            self._atlases.move_to_end(asset_id)
+            return atlas
+        asset = self.effect_ir.get_sprite_asset(asset_id)
+        if asset is None or self._failed.get(asset_id) == asset.path:
+            return None
+        self.stats.misses += 1
+        try:
+            texture, nbytes = self.load_atlas(asset)
+        except Exception as e:
+            print(f"Warning: Could not load sprite atlas '{asset.path}': {e}")
+            self.stats.failures += 1
+            self._failed[asset_id] = asset.path
+            return None
+        atlas = _Atlas(texture, nbytes)
+        self._atlases[asset_id] = atlas
+        self.bytes_used += nbytes
+        self.generation += 1
+        while self.bytes_used > self.budget_bytes and len(self._atlases) > 1:
+            self._evict(next(iter(self._atlases)))
+        return atlas
+
+    def _evict(self, asset_id: str):
+        self._drop(asset_id)
+        self.stats.evictions += 1
+
+    def _drop(self, asset_id: str):
+        # Renderers still holding region textures keep them alive until they rebuild
+        self.bytes_used -= self._atlases.pop(asset_id).nbytes
+        self.generation += 1
+
+    def invalidate(self, asset_id: Optional[str] = None):
+        """Drop one atlas (e.g. its file changed), or all of them."""
+        for key in ([asset_id] if asset_id is not None else list(self._atlases)):
+            if key in self._atlases:
+                self._drop(key)
+            self._failed.pop(key, None)
+        if asset_id is None:
+            self._failed.clear()
@@ -0,0 +1,111 @@
+import threading
+
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle
+from kivy.metrics import dp
+from kivy.uix.label import Label
+from kivy.uix.widget import Widget
+
+try:
+    from core.export_budget import BudgetEstimator
+except ImportError:
+    # Imported as src.ui.preview_window.budget_meter (e.g. from main.py)
+    from src.core.export_budget import BudgetEstimator
+
+METER_ITEMS = (("json_gzip_bytes", "JSON"), ("png_bytes", "PNG"), ("atlas_pages", "Pages"))
+OK_COLOR = (0.40, 0.90, 0.45, 1)
+WARNING_COLOR = (0.98, 0.75, 0.18, 1) # Above WARNING_USAGE of a limit
+OVER_COLOR = (0.98, 0.40, 0.40, 1)
+WARNING_USAGE = 0.8
+
+
+def _format_item(name: str, value: float) -> str:
+    if name == "atlas_pages":
+        return f"{int(value)}"
+    return f"{value / 1024:.1f} KB" if value < 1024 * 1024 else f"{value / (1024 * 1024):.2f} MB"
+
+
+class BudgetMeter(Widget):
+    """Bars showing how much of each export budget item an effect uses.
+
+    Polls the estimator every `refresh_interval` seconds; when the effect
+    changed it re-estimates on a background thread (only the edited
+    emitters are baked again), so editing never waits for it. It bakes in
+    this process (workers=1): forking worker pools from that thread on every
+    edit would cost more than the bake itself.
+    """
+
+    def __init__(self, estimator: BudgetEstimator, refresh_interval: float = 1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.estimator = estimator
+        estimator.workers = 1
+        self._thread = None
+        self._bars = {}
+        with self.canvas:
+            Color(0, 0, 0, 0.6)
+            self._background = Rectangle()
+            for name, _title in METER_ITEMS:
+                Color(1, 1, 1, 0.15)
+                track = Rectangle()
+                color = Color(*OK_COLOR)
+                self._bars[name] = (track, color, Rectangle())
+        self.title_label = Label(font_size='10sp', halign='left', valign='middle')
+        self.item_labels = {name: Label(font_size='10sp', halign='left', valign='middle') for name, _title in METER_ITEMS}
+        for label in [self.title_label, *self.item_labels.values()]:
+            self.add_widget(label)
+        self.bind(pos=self.refresh, size=self.refresh)
+        self._event = Clock.schedule_interval(self._poll, refresh_interval)
+        self._poll()
+
+    def close(self):
+        if self._event:
+            self._event.cancel()
+            self._event = None
+
+    def _poll(self, *args):
+        if self._thread is None and self.estimator.stale:
+            self._thread = threading.Thread(target=self._estimate, daemon=True)
+            self._thread.start()
+
+    def _estimate(self):
+        try:
+            self.estimator.estimate()
+        except Exception as e:
+            print(f"Warning: Export budget estimate failed: {e}")
+        finally:
+            Clock.schedule_once(self._estimated)
+
+    def _estimated(self, *args):
+        self._thread = None
+        self.refresh()
+
+    def refresh(self, *args):
+        x, y = self.pos
+        width, height = self.size
+        self._background.pos, self._background.size = self.pos, self.size
+        estimate = self.estimator.last_estimate
+        usage = estimate.usage() if estimate else {}
+        row_height = height / (len(METER_ITEMS) + 1)
+        bar_x, bar_width = x + width * 0.4, width * 0.6 - dp(4)
+        for row, (name, title) in enumerate(METER_ITEMS):
+            track, color, bar = self._bars[name]
+            row_y = y + row_height * (len(METER_ITEMS) - 1 - row)
+            track.pos, track.size = (bar_x, row_y + dp(3)), (bar_width, row_height - dp(6))
+            used = usage.get(name, 0.0)
+            color.rgba = OVER_COLOR if used > 1.0 else WARNING_COLOR if used > WARNING_USAGE else OK_COLOR
+            bar.pos, bar.size = track.pos, (bar_width * min(used, 1.0), track.size[1])
+            value = ""
+            if estimate:
+                value = "too big" if used == float("inf") else _format_item(name, getattr(estimate, name))
+            self._place_label(self.item_labels[name], (x + dp(4), row_y), (width * 0.4 - dp(4), row_height),
+                              f"{title} {value}")
+        title = "Export budget" + ("..." if self._thread is not None or not estimate else "")
+        if estimate:
+            title += f" ({estimate.json_keys} keys)"
+        self._place_label(self.title_label, (x + dp(4), y + height - row_height), (width - dp(8), row_height), title)
+
+    @staticmethod
+    def _place_label(label: Label, pos, size, text: str):
+        label.pos, label.size = pos, size
+        label.text_size = size
+        label.text = text
@@ -0,0 +1,47 @@
+from functools import partial
+from typing import Optional, Tuple
+
+from kivy.graphics.texture import Texture
+
+try:
+    from core.asset_import import AssetImporter
+    from core.ir import EffectIR, SpriteAsset, SpriteDefinition
+    from core.texture_cache import DEFAULT_TEXTURE_BUDGET, TextureCache
+except ImportError:
+    # Imported as src.ui.preview_window.kivy_textures (e.g. from main.py)
+    from src.core.asset_import import AssetImporter
+    from src.core.ir import EffectIR, SpriteAsset, SpriteDefinition
+    from src.core.texture_cache import DEFAULT_TEXTURE_BUDGET, TextureCache
+
+
+def load_atlas_texture(asset: SpriteAsset, importer: Optional[AssetImporter] = None) -> Tuple[object, int]:
+    """Upload a sprite atlas in render format (premultiplied, see core.asset_import);
+    returns (texture, bytes of texture memory).
+
+    Unchanged files come memory-mapped from the importer's cache, without decoding.
+    """
+    imported = (importer or AssetImporter()).load(asset)
+    width, height = imported.source_size
+    # Trimmed margins are restored so regions keep their source coordinates
+    pixels = imported.full_pixels()[::-1] # GL rows start at the bottom
+    texture = Texture.create(size=(width, height), colorfmt='rgba')
+    texture.blit_buffer(pixels.tobytes(), colorfmt='rgba', bufferfmt='ubyte')
+    return texture, width * height * 4
+
+
+def atlas_region(texture, asset: SpriteAsset, definition: SpriteDefinition):
+    """Sub-texture of `texture` for a SpriteDefinition (region measured from the top-left)."""
+    x, y_top, width, height = definition.region
+    region = texture.get_region(x, texture.height - y_top - height, width, height) # Kivy regions start bottom-left
+    # Avoid sampling outside the sprite region which causes white borders in Screen mode
+    region.wrap = 'clamp_to_edge'
+    region.mag_filter = 'nearest'
+    region.min_filter = 'nearest'
+    return region
+
+
+def make_texture_cache(effect_ir: EffectIR, budget_bytes: int = DEFAULT_TEXTURE_BUDGET,
+                       importer: Optional[AssetImporter] = None) -> TextureCache:
+    """TextureCache that loads atlases through an AssetImporter into GL textures."""
+    load_atlas = partial(load_atlas_texture, importer=importer or AssetImporter())
+    return TextureCache(effect_ir, load_atlas, atlas_region, budget_bytes=budget_bytes)
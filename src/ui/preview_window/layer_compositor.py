@@ -0,0 +1,200 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from kivy.graphics import (Callback, ClearBuffers, ClearColor, Color, Fbo, InstructionGroup, PopMatrix, PushMatrix,
+                           Rectangle, Scale)
+from kivy.graphics.opengl import GL_DST_COLOR, GL_ONE, GL_ZERO, glBlendFuncSeparate
+
+try:
+    from core.layers import LayerTracker, draw_order, layer_keys
+    from core.quality import QUALITY_LEVELS, QualityLevel, select_particles
+    from core.render_queue import RenderQueueStats, build_render_queue, render_queue_stats
+    from ui.preview_window.mesh_renderer import (BLEND_FUNCS, DEFAULT_BLEND_FUNC, ParticleMeshRenderer,
+                                                 sprite_textures_key)
+except ImportError:
+    # Imported as src.ui.preview_window.layer_compositor (e.g. from main.py)
+    from src.core.layers import LayerTracker, draw_order, layer_keys
+    from src.core.quality import QUALITY_LEVELS, QualityLevel, select_particles
+    from src.core.render_queue import RenderQueueStats, build_render_queue, render_queue_stats
+    from src.ui.preview_window.mesh_renderer import (BLEND_FUNCS, DEFAULT_BLEND_FUNC, ParticleMeshRenderer,
+                                                     sprite_textures_key)
+
+# Fragments are premultiplied (see mesh_renderer.BLEND_FUNCS), and every
+# blend mode is associative in that form: particles are drawn into a
+# cleared layer with the usual functions, and compositing the layer with
+# these matches drawing the particles directly
+LAYER_BLEND_FUNCS: Dict[str, Tuple[int, int, int, int]] = BLEND_FUNCS
+COMPOSITE_BLEND_FUNCS: Dict[str, Tuple[int, int, int, int]] = dict(
+    BLEND_FUNCS, multiply=(GL_DST_COLOR, GL_ZERO, GL_ZERO, GL_ONE)) # The layer holds the product
+# Multiply layers start white, the identity of that blend
+LAYER_CLEAR_COLORS: Dict[str, Tuple[float, float, float, float]] = {"multiply": (1.0, 1.0, 1.0, 1.0)}
+_TRANSPARENT = (0.0, 0.0, 0.0, 0.0)
+
+
+class _Layer:
+    # One emitter: an Fbo holding a mesh renderer; the Fbo only re-renders
+    # when its meshes or clear color change. Particles are drawn in preview
+    # coordinates and scaled down to reduced-resolution layers.
+
+    def __init__(self, size, resolution_scale: float, renderer_options: dict):
+        self.fbo = Fbo(size=size)
+        self.clear_color = ClearColor(*_TRANSPARENT)
+        self.scale = Scale(resolution_scale, resolution_scale, 1.0, origin=(0, 0))
+        content = InstructionGroup()
+        for instruction in (self.clear_color, ClearBuffers(), PushMatrix(), self.scale, content, PopMatrix()):
+            self.fbo.add(instruction)
+        self.renderer = ParticleMeshRenderer(content, blend_funcs=LAYER_BLEND_FUNCS, **renderer_options)
+
+    def resize(self, size, resolution_scale: float):
+        self.fbo.size = size # Replaces the Fbo texture
+        self.scale.xyz = (resolution_scale, resolution_scale, 1.0)
+
+
+class LayeredParticleRenderer:
+    """Draws each emitter into its own cached offscreen layer and composites the layers.
+
+    A layer is re-rendered only when its content key changes (see
+    core.layers.layer_keys): when its emitter's particles moved or its
+    parameters were edited (any emitter's, once a full shared pool couples
+    them; see core.layers.emitter_fingerprints). Otherwise the frame costs one textured quad per
+    non-empty layer, in emitter order, with a blend switch only where
+    consecutive layers blend differently. Within a layer particles are drawn
+    oldest first.
+
+    A QualityLevel passed to draw() thins out the particles and may render
+    the layers at reduced resolution, stretched when composited.
+    """
+
+    def __init__(self, canvas, default_texture=None,
+                 fallback_color: Optional[Tuple[float, float, float, float]] = None,
+                 fallback_size: Optional[float] = None):
+        self.canvas = canvas
+        self._renderer_options = dict(default_texture=default_texture, fallback_color=fallback_color,
+                                      fallback_size=fallback_size)
+        self.tracker: LayerTracker = LayerTracker()
+        self.pos: Tuple[float, float] = (0.0, 0.0)
+        self.size: Tuple[float, float] = (1.0, 1.0)
+        self.quality: QualityLevel = QUALITY_LEVELS[0]
+        self.profiler = None # FrameProfiler, handed to the layers' mesh renderers
+        self.queue_stats: RenderQueueStats = RenderQueueStats() # Of the last draw(), layers and composite
+        self._layers: Dict[str, _Layer] = {}
+        self._layer_group = InstructionGroup() # Fbos, kept in the tree so they render when flagged
+        self._composite_group = InstructionGroup()
+        self._composite_rects: List[Rectangle] = []
+        self._composite_order: Optional[List[Tuple[str, str]]] = []
+        self._sprite_args = None
+        self._sprite_key = None
+        self._transform_key = None
+        canvas.add(self._layer_group)
+        canvas.add(self._composite_group)
+
+    @property
+    def instruction_count(self) -> int:
+        return len(self._composite_group.children) + sum(
+            layer.renderer.instruction_count + 3 for layer in self._layers.values())
+
+    def resize(self, pos, size):
+        """Place the layers over the widget area at `pos` with `size`."""
+        pos, size = tuple(pos), (max(1, int(size[0])), max(1, int(size[1])))
+        if size != self.size:
+            self.size = size
+            self._resize_layers()
+        self.pos = pos
+        for rect in self._composite_rects:
+            rect.pos, rect.size = pos, size
+
+    @property
+    def layer_size(self) -> Tuple[int, int]:
+        scale = self.quality.resolution_scale
+        return max(1, int(self.size[0] * scale)), max(1, int(self.size[1] * scale))
+
+    def _resize_layers(self):
+        for layer in self._layers.values():
+            layer.resize(self.layer_size, self.quality.resolution_scale)
+        self.tracker.invalidate()
+        self._composite_order = None
+
+    def update_sprites(self, sprite_ids: Sequence[Optional[str]], textures: Dict[str, object], effect_ir=None):
+        if sprite_textures_key(sprite_ids, textures, effect_ir) != self._sprite_key:
+            self._sprite_args = (sprite_ids, textures, effect_ir)
+            for layer in self._layers.values():
+                layer.renderer.update_sprites(*self._sprite_args)
+            self._sprite_key = sprite_textures_key(sprite_ids, textures, effect_ir)
+            self.tracker.invalidate()
+
+    def draw(self, effect_ir, views, step: int, offset: Tuple[float, float] = (0.0, 0.0),
+             size_scale: float = 1.0, quality: Optional[QualityLevel] = None,
+             fingerprints: Optional[Dict[str, int]] = None):
+        """Show the emitter `views` (EffectSimulator.emitter_views(), in draw order)
+        of simulation step `step`; offset/size_scale map simulation units to
+        canvas coordinates. Pass the `fingerprints` of a SimulationFrame when
+        the views were simulated elsewhere."""
+        quality = quality or QUALITY_LEVELS[0]
+        if quality != self.quality:
+            resized = quality.resolution_scale != self.quality.resolution_scale
+            self.quality = quality
+            if resized:
+                self._resize_layers()
+            self.tracker.invalidate()
+        local_offset = (offset[0] - self.pos[0], offset[1] - self.pos[1])
+        if (local_offset, size_scale) != self._transform_key:
+            self._transform_key = (local_offset, size_scale)
+            self.tracker.invalidate()
+
+        for emitter_id in [i for i in self._layers if i not in {view.emitter_id for view in views}]:
+            self._layer_group.remove(self._layers.pop(emitter_id).fbo)
+
+        dirty = set(self.tracker.update(layer_keys(effect_ir, views, step, fingerprints)))
+        stats = RenderQueueStats()
+        for view in views:
+            if view.emitter_id not in dirty:
+                continue
+            layer = self._layer(view.emitter_id)
+            layer.renderer.profiler = self.profiler
+            layer.clear_color.rgba = LAYER_CLEAR_COLORS.get(view.blending_mode, _TRANSPARENT)
+            rows = select_particles(view.pool, draw_order(view.pool, view.rows), quality, size_scale)
+            layer.renderer.draw(view.pool, [(view.blending_mode, rows)], offset=local_offset, size_scale=size_scale)
+            stats.add(layer.renderer.queue_stats)
+        order = [(view.emitter_id, view.blending_mode) for view in views if len(view)]
+        self._update_composite(order)
+        # Every layer is its own texture; the composite only saves repeated blend switches
+        layers = [(blend_mode, emitter_id, None) for emitter_id, blend_mode in order]
+        stats.add(render_queue_stats(len(layers), build_render_queue(layers)))
+        self.queue_stats = stats
+
+    def clear(self):
+        self._layer_group.clear()
+        self._layers.clear()
+        self.tracker.invalidate()
+        self._update_composite([])
+        self.queue_stats = RenderQueueStats()
+
+    def _layer(self, emitter_id: str) -> _Layer:
+        layer = self._layers.get(emitter_id)
+        if layer is None:
+            layer = _Layer(self.layer_size, self.quality.resolution_scale, self._renderer_options)
+            if self._sprite_args:
+                layer.renderer.update_sprites(*self._sprite_args)
+            self._layers[emitter_id] = layer
+            self._layer_group.add(layer.fbo)
+        return layer
+
+    def _update_composite(self, order: List[Tuple[str, str]]):
+        # Rebuilt only when the set, order or blend modes of visible layers change
+        if order == self._composite_order:
+            return
+        self._composite_order = order
+        group = self._composite_group
+        group.clear()
+        self._composite_rects = []
+        current = DEFAULT_BLEND_FUNC
+        group.add(Color(1, 1, 1, 1))
+        for emitter_id, blend_mode in order:
+            blend_func = COMPOSITE_BLEND_FUNCS.get(blend_mode, COMPOSITE_BLEND_FUNCS["alpha"])
+            if blend_func != current:
+                group.add(Callback(lambda instr, f=blend_func: glBlendFuncSeparate(*f)))
+                current = blend_func
+            rect = Rectangle(pos=self.pos, size=self.size, texture=self._layers[emitter_id].fbo.texture)
+            self._composite_rects.append(rect)
+            group.add(rect)
+        if current != DEFAULT_BLEND_FUNC:
+            group.add(Callback(lambda instr: glBlendFuncSeparate(*DEFAULT_BLEND_FUNC)))
@@ -0,0 +1,288 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from kivy.graphics import Callback, InstructionGroup, Mesh, RenderContext
+from kivy.graphics.opengl import (GL_SRC_ALPHA, GL_ONE, GL_ONE_MINUS_SRC_ALPHA, GL_ZERO, GL_ONE_MINUS_SRC_COLOR,
+                                  GL_DST_COLOR, glBlendFuncSeparate)
+from kivy.graphics.texture import Texture
+
+try:
+    from core.profiler import NO_PROFILE
+    from core.render_queue import RenderQueueStats, build_render_queue, render_queue_stats
+    from core.sprite_batch import (MAX_QUADS_PER_MESH, VERTEX_STRIDE, SpriteTable, disc_pixels,
+                                   expand_flipbooks, fill_quad_vertices, quad_indices)
+except ImportError:
+    # Imported as src.ui.preview_window.mesh_renderer (e.g. from main.py)
+    from src.core.profiler import NO_PROFILE
+    from src.core.render_queue import RenderQueueStats, build_render_queue, render_queue_stats
+    from src.core.sprite_batch import (MAX_QUADS_PER_MESH, VERTEX_STRIDE, SpriteTable, disc_pixels,
+                                       expand_flipbooks, fill_quad_vertices, quad_indices)
+
+# (src_rgb, dst_rgb, src_alpha, dst_alpha) per blend mode, for premultiplied fragments:
+# textures are premultiplied on import (core.asset_import) and PARTICLE_FS
+# premultiplies the vertex color, so transparent texels never touch the
+# destination, whatever RGB the source image stored there
+BLEND_FUNCS: Dict[str, Tuple[int, int, int, int]] = {
+    "alpha": (GL_ONE, GL_ONE_MINUS_SRC_ALPHA, GL_ONE, GL_ONE_MINUS_SRC_ALPHA),
+    "additive": (GL_ONE, GL_ONE, GL_ONE, GL_ONE),
+    "multiply": (GL_DST_COLOR, GL_ONE_MINUS_SRC_ALPHA, GL_ZERO, GL_ONE), # dst * lerp(1, src, alpha)
+    "screen": (GL_ONE, GL_ONE_MINUS_SRC_COLOR, GL_ONE, GL_ONE_MINUS_SRC_ALPHA),
+}
+# Kivy's own blend state, restored after drawing
+DEFAULT_BLEND_FUNC = (GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+VERTEX_FORMAT = [(b'vPosition', 2, 'float'), (b'vTexCoords0', 2, 'float'), (b'vColor', 4, 'float')]
+
+# Kivy's default shaders take a single uniform color; these read it per vertex
+PARTICLE_VS = '''
+$HEADER$
+attribute vec4 vColor;
+void main (void) {
+  frag_color = vColor;
+  tex_coord0 = vTexCoords0;
+  gl_Position = projection_mat * modelview_mat * vec4(vPosition.xy, 0.0, 1.0);
+}
+'''
+PARTICLE_FS = '''
+$HEADER$
+void main (void) {
+  gl_FragColor = vec4(frag_color.rgb * frag_color.a, frag_color.a) * texture2D(texture0, tex_coord0);
+}
+'''
+
+_FALLBACK_SLOT = -1
+
+
+def _concatenate(chunks: List[np.ndarray]) -> np.ndarray:
+    return np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def sprite_textures_key(sprite_ids: Sequence[Optional[str]], textures, effect_ir=None) -> tuple:
+    """Changes when a sprite table built from `sprite_ids` and `textures` would differ."""
+    return (len(sprite_ids), id(textures), len(textures), getattr(textures, "generation", 0),
+            len(effect_ir.flipbooks) if effect_ir else 0)
+
+
+def make_disc_texture(size: int = 32) -> Texture:
+    """White anti-aliased disc on transparent, for untextured round particles."""
+    pixels = disc_pixels(size)
+    texture = Texture.create(size=(size, size), colorfmt='rgba')
+    texture.blit_buffer(pixels.tobytes(), colorfmt='rgba', bufferfmt='ubyte')
+    return texture
+
+
+class _MeshBatch:
+    # One draw of the render queue: a blend switch, skipped when the previous
+    # batch blends the same way, and as many meshes as the unsigned-short
+    # index limit requires. Batches are reused by queue position.
+
+    def __init__(self):
+        self.group = InstructionGroup()
+        self.texture = None
+        self.blend_func: Tuple[int, int, int, int] = DEFAULT_BLEND_FUNC
+        self.switch_blend: bool = False
+        self.meshes: List[Mesh] = []
+        self.group.add(Callback(self._apply_blend))
+        self.vertices = np.empty((0, 4, VERTEX_STRIDE), dtype=np.float32)
+        self.quad_count = 0
+
+    def _apply_blend(self, instr):
+        if self.switch_blend:
+            glBlendFuncSeparate(*self.blend_func)
+
+    def set_state(self, texture, blend_func: Tuple[int, int, int, int], switch_blend: bool):
+        if texture is not self.texture:
+            self.texture = texture
+            for mesh in self.meshes:
+                mesh.texture = texture
+        self.blend_func = blend_func
+        self.switch_blend = switch_blend
+
+    def reserve(self, quad_count: int) -> np.ndarray:
+        if quad_count > self.vertices.shape[0]:
+            self.vertices = np.empty((max(quad_count, 2 * self.vertices.shape[0]), 4, VERTEX_STRIDE), dtype=np.float32)
+        return self.vertices[:quad_count]
+
+    def upload(self, quad_count: int, indices: np.ndarray):
+        self.quad_count = quad_count
+        chunks = max(1, -(-quad_count // MAX_QUADS_PER_MESH))
+        while len(self.meshes) < chunks:
+            mesh = Mesh(fmt=VERTEX_FORMAT, mode='triangles', texture=self.texture)
+            self.meshes.append(mesh)
+            self.group.add(mesh)
+        flat = self.vertices.reshape(-1)
+        for i, mesh in enumerate(self.meshes):
+            first = min(i * MAX_QUADS_PER_MESH, quad_count)
+            last = min(first + MAX_QUADS_PER_MESH, quad_count)
+            mesh.vertices = flat[first * 4 * VERTEX_STRIDE:last * 4 * VERTEX_STRIDE]
+            mesh.indices = indices[:(last - first) * 6]
+
+
+class ParticleMeshRenderer:
+    """Draws pooled particles with persistent Kivy Meshes, one draw per texture and blend mode run.
+
+    Vertex buffers (rotated quad corners, UVs, per-vertex color) are filled
+    from the pool columns with a few NumPy operations per batch, so neither
+    the Python work nor the number of canvas instructions grows with the
+    particle count.
+
+    Each frame's groups are split by texture and merged by a render queue
+    (see core.render_queue): consecutive draws sharing a texture and blend
+    mode become one, and additive or multiply runs are regrouped by texture,
+    while alpha and screen keep the given order. All batches share one
+    shader context and switch blend functions only between differing
+    batches; `queue_stats` tells what the last draw() saved.
+
+    Particles whose sprite has no texture are drawn with `default_texture`
+    (untextured if None), in `fallback_color` and at `fallback_size` when
+    those are given. `blend_funcs` overrides BLEND_FUNCS, e.g. for drawing
+    into offscreen layers.
+    """
+
+    def __init__(self, canvas, default_texture=None,
+                 fallback_color: Optional[Tuple[float, float, float, float]] = None,
+                 fallback_size: Optional[float] = None,
+                 blend_funcs: Optional[Dict[str, Tuple[int, int, int, int]]] = None):
+        self.canvas = canvas
+        self.blend_funcs = blend_funcs or BLEND_FUNCS
+        self.profiler = None # FrameProfiler receiving vertices/draw timings
+        self.default_texture = default_texture
+        self.fallback_color = fallback_color
+        self.fallback_size = fallback_size
+        self.sprite_table: SpriteTable = SpriteTable(0)
+        self.queue_stats: RenderQueueStats = RenderQueueStats()
+        self._sprite_key: Optional[tuple] = None
+        self._batches: List[_MeshBatch] = [] # By render queue position
+        self._indices = np.empty(0, dtype=np.uint16)
+        self._restore_blend = False
+        self.context = RenderContext(use_parent_projection=True, use_parent_modelview=True,
+                                     use_parent_frag_modelview=True)
+        self.context.shader.vs = PARTICLE_VS
+        self.context.shader.fs = PARTICLE_FS
+        self._batch_group = InstructionGroup()
+        self.context.add(self._batch_group)
+        self.context.add(Callback(self._apply_default_blend))
+        canvas.add(self.context)
+
+    @property
+    def instruction_count(self) -> int:
+        return 3 + sum(len(batch.meshes) + 1 for batch in self._batches)
+
+    def _apply_default_blend(self, instr):
+        if self._restore_blend:
+            glBlendFuncSeparate(*DEFAULT_BLEND_FUNC)
+
+    def update_sprites(self, sprite_ids: Sequence[Optional[str]], textures: Dict[str, object], effect_ir=None):
+        """Rebuild the sprite table when new sprite ids were interned or textures loaded.
+
+        `textures` maps sprite ids to textures; a TextureCache may be passed,
+        in which case its generation tells when textures were loaded or evicted.
+        Flipbooks in `effect_ir` are resolved to the textures of their frames.
+        """
+        if sprite_textures_key(sprite_ids, textures, effect_ir) == self._sprite_key:
+            return
+        row_ids, flipbooks = expand_flipbooks(sprite_ids, effect_ir)
+        table = SpriteTable(len(row_ids))
+        for flipbook in flipbooks:
+            table.set_flipbook(*flipbook)
+        for index, sprite_id in enumerate(row_ids):
+            texture = textures.get(sprite_id) if sprite_id else None
+            if texture is None:
+                continue
+            definition = effect_ir.get_sprite_definition(sprite_id) if effect_ir else None
+            pivot = definition.pivot if definition else (0.5, 0.5)
+            width, height = texture.size
+            # Regions of one atlas share the GL texture, and so a batch
+            table.set_sprite(index, texture.id, texture, texture.tex_coords, pivot,
+                             height / width if width else 1.0)
+        self.sprite_table = table
+        # Taken after the lookups, which may themselves load or evict atlases
+        self._sprite_key = sprite_textures_key(sprite_ids, textures, effect_ir)
+
+    def _texture_key(self, slot: int) -> object:
+        # Slots are renumbered when the sprite table is rebuilt; texture keys are stable
+        return None if slot == _FALLBACK_SLOT else self.sprite_table.texture_keys[slot]
+
+    def _batch(self, position: int) -> _MeshBatch:
+        while len(self._batches) <= position:
+            batch = _MeshBatch()
+            self._batches.append(batch)
+            self._batch_group.add(batch.group)
+        return self._batches[position]
+
+    def draw(self, pool, groups: Sequence[Tuple[str, object]], offset: Tuple[float, float] = (0.0, 0.0),
+             size_scale: float = 1.0):
+        """Upload one frame. `groups` are (blend_mode, rows) pairs in draw order, `rows`
+        being a slice or index array into `pool`; offset/size_scale map simulation
+        units to widget coordinates."""
+        table = self.sprite_table
+        items = []
+        for blend_mode, rows in groups:
+            if isinstance(rows, slice):
+                rows = np.arange(*rows.indices(pool.count))
+            if len(rows) == 0:
+                continue
+            sprite_rows = table.sprite_rows(pool, rows) # -1 selects the no-sprite row
+            slots = table.slot[sprite_rows]
+            order = np.argsort(slots, kind="stable")
+            sorted_slots = slots[order]
+            for slot in np.unique(sorted_slots).tolist():
+                lo, hi = np.searchsorted(sorted_slots, [slot, slot + 1])
+                items.append((blend_mode, self._texture_key(slot),
+                              (slot, rows[order[lo:hi]], sprite_rows[order[lo:hi]])))
+        queue = build_render_queue(items)
+        self.queue_stats = render_queue_stats(len(items), queue)
+
+        profiler = self.profiler
+        counts: List[int] = []
+        with profiler.phase("vertices") if profiler else NO_PROFILE:
+            for position, queued in enumerate(queue):
+                slot = queued.payloads[0][0]
+                rows = _concatenate([payload[1] for payload in queued.payloads])
+                sprite_rows = _concatenate([payload[2] for payload in queued.payloads])
+                self._fill(self._batch(position), pool, rows, sprite_rows, slot, offset, size_scale)
+                counts.append(len(rows))
+        with profiler.phase("draw") if profiler else NO_PROFILE:
+            self._ensure_indices(max(counts, default=0))
+            current = DEFAULT_BLEND_FUNC
+            for position, batch in enumerate(self._batches):
+                if position < len(queue):
+                    queued = queue[position]
+                    slot = queued.payloads[0][0]
+                    texture = self.default_texture if slot == _FALLBACK_SLOT else table.textures[slot]
+                    blend_func = self.blend_funcs.get(queued.blend_mode, self.blend_funcs["alpha"])
+                    batch.set_state(texture, blend_func, blend_func != current)
+                    current = blend_func
+                    batch.upload(counts[position], self._indices)
+                else:
+                    batch.upload(0, self._indices)
+            self._restore_blend = current != DEFAULT_BLEND_FUNC
+
+    def clear(self):
+        for batch in self._batches:
+            batch.upload(0, self._indices)
+        self._restore_blend = False
+        self.queue_stats = RenderQueueStats()
+
+    def _fill(self, batch: _MeshBatch, pool, rows: np.ndarray, sprite_rows: np.ndarray, slot: int, offset,
+              size_scale: float):
+        table = self.sprite_table
+        position = pool.position[rows] + offset
+        size = pool.size[rows] * size_scale
+        rotation = pool.rotation[rows]
+        color = pool.color[rows]
+        if slot == _FALLBACK_SLOT:
+            if self.fallback_size is not None:
+                size = np.full(len(rows), self.fallback_size)
+                rotation = np.zeros(len(rows))
+            if self.fallback_color is not None:
+                color = np.broadcast_to(np.asarray(self.fallback_color, dtype=np.float64), (len(rows), 4))
+        fill_quad_vertices(batch.reserve(len(rows)), position, size, rotation, color,
+                           table.tex_coords[sprite_rows], table.pivot[sprite_rows], table.aspect[sprite_rows])
+
+    def _ensure_indices(self, quad_count: int):
+        quad_count = min(quad_count, MAX_QUADS_PER_MESH) # Larger batches are split across meshes
+        if quad_count * 6 > len(self._indices):
+            grown = min(max(quad_count, 2 * len(self._indices) // 6), MAX_QUADS_PER_MESH)
+            self._indices = quad_indices(grown).astype(np.uint16)
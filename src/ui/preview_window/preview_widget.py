@@ -2,10 +2,8 @@ from kivy.uix.widget import Widget
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.uix.spinner import Spinner
-from kivy.graphics import Color, Rectangle, PushMatrix, PopMatrix, Rotate, Translate, Callback
-from kivy.graphics.opengl import GL_SRC_ALPHA, GL_ONE, GL_ONE_MINUS_SRC_ALPHA, GL_ZERO, GL_SRC_COLOR, GL_ONE_MINUS_SRC_COLOR, GL_DST_COLOR, GL_DST_ALPHA, GL_ONE_MINUS_DST_COLOR, GL_ONE_MINUS_DST_ALPHA, glBlendFuncSeparate # Added missing ones
+from kivy.graphics import Color, Rectangle
 from kivy.clock import Clock
-from kivy.core.image import Image as CoreImage
 from kivy.properties import ObjectProperty, ListProperty
 from kivy.config import Config
 
@@ -16,7 +14,9 @@ import os
 # Add src directory to Python path to allow direct imports of core modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 from core.ir import EffectIR, EmitterProperties, EmitterParameter, SpriteAsset, SpriteDefinition
-from core.particle_system import ParticleSystem, Particle
+from core.particle_system import ParticleSystem
+from ui.preview_window.mesh_renderer import ParticleMeshRenderer
+from ui.preview_window.kivy_textures import make_texture_cache
 
 # Placeholder for actual texture loading, Kivy requires textures to be loaded
 # typically via Image.texture or similar.
@@ -26,11 +26,13 @@ class PreviewWidget(Widget):
     effect_ir = ObjectProperty(None)
     particle_system = ObjectProperty(None)
     
-    # Store texture references here once loaded
-    _sprite_textures = {} # Dict to hold {definition_id: KivyTexture}
+    # Sprite region textures by definition id, loaded through a shared atlas cache
+    texture_cache = None
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        # Persistent meshes in self.canvas; particles without a texture are drawn as small red dots
+        self.renderer = ParticleMeshRenderer(self.canvas, fallback_color=(1, 0, 0, 1), fallback_size=4)
         self.draw_background() # Draw the background first
         self.setup_effect()
         Clock.schedule_interval(self.update_simulation, 1.0 / 60.0)
@@ -127,36 +129,8 @@ class PreviewWidget(Widget):
     def load_sprite_textures(self):
         if not self.effect_ir:
             return
-        for def_id, sprite_def in self.effect_ir.sprite_definitions.items():
-            asset = self.effect_ir.get_sprite_asset(sprite_def.asset_id)
-            if asset:
-                try:
-                    # CoreImage is used for loading, its texture is what we need.
-                    # This path should be relative to the application's execution directory
-                    # or an absolute path.
-                    image = CoreImage(asset.path, nocache=True)
-                    if image.texture:
-                        # Get the subtexture (region)
-                        # sprite_def.region is (x_tl, y_tl, w, h) from top-left
-                        # Kivy's get_region expects (x_bl, y_bl, w, h) from bottom-left
-                        rx, ry_tl, rw, rh = sprite_def.region
-                        ry_bl = asset.height - ry_tl - rh # Convert y from top-left to bottom-left
-                        
-                        region_texture = image.texture.get_region(rx, ry_bl, rw, rh)
-                        
-                        # Avoid sampling outside the sprite region which causes white borders in Screen mode
-                        region_texture.wrap = 'clamp_to_edge'
-                        region_texture.mag_filter = 'nearest'
-                        region_texture.min_filter = 'nearest'
-                        
-                        self._sprite_textures[def_id] = region_texture
-                        print(f"Successfully loaded texture for: {def_id} from {asset.path}")
-                    else:
-                        print(f"Error: Could not get texture from image: {asset.path} for sprite {def_id}")
-                except Exception as e:
-                    print(f"Error loading image {asset.path} for sprite {def_id}: {e}")
-            else:
-                print(f"Error: Asset {sprite_def.asset_id} not found for sprite {def_id}")
+        # Atlases are decoded and uploaded once per SpriteAsset; regions are cut on first draw
+        self.texture_cache = make_texture_cache(self.effect_ir)
 
 
     def update_emitter_position(self, *args):
@@ -172,7 +146,6 @@ class PreviewWidget(Widget):
         if self.particle_system:
             current_time = Clock.get_time() # Or manage a specific timeline time
             self.particle_system.update(dt, current_time)
-            self.canvas.clear() # Clear previous frame
             self.draw_particles()
 
     def draw_particles(self):
@@ -184,93 +157,10 @@ class PreviewWidget(Widget):
         if not emitter:
             return
 
-        current_blend_mode = emitter.blending_mode
-        
-        # Store Kivy's default blend func to restore later
-        # Kivy default is (GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA) for both color and alpha
-        default_src_rgb = GL_SRC_ALPHA
-        default_dst_rgb = GL_ONE_MINUS_SRC_ALPHA
-        default_src_alpha = GL_SRC_ALPHA
-        default_dst_alpha = GL_ONE_MINUS_SRC_ALPHA
-
-        with self.canvas:
-            # We need to use a Callback to make raw OpenGL calls at the right time in Kivy's graphics pipeline.
-            if current_blend_mode == "additive":
-                # Common non-PMA Additive: Src*SrcAlpha + Dst*1
-                Callback(lambda instr: glBlendFuncSeparate(GL_SRC_ALPHA, GL_ONE, GL_SRC_ALPHA, GL_ONE))
-            elif current_blend_mode == "alpha": # Standard non-PMA alpha blending
-                # Result = Src*SrcAlpha + Dst*(1-SrcAlpha)
-                Callback(lambda instr: glBlendFuncSeparate(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA))
-            elif current_blend_mode == "multiply":
-                # Multiply: Dst * Src (DstRGB * SrcRGB, DstAlpha * SrcAlpha)
-                Callback(lambda instr: glBlendFuncSeparate(GL_DST_COLOR, GL_ZERO, GL_DST_ALPHA, GL_ZERO))
-            elif current_blend_mode == "screen":
-                # Screen with source pre-multiplied by its alpha: Src*SrcA + Dst*(1-SrcColor)
-                # This darkens any fully transparent RGB so they don't lighten the background.
-                Callback(lambda instr: glBlendFuncSeparate(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_COLOR, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA))
-            # Add other blend modes here if needed
-
-            for p in self.particle_system.get_alive_particles():
-                sprite_def_id = p.sprite_definition_id
-                texture = self._sprite_textures.get(sprite_def_id)
-
-                if not texture:
-                    # Fallback: draw a small red dot if texture not found
-                    Color(1, 0, 0, 1) # Red, Opaque
-                    PushMatrix()
-                    Translate(p.position[0] - 2, p.position[1] - 2) # Center the dot
-                    # No rotation for a simple dot
-                    Rectangle(size=(4, 4)) # Small 4x4 dot
-                    PopMatrix()
-                    if sprite_def_id and sprite_def_id not in self._sprite_textures:
-                         # Print warning only once per missing texture to avoid spam
-                        # print(f"Warning: Texture not found for {sprite_def_id}. Drawing fallback.")
-                        # self._sprite_textures[sprite_def_id] = None # Mark as checked to avoid spam
-                        pass
-                    continue
-
-                # If texture found, draw it
-                sprite_definition = self.effect_ir.get_sprite_definition(sprite_def_id)
-                if not sprite_definition: # Should not happen if texture was found by its ID
-                    continue 
-
-                # Calculate drawing origin based on pivot
-                # SpriteDefinition region is (x,y,w,h), texture.size is (w,h) of the region
-                draw_w, draw_h = texture.size[0], texture.size[1]
-                
-                # Scale particle size relative to base texture size - this needs refinement.
-                # For now, let particle.size directly be the screen size.
-                display_size_w = p.size 
-                display_size_h = p.size * (draw_h / draw_w if draw_w != 0 else 1.0)
-
-
-                # Pivot is normalized (0-1) relative to sprite definition region
-                # Origin for Kivy rotation is relative to the particle's bottom-left after translation
-                origin_x = display_size_w * sprite_definition.pivot[0]
-                origin_y = display_size_h * sprite_definition.pivot[1]
-                
-                pos_x = p.position[0] - origin_x
-                pos_y = p.position[1] - origin_y
-
-                # Apply tint if present (TEMPORARILY REMOVED FOR TESTING)
-                # final_color = list(p.color)
-                # if self.particle_system and self.particle_system.emitter_properties:
-                #     tint = self.particle_system.emitter_properties.get_param_value("particle_color_tint", None)
-                #     if tint:
-                #         final_color[0] *= tint[0]
-                #         final_color[1] *= tint[1]
-                #         final_color[2] *= tint[2]
-                #         # final_color[3] *= tint[3] # Usually don't tint alpha, particle's own alpha is king
-
-                Color(p.color[0], p.color[1], p.color[2], p.color[3]) # Use p.color directly for this test
-                PushMatrix()
-                Translate(pos_x, pos_y)
-                Rotate(angle=p.rotation, origin=(origin_x, origin_y))
-                Rectangle(texture=texture, size=(display_size_w, display_size_h))
-                PopMatrix()
-            
-            # Restore default blending mode after drawing all particles for this emitter
-            Callback(lambda instr: glBlendFuncSeparate(default_src_rgb, default_dst_rgb, default_src_alpha, default_dst_alpha))
+        # One mesh per texture and blend mode, refilled in bulk from the pool columns
+        pool = self.particle_system.pool
+        self.renderer.update_sprites(pool.sprite_ids, self.texture_cache, self.effect_ir)
+        self.renderer.draw(pool, [(emitter.blending_mode, slice(0, pool.count))])
 
 if __name__ == '__main__':
     from kivy.app import App
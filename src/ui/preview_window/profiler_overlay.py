@@ -0,0 +1,103 @@
+import numpy as np
+
+from kivy.clock import Clock
+from kivy.graphics import Color, Line, Rectangle
+from kivy.metrics import dp
+from kivy.uix.label import Label
+from kivy.uix.widget import Widget
+
+try:
+    from core.profiler import FrameProfiler
+except ImportError:
+    # Imported as src.ui.preview_window.profiler_overlay (e.g. from main.py)
+    from src.core.profiler import FrameProfiler
+
+GRAPH_FRAMES = 120
+GRAPH_RANGE_MS = 33.3 # Top of the graph; the guide line marks 60 fps
+BUDGET_MS = 1000.0 / 60.0
+PHASE_COLORS = {
+    "emit": (0.98, 0.75, 0.18, 1),
+    "update": (0.35, 0.75, 0.98, 1),
+    "curves": (0.67, 0.47, 0.98, 1),
+    "vertices": (0.40, 0.90, 0.45, 1),
+    "draw": (0.98, 0.40, 0.40, 1),
+}
+
+
+class ProfilerOverlay(Widget):
+    """Frame-time graph and per-phase breakdown of a FrameProfiler.
+
+    Redrawn a few times per second rather than every frame, so showing it
+    does not distort what it measures.
+    """
+
+    def __init__(self, profiler: FrameProfiler, refresh_interval: float = 0.25, **kwargs):
+        super().__init__(**kwargs)
+        self.profiler = profiler
+        with self.canvas:
+            Color(0, 0, 0, 0.6)
+            self._background = Rectangle()
+            Color(1, 1, 1, 0.25)
+            self._budget_line = Line(width=1)
+            Color(1, 1, 1, 1)
+            self._frame_line = Line(width=1.2)
+            self._phase_lines = {}
+            for name in profiler.phases:
+                Color(*PHASE_COLORS.get(name, (0.8, 0.8, 0.8, 1)))
+                self._phase_lines[name] = Line(width=1)
+        self.label = Label(font_size='10sp', halign='left', valign='top', markup=True)
+        self.add_widget(self.label)
+        self.bind(pos=self.refresh, size=self.refresh)
+        self._event = Clock.schedule_interval(self.refresh, refresh_interval)
+
+    def close(self):
+        if self._event:
+            self._event.cancel()
+            self._event = None
+
+    def refresh(self, *args):
+        x, y = self.pos
+        width, height = self.size
+        graph_height = height * 0.45
+        self._background.pos, self._background.size = self.pos, self.size
+        budget_y = y + graph_height * min(1.0, BUDGET_MS / GRAPH_RANGE_MS)
+        self._budget_line.points = [x, budget_y, x + width, budget_y]
+
+        count = min(len(self.profiler), GRAPH_FRAMES)
+        step = width / max(1, GRAPH_FRAMES - 1)
+        xs = x + step * (GRAPH_FRAMES - count + np.arange(count))
+
+        def points(name):
+            if count < 2:
+                return []
+            ys = y + graph_height * (self.profiler.recent(name)[-count:] * 1000.0 / GRAPH_RANGE_MS).clip(0.0, 1.0)
+            return np.column_stack((xs, ys)).ravel().tolist()
+
+        self._frame_line.points = points("frame")
+        for name, line in self._phase_lines.items():
+            line.points = points(name)
+
+        self.label.pos = (x + dp(4), y + graph_height)
+        self.label.size = (width - dp(8), height - graph_height - dp(4))
+        self.label.text_size = self.label.size
+        self.label.text = self._breakdown()
+
+    def _breakdown(self) -> str:
+        summary = self.profiler.summary()
+        if not summary:
+            return "Profiling..."
+        lines = [f"frame {summary['frame']['mean'] * 1000:.1f} ms (p95 {summary['frame']['p95'] * 1000:.1f})"]
+        for name in self.profiler.phases:
+            r, g, b, _a = PHASE_COLORS.get(name, (0.8, 0.8, 0.8, 1))
+            color = f"{int(r * 255):02x}{int(g * 255):02x}{int(b * 255):02x}"
+            lines.append(f"[color={color}]{name}[/color] {summary[name]['mean'] * 1000:.2f} ms "
+                         f"(p95 {summary[name]['p95'] * 1000:.2f})")
+        lines.append(f"gc {summary['gc']['mean'] * 1000:.2f} ms, "
+                     f"{int(self.profiler.recent('instructions')[-1])} instructions")
+        lines.append(f"{int(self.profiler.recent('draw_calls')[-1])} draws, "
+                     f"{int(self.profiler.recent('state_changes_saved')[-1])} state changes saved")
+        particles = ", ".join(f"{emitter_id} {count}"
+                              for emitter_id, count in self.profiler.latest_particle_counts().items())
+        if particles:
+            lines.append(particles)
+        return "\n".join(lines)
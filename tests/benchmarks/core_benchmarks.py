@@ -0,0 +1,223 @@
+"""Core simulation benchmarks.
+
+Runs headless (Kivy is only imported for its event/property modules, never a
+window) and writes machine-readable results that can be compared with a stored
+baseline:
+
+    python -m tests.benchmarks.core_benchmarks --output bench.json
+    python -m tests.benchmarks.core_benchmarks --update-baseline
+
+Every metric is "seconds per operation" (lower is better). A metric that is
+more than `--threshold` slower than the baseline is reported as a regression
+and makes the command exit with status 1.
+
+Refreshing the baseline: after a change that speeds up (or knowingly slows
+down) the measured code, run `--update-baseline --runs 5` (the median of five
+suite runs; single runs vary by tens of percent) from the repository root on
+an otherwise idle machine and commit baseline.json with the change. The
+baseline records the commit and environment it was measured in; compare only
+against a baseline from the same machine, since timings do not transfer.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+os.environ.setdefault("KIVY_NO_FILELOG", "1")
+
+import numpy as np
+
+from src.core.ir import AnimatedParameter, EffectIR, EmitterParameter, EmitterProperties, TimelineKeyframe
+from src.core.particle_system import ParticleSystem
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_THRESHOLD = 0.25 # 25% slower than baseline counts as a regression
+FRAME_DT = 1.0 / 60.0
+
+
+def make_effect(emission_rate: float, lifespan: float = 1.0) -> EffectIR:
+    values = {
+        "emission_rate": emission_rate,
+        "lifespan_range": (0.5 * lifespan, 1.5 * lifespan),
+        "speed_range": (50.0, 150.0),
+        "emission_angle_range_deg": (-30.0, 30.0),
+        "size_range": (8.0, 16.0),
+        "rotation_range_deg": (0.0, 360.0),
+        "angular_velocity_range_dps": (-90.0, 90.0),
+        "acceleration_vector": (0.0, -50.0),
+        "particle_color": (1.0, 1.0, 1.0, 1.0),
+        "sprite_definition_id": "spark",
+        "size_over_lifespan": [(0.0, 0.2), (0.1, 1.0), (0.7, 0.8), (1.0, 0.0)],
+        "opacity_over_lifespan": [(0.0, 0.0), (0.1, 1.0), (0.8, 1.0), (1.0, 0.0)],
+        "color_over_lifespan": [(0.0, (1.0, 0.0, 0.0, 1.0)), (0.5, (1.0, 1.0, 0.0, 1.0)), (1.0, (0.0, 0.0, 1.0, 0.5))],
+    }
+    effect_ir = EffectIR(loop_duration=5.0)
+    effect_ir.add_emitter(EmitterProperties(
+        emitter_id="bench",
+        emitter_type="PointParticleEmitter",
+        parameters={name: EmitterParameter(name=name, value=value) for name, value in values.items()},
+    ))
+    effect_ir.add_or_update_timeline("bench/particle_color", AnimatedParameter(keyframes=[
+        TimelineKeyframe(time=0.0, value=(1.0, 1.0, 1.0, 1.0)),
+        TimelineKeyframe(time=2.5, value=(1.0, 0.5, 0.0, 1.0)),
+        TimelineKeyframe(time=5.0, value=(1.0, 1.0, 1.0, 1.0)),
+    ]))
+    return effect_ir
+
+
+def _best_of(fn: Callable[[], None], repeats: int, setup: Optional[Callable[[], None]] = None) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _filled_system(n: int) -> ParticleSystem:
+    # n particles that outlive the benchmark; no further emission
+    ps = ParticleSystem(make_effect(emission_rate=0.0, lifespan=1000.0), "bench", max_particles=n)
+    ps.emit_batch(n, 0.0, 0.0)
+    return ps
+
+
+def bench_spawn(n: int, repeats: int = 5) -> float:
+    """Seconds per particle to emit a batch of n."""
+    ps = ParticleSystem(make_effect(emission_rate=0.0), "bench", max_particles=n)
+    return _best_of(lambda: ps.emit_batch(n, 0.0, FRAME_DT), repeats, setup=ps.reset) / n
+
+
+def bench_update(n: int, repeats: int = 20) -> float:
+    """Seconds per frame to advance n live particles (no emission, no deaths)."""
+    ps = _filled_system(n)
+    clock = [0.0]
+
+    def step():
+        ps.update(FRAME_DT, clock[0])
+        clock[0] += FRAME_DT
+    return _best_of(step, repeats)
+
+
+def bench_curves(n: int, repeats: int = 20) -> float:
+    """Seconds per frame to evaluate size/opacity/color lifetime curves for n particles."""
+    ps = _filled_system(n)
+    ps.pool.age[:n] = np.linspace(0.0, 1000.0, n)
+    return _best_of(ps._apply_lifetime_curves, repeats)
+
+
+def bench_param_lookup(calls: int = 20000, repeats: int = 5) -> float:
+    """Seconds per EffectIR.get_animated_param_value call (animated and base parameters)."""
+    effect_ir = make_effect(emission_rate=100.0)
+    times = [(i % 500) / 100.0 for i in range(calls)]
+
+    def lookups():
+        get = effect_ir.get_animated_param_value
+        for t in times:
+            get("bench", "particle_color", t)
+            get("bench", "speed_range", t)
+    return _best_of(lookups, repeats) / (2 * calls)
+
+
+def bench_end_to_end(n: int, frames: int = 30, repeats: int = 3) -> float:
+    """Seconds per frame (emit + update + curves + removal) at a steady state of ~n particles."""
+    lifespan = 1.0
+    ps = ParticleSystem(make_effect(emission_rate=n / lifespan, lifespan=lifespan), "bench", max_particles=2 * n)
+    clock = [0.0]
+
+    def run(frame_count):
+        for _ in range(frame_count):
+            ps.update(FRAME_DT, clock[0])
+            clock[0] += FRAME_DT
+    run(int(1.5 * lifespan / FRAME_DT)) # Warm up to steady state
+    return _best_of(lambda: run(frames), repeats) / frames
+
+
+def run_suite(sizes: Sequence[int] = DEFAULT_SIZES) -> Dict[str, float]:
+    results: Dict[str, float] = {"param_lookup_s": bench_param_lookup()}
+    for n in sizes:
+        results[f"spawn_s_per_particle/{n}"] = bench_spawn(n)
+        results[f"update_s_per_frame/{n}"] = bench_update(n)
+        results[f"curves_s_per_frame/{n}"] = bench_curves(n)
+        results[f"end_to_end_s_per_frame/{n}"] = bench_end_to_end(n)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Return a description of every metric more than `threshold` slower than baseline."""
+    regressions = []
+    for name, value in sorted(results.items()):
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        ratio = value / reference
+        if ratio > 1.0 + threshold:
+            regressions.append(f"{name}: {value:.3e}s vs baseline {reference:.3e}s ({(ratio - 1.0) * 100:.0f}% slower)")
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown" # Not a git checkout, or git is not installed
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sparcle core simulation benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--runs", type=int, default=1, help="Report the median of this many suite runs")
+    parser.add_argument("--update-baseline", action="store_true", help="Overwrite the baseline with these results")
+    args = parser.parse_args(argv)
+
+    runs = [run_suite(args.sizes) for _ in range(max(args.runs, 1))]
+    results = {name: float(np.median([run[name] for run in runs])) for name in runs[0]}
+    report = {"environment": environment(), "results": results}
+    for name, value in sorted(results.items()):
+        extra = f"  ({1.0 / value:,.0f} fps)" if name.startswith("end_to_end") else ""
+        print(f"{name:40s} {value:.3e}s{extra}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
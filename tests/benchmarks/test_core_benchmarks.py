@@ -0,0 +1,49 @@
+import json
+
+from tests.benchmarks import core_benchmarks
+
+
+def test_suite_runs_headless_and_reports_every_metric():
+    results = core_benchmarks.run_suite(sizes=(100,))
+    assert set(results) == {
+        "param_lookup_s",
+        "spawn_s_per_particle/100",
+        "update_s_per_frame/100",
+        "curves_s_per_frame/100",
+        "end_to_end_s_per_frame/100",
+    }
+    assert all(value > 0.0 for value in results.values())
+
+
+def test_compare_flags_only_regressions_above_threshold():
+    baseline = {"a": 1.0, "b": 1.0, "c": 1.0}
+    results = {"a": 1.1, "b": 1.5, "c": 0.5, "new_metric": 9.0}
+    regressions = core_benchmarks.compare(results, baseline, threshold=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("b:")
+
+
+def test_main_writes_results_and_detects_regression(tmp_path):
+    baseline_path = tmp_path / "baseline.json"
+    output_path = tmp_path / "results.json"
+    assert core_benchmarks.main(["--sizes", "100", "--baseline", str(baseline_path), "--update-baseline"]) == 0
+
+    baseline = json.loads(baseline_path.read_text())
+    baseline["results"] = {name: value * 1e-6 for name, value in baseline["results"].items()}
+    baseline_path.write_text(json.dumps(baseline))
+    status = core_benchmarks.main(["--sizes", "100", "--baseline", str(baseline_path), "--output", str(output_path)])
+    assert status == 1
+    assert "results" in json.loads(output_path.read_text())
+
+
+def test_stored_baseline_covers_default_sizes():
+    with open(core_benchmarks.BASELINE_PATH) as f:
+        stored = json.load(f)["results"]
+    for n in core_benchmarks.DEFAULT_SIZES:
+        assert f"end_to_end_s_per_frame/{n}" in stored
+
+
+def test_baseline_records_the_commit_it_was_measured_at(tmp_path):
+    baseline_path = tmp_path / "baseline.json"
+    assert core_benchmarks.main(["--sizes", "100", "--runs", "2", "--baseline", str(baseline_path),
+                                 "--update-baseline"]) == 0
+    assert json.loads(baseline_path.read_text())["environment"]["commit"]
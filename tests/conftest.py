@@ -0,0 +1,8 @@
+import os
+
+# Keep Kivy from parsing pytest's command line and from opening a window when
+# core modules (which import kivy.event/kivy.properties) are imported.
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+os.environ.setdefault("KIVY_NO_FILELOG", "1")
+os.environ.setdefault("KIVY_WINDOW", "")
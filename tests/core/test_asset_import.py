@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+
+from src.core.asset_import import AssetImporter, ImportedAsset, load_rgba, premultiply, trim_bounds
+from src.core.ir import SpriteAsset
+from src.core.rasterizer import write_png
+
+
+def _sprite_pixels():
+    # 6 x 4 image: white RGB everywhere, visible texels only in a 3 x 2 box at (2, 1)
+    pixels = np.full((4, 6, 4), 255, dtype=np.uint8)
+    pixels[..., 3] = 0
+    pixels[1:3, 2:5, 3] = [[255, 128, 255], [64, 255, 0]]
+    return pixels
+
+
+def test_premultiply_clears_transparent_texels():
+    pixels = _sprite_pixels()
+    result = premultiply(pixels)
+    assert result[0, 0].tolist() == [0, 0, 0, 0] # White but transparent on disk
+    assert result[1, 3].tolist() == [128, 128, 128, 128]
+    assert result[2, 2].tolist() == [64, 64, 64, 64]
+    assert trim_bounds(pixels) == (2, 1, 3, 2)
+    assert trim_bounds(np.zeros((3, 3, 4), dtype=np.uint8)) == (0, 0, 0, 0)
+
+
+def test_imported_assets_are_trimmed_but_cropped_in_source_coordinates():
+    imported = ImportedAsset.from_pixels("sprite", _sprite_pixels())
+    assert imported.pixels.shape == (2, 3, 4) and imported.offset == (2, 1) and imported.source_size == (6, 4)
+    assert np.array_equal(imported.full_pixels(), premultiply(_sprite_pixels()))
+    inside = imported.crop((3, 1, 2, 2))
+    assert np.shares_memory(inside, imported.pixels)
+    assert np.array_equal(imported.crop((1, 0, 3, 3)), premultiply(_sprite_pixels())[0:3, 1:4])
+
+
+def test_importer_caches_by_content_and_skips_decoding(tmp_path):
+    path = str(tmp_path / "sprite.png")
+    write_png(path, _sprite_pixels())
+    asset = SpriteAsset(asset_id="sprite", path=path, width=6, height=4)
+    decoded = []
+
+    def decode(image_path):
+        decoded.append(image_path)
+        return load_rgba(image_path)
+
+    cache_dir = str(tmp_path / "cache")
+    first = AssetImporter(cache_dir, decode=decode).load(asset)
+    importer = AssetImporter(cache_dir, decode=decode) # A later session
+    second = importer.load(asset)
+    assert len(decoded) == 1 and importer.stats.hits == 1 and importer.stats.imports == 0
+    assert isinstance(second.pixels, np.memmap)
+    assert np.array_equal(second.pixels, first.pixels) and second.offset == first.offset
+
+    pixels = _sprite_pixels()
+    pixels[0, 0, 3] = 255 # Edit the file: new content, new entry
+    write_png(path, pixels)
+    os.utime(path, ns=(0, 0))
+    edited = importer.load(asset)
+    assert len(decoded) == 2 and edited.digest != first.digest
+    assert edited.offset == (0, 0) and edited.pixels.shape == (3, 5, 4)
@@ -0,0 +1,74 @@
+import numpy as np
+
+from src.core.asset_import import load_rgba, premultiply
+from src.core.atlas_packer import AtlasPacker, MaxRectsBin, pack_rectangles
+from src.core.ir import EffectIR, SpriteAsset, SpriteDefinition
+
+
+def _sheet():
+    # 64 x 32 sheet of four 16 x 16 cells: a 6 x 4 box, an identical copy, a 10 x 12 box, nothing
+    pixels = np.zeros((32, 64, 4), dtype=np.uint8)
+    pixels[5:9, 3:9] = [255, 0, 0, 255]
+    pixels[5:9, 19:25] = [255, 0, 0, 255]
+    pixels[2:14, 33:43] = [0, 255, 0, 128]
+    return pixels
+
+
+def _effect():
+    ir = EffectIR()
+    ir.add_sprite_asset(SpriteAsset(asset_id="sheet", path="sheet.png", width=64, height=32))
+    for index, name in enumerate(("red", "red_copy", "green", "empty")):
+        ir.add_sprite_definition(SpriteDefinition(definition_id=name, asset_id="sheet",
+                                                  region=(16 * index, 0, 16, 16), pivot=(0.25, 0.5)))
+    return ir
+
+
+def _overlaps(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def test_maxrects_places_without_overlap():
+    rng = np.random.default_rng(3)
+    sizes = [tuple(int(v) for v in rng.integers(1, 40, 2)) for _ in range(60)]
+    for heuristic in ("short_side", "bottom_left"):
+        pages, placements = pack_rectangles(sizes, heuristic, "area", (128, 128), 2, padding=1)
+        rects = [(page, x, y, w + 1, h + 1) for (page, x, y), (w, h) in zip(placements, sizes)]
+        assert all(x + w <= pages[page][0] + 1 and y + h <= pages[page][1] + 1 for page, x, y, w, h in rects)
+        assert not any(a[0] == b[0] and _overlaps(a[1:], b[1:]) for i, a in enumerate(rects) for b in rects[:i])
+    assert pack_rectangles([(200, 10)], "area", "area", (128, 128), 2) is None
+    bin_ = MaxRectsBin(4, 4)
+    assert [bin_.insert(2, 2, "bottom_left") for _ in range(5)] == [(0, 0), (2, 0), (0, 2), (2, 2), None]
+
+
+def test_atlas_trims_deduplicates_and_remaps():
+    ir = _effect()
+    atlas = AtlasPacker(ir, image_loader=lambda path: _sheet(), padding=1, workers=1).pack()
+    assert len(atlas.pages) == 1 and atlas.duplicates == 1
+    assert atlas.pages[0].asset.width * atlas.pages[0].asset.height == atlas.area <= 32 * 16
+    red, copy, green = atlas.definitions["red"], atlas.definitions["red_copy"], atlas.definitions["green"]
+    assert red.region == copy.region and red.region[2:] == (6, 4) and green.region[2:] == (10, 12)
+    assert atlas.definitions["empty"].region[2:] == (1, 1)
+    assert red.asset_id == atlas.pages[0].asset.asset_id
+    # Packed texels are the trimmed source texels
+    pixels = atlas.pages[0].pixels
+    x, y, w, h = green.region
+    assert np.array_equal(pixels[y:y + h, x:x + w], premultiply(_sheet())[2:14, 33:43])
+    # Pivots stay on the same source point: 4 pixels from the left, 8 from the bottom of the cell
+    region = atlas.regions["red"]
+    assert region.offset == (3, 7) and region.original_size == (16, 16)
+    assert np.allclose((red.pivot[0] * 6 + 3, red.pivot[1] * 4 + 7), (4, 8))
+
+
+def test_parallel_search_and_saved_atlas(tmp_path):
+    ir = _effect()
+    serial = AtlasPacker(ir, image_loader=lambda path: _sheet(), workers=1).pack()
+    parallel = AtlasPacker(ir, image_loader=lambda path: _sheet(), workers=2).pack()
+    assert (parallel.area, parallel.heuristic, parallel.sort_order) == (serial.area, serial.heuristic,
+                                                                         serial.sort_order)
+    paths = serial.save(str(tmp_path), "effect")
+    assert [p.rsplit("/", 1)[-1] for p in paths] == ["atlas_0.png", "effect.atlas"]
+    assert np.array_equal(load_rgba(paths[0]), serial.pages[0].pixels) # Stored premultiplied
+    text = open(paths[1]).read()
+    x, y, w, h = serial.regions["green"].region
+    assert "pma: true" in text and f"green\nbounds: {x},{y},{w},{h}\noffsets: 1,2,16,16" in text
+
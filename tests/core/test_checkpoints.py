@@ -0,0 +1,73 @@
+import numpy as np
+
+from src.core.checkpoints import CheckpointTimeline
+from src.core.ir import AnimatedParameter, TimelineKeyframe
+from src.core.simulator import EffectSimulator
+
+from .test_simulator import _make_ir
+
+DT = 1.0 / 60.0
+
+
+def _sequential_state(ir, steps):
+    sim = EffectSimulator(ir, max_particles=5000)
+    for k in range(steps):
+        sim.step(DT, k * DT)
+    return sim
+
+
+def _assert_same_state(a, b):
+    assert a.pool.count == b.pool.count
+    n = a.pool.count
+    for name in ("particle_id", "emitter_index", "position", "velocity", "rotation", "size", "color", "age"):
+        assert np.array_equal(getattr(a.pool, name)[:n], getattr(b.pool, name)[:n]), name
+
+
+def test_seek_matches_sequential_simulation_in_any_order():
+    ir = _make_ir()
+    timeline = CheckpointTimeline(EffectSimulator(ir, max_particles=5000), dt=DT, interval=0.25)
+    for target in (150, 40, 149, 151, 0, 90):
+        sim = timeline.seek(target * DT)
+        _assert_same_state(sim, _sequential_state(ir, target))
+
+
+def test_seek_steps_at_most_one_interval_once_covered():
+    timeline = CheckpointTimeline(EffectSimulator(_make_ir(), max_particles=5000), dt=DT, interval=0.25)
+    timeline.seek(4.0)
+    for t in (3.9, 0.5, 2.26, 1.0, 3.99):
+        timeline.seek(t)
+        assert timeline.last_seek_steps < timeline.interval_steps
+
+
+def test_memory_limit_evicts_but_keeps_start():
+    ir = _make_ir()
+    timeline = CheckpointTimeline(EffectSimulator(ir, max_particles=5000), dt=DT, interval=0.1,
+                                  memory_limit=200 * 1024)
+    timeline.seek(5.0)
+    assert timeline.memory_used <= 200 * 1024
+    assert timeline.checkpoint_times[0] == 0.0
+    assert 1 < len(timeline.checkpoint_times) < 50
+    _assert_same_state(timeline.seek(2.5), _sequential_state(ir, 150))
+
+
+def test_editing_the_effect_invalidates_checkpoints():
+    ir = _make_ir(("sparks",))
+    timeline = CheckpointTimeline(EffectSimulator(ir, max_particles=5000), dt=DT)
+    timeline.seek(2.0)
+    ir.add_emitter(_make_ir(("smoke",)).emitters[0])
+    sim = timeline.seek(1.0)
+    assert timeline.checkpoint_times[-1] <= 1.0
+    _assert_same_state(sim, _sequential_state(ir, 60))
+
+
+def test_seeking_back_after_an_edit_restores_the_start():
+    ir = _make_ir(("sparks",))
+    timeline = CheckpointTimeline(EffectSimulator(ir, max_particles=5000), dt=DT)
+    timeline.seek(1.0)
+    rate = AnimatedParameter([TimelineKeyframe(0.0, 50.0)])
+    for edit in (lambda: ir.add_or_update_timeline("sparks/emission_rate", rate),
+                 lambda: ir.add_emitter(_make_ir(("smoke",)).emitters[0])):
+        edit()
+        timeline.seek(1.0)
+        sim = timeline.seek(0.1) # Back past the edit, to the snapshot taken at t=0
+        _assert_same_state(sim, _sequential_state(ir, 6))
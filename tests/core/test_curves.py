@@ -0,0 +1,136 @@
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+
+from src.core.curves import CurveLUT, LifetimeCurveBanks, LifetimeCurves, compile_curve
+from src.core.particle_pool import ParticlePool
+
+SIZE_CURVE = [(0.0, 0.2), (0.1, 1.0), (0.7, 0.8), (1.0, 0.0)]
+OPACITY_CURVE = [(1.0, 0.0), (0.0, 0.0), (0.8, 1.0), (0.1, 1.0)]  # Deliberately unsorted
+COLOR_CURVE = [
+    (0.0, (1.0, 0.0, 0.0, 1.0)),
+    (0.5, (1.0, 1.0, 0.0, 1.0)),
+    (1.0, (0.0, 0.0, 1.0, 0.5)),
+]
+SAMPLE_TIMES = np.concatenate([np.linspace(0.0, 1.0, 1001), np.random.default_rng(0).random(1000)])
+
+
+# Exact piecewise-linear interpolation, the reference the LUTs are checked against
+def _interpolate_scalar_curve(curve_points: List[Tuple[float, float]], normalized_time: float) -> float:
+    if not curve_points:
+        return 1.0 # Default to 1.0 (no change) if no curve
+
+    curve_points = sorted(curve_points, key=lambda p: p[0]) # Sorted copy; never mutate the IR's list
+
+    if normalized_time <= curve_points[0][0]:
+        return curve_points[0][1]
+    if normalized_time >= curve_points[-1][0]:
+        return curve_points[-1][1]
+
+    for i in range(len(curve_points) - 1):
+        p1 = curve_points[i]
+        p2 = curve_points[i+1]
+        if p1[0] <= normalized_time < p2[0]:
+            if p2[0] == p1[0]: # Avoid division by zero if times are identical
+                return p1[1]
+            t_ratio = (normalized_time - p1[0]) / (p2[0] - p1[0])
+            return p1[1] + (p2[1] - p1[1]) * t_ratio
+
+    return curve_points[-1][1] # Should ideally be caught by checks above
+
+
+def _interpolate_color_curve(curve_points: List[Tuple[float, Tuple[float, float, float, float]]],
+                            normalized_time: float) -> Tuple[float, float, float, float]:
+    if not curve_points:
+        return (1.0, 1.0, 1.0, 1.0) # Default to white if no curve
+
+    curve_points = sorted(curve_points, key=lambda p: p[0]) # Sorted copy; never mutate the IR's list
+
+    if normalized_time <= curve_points[0][0]:
+        return curve_points[0][1]
+    if normalized_time >= curve_points[-1][0]:
+        return curve_points[-1][1]
+
+    for i in range(len(curve_points) - 1):
+        p1_time, p1_color = curve_points[i]
+        p2_time, p2_color = curve_points[i+1]
+        if p1_time <= normalized_time < p2_time:
+            if p2_time == p1_time: # Avoid division by zero
+                return p1_color
+            t_ratio = (normalized_time - p1_time) / (p2_time - p1_time)
+            interpolated_rgba = tuple(c1 + (c2 - c1) * t_ratio for c1, c2 in zip(p1_color, p2_color))
+            return interpolated_rgba # type: ignore
+
+    return curve_points[-1][1] # Should ideally be caught by checks above
+
+
+@pytest.mark.parametrize("tolerance", [1e-2, 1e-3])
+@pytest.mark.parametrize("curve", [SIZE_CURVE, OPACITY_CURVE, [(0.3, 2.5)], [(0.123, 0.0), (0.917, 7.0)]])
+def test_scalar_lut_matches_exact_interpolation(curve, tolerance):
+    lut = compile_curve(curve, tolerance=tolerance)
+    exact = np.array([_interpolate_scalar_curve(curve, t) for t in SAMPLE_TIMES])
+    assert lut.max_error <= tolerance
+    assert np.max(np.abs(lut.sample_scalar(SAMPLE_TIMES) - exact)) <= tolerance
+
+
+@pytest.mark.parametrize("tolerance", [1e-2, 1e-3])
+def test_color_lut_matches_exact_interpolation(tolerance):
+    lut = compile_curve(COLOR_CURVE, tolerance=tolerance)
+    exact = np.array([_interpolate_color_curve(COLOR_CURVE, t) for t in SAMPLE_TIMES])
+    assert lut.channels == 4
+    assert np.max(np.abs(lut.sample(SAMPLE_TIMES) - exact)) <= tolerance
+
+
+def test_tighter_tolerance_uses_more_resolution():
+    curve = [(0.0, 0.0), (0.333, 1.0), (1.0, 0.0)]
+    assert compile_curve(curve, tolerance=1e-5).resolution > compile_curve(curve, tolerance=1e-1).resolution
+
+
+def test_unreachable_tolerance_reports_achieved_error():
+    lut = compile_curve(SIZE_CURVE, tolerance=1e-9, max_resolution=64)
+    exact = np.array([_interpolate_scalar_curve(SIZE_CURVE, t) for t in SAMPLE_TIMES])
+    assert lut.resolution == 64
+    assert lut.max_error > 1e-9
+    assert np.max(np.abs(lut.sample_scalar(SAMPLE_TIMES) - exact)) <= lut.max_error + 1e-12
+
+
+def test_compiling_does_not_mutate_source_curve():
+    curve = list(OPACITY_CURVE)
+    compile_curve(curve)
+    _interpolate_scalar_curve(curve, 0.5)
+    assert curve == OPACITY_CURVE
+
+
+def test_lifetime_curves_recompile_only_on_change():
+    curves = LifetimeCurves()
+    curves.update(SIZE_CURVE, None, COLOR_CURVE)
+    size_lut, color_lut = curves.size, curves.color
+    assert isinstance(size_lut, CurveLUT) and curves.opacity is None
+
+    curves.update(list(SIZE_CURVE), None, COLOR_CURVE)
+    assert curves.size is size_lut and curves.color is color_lut
+
+    curves.update(SIZE_CURVE[:-1], None, None)
+    assert curves.size is not size_lut and curves.color is None
+
+
+def test_shared_bank_keeps_every_emitter_within_tolerance():
+    # Compiled alone these need 16 and 32 samples, but the first misses 1e-2 on a 32-sample grid
+    first, second = [(0.0, 0.0), (0.134, 1.0), (1.0, 0.0)], [(0.0, 0.0), (0.13, 1.0), (1.0, 0.0)]
+    curves = [LifetimeCurves(tolerance=1e-2), LifetimeCurves(tolerance=1e-2)]
+    curves[0].update(first, None, None)
+    curves[1].update(second, None, None)
+    assert (curves[0].size.resolution, curves[1].size.resolution) == (16, 32)
+
+    banks = LifetimeCurveBanks()
+    banks.update(curves)
+    assert banks.size.resolution > 32
+    pool = ParticlePool()
+    times = np.repeat(SAMPLE_TIMES, 2)
+    pool.spawn(len(times), lifespan=1.0, initial_size=1.0, emitter_index=np.tile([0, 1], len(SAMPLE_TIMES)))
+    pool.age[:pool.count] = times
+    banks.apply(pool)
+    for index, curve in enumerate((first, second)):
+        exact = np.array([_interpolate_scalar_curve(curve, t) for t in SAMPLE_TIMES])
+        assert np.max(np.abs(pool.size[index:pool.count:2] - exact)) <= 1e-2
@@ -0,0 +1,56 @@
+import numpy as np
+
+from src.core.decimation import DecimationTolerances, decimate_bake, decimate_track_keys
+from src.core.looping import TRACK_CHANNELS, LoopBaker
+
+from .test_simulator import _make_ir
+
+
+def _interpolation_errors(values, offsets, keys):
+    """Brute force: worst |sample - interpolated keys| of each track."""
+    values = values.reshape(len(values), -1)
+    worst = []
+    for start, stop in zip(offsets[:-1], offsets[1:]):
+        index = np.arange(start, stop)
+        keyed = index[keys[start:stop]]
+        interpolated = np.column_stack([np.interp(index, keyed, values[keyed, c]) for c in range(values.shape[1])])
+        worst.append(np.abs(interpolated - values[start:stop]).max())
+    return np.array(worst)
+
+
+def test_straight_tracks_keep_their_ends():
+    offsets = np.array([0, 10, 11, 30])
+    values = np.concatenate([np.linspace(0.0, 9.0, 10), [4.0], np.linspace(5.0, -5.0, 19)])
+    keys, worst = decimate_track_keys(values, offsets, np.ones(30, dtype=bool), 1e-9)
+    assert np.flatnonzero(keys).tolist() == [0, 9, 10, 11, 29]
+    assert np.allclose(worst, 0.0)
+
+
+def test_error_stays_within_tolerance():
+    rng = np.random.default_rng(7)
+    offsets = np.array([0, 120, 121, 300])
+    frames = np.arange(300) / 60.0
+    values = np.column_stack([40.0 * np.sin(3.0 * frames), 25.0 * frames ** 2]) + rng.normal(0.0, 0.01, (300, 2))
+    for tolerance in (0.05, 0.5, 2.0):
+        keys, worst = decimate_track_keys(values, offsets, np.ones(300, dtype=bool), tolerance)
+        assert np.all(worst <= tolerance) and np.allclose(worst, _interpolation_errors(values, offsets, keys))
+        assert keys[[0, 119, 120, 121, 299]].all()
+    assert 10 < np.count_nonzero(keys) < 60
+
+
+def test_bake_channels_are_decimated_separately():
+    bake = LoopBaker(_make_ir(), duration=1.0, workers=1).bake()
+    before = {name: bake.key_count(name) for name in TRACK_CHANNELS}
+    tolerances = DecimationTolerances(position=0.5, rotation=1.0, size=0.25, color=0.0)
+    report = decimate_bake(bake, tolerances)
+    for name in TRACK_CHANNELS:
+        assert report.keys_before(name) == before[name] and report.keys_after(name) == bake.key_count(name)
+        assert report.worst_error(name) <= tolerances.get(name) + 1e-12
+    assert report.keys_removed("position") > 0.8 * before["position"]
+    # Zero tolerance only removes keys on exactly straight stretches, e.g. the
+    # constant color of "plain", leaving the ends of each track
+    plain = bake.get_emitter("plain")
+    assert plain.key_count("color") == int(np.minimum(np.diff(plain.offsets), 2).sum())
+    sparks = bake.get_emitter("sparks")
+    assert np.allclose(report.emitters[0].channels["size"].worst_error,
+                       _interpolation_errors(sparks.size, sparks.offsets, sparks.keys["size"]))
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+
+from src.core.asset_import import load_rgba
+from src.core.atlas_packer import AtlasPacker
+from src.core.export_budget import ExportBudget, budget_estimator
+from src.core.ir import AnimatedParameter, SpriteAsset, SpriteDefinition, TimelineKeyframe
+from src.core.rasterizer import write_png
+from src.core.spine_export import DEFAULT_ATTACHMENT, DEFAULT_ATTACHMENT_SIZE, export_spine_json
+from src.core.sprite_batch import disc_pixels
+
+from .test_simulator import _make_ir
+
+
+def _exported(ir, tmp_path):
+    """(JSON stats, atlas, PNG bytes) of a real export."""
+    stats = export_spine_json(ir, str(tmp_path / "effect.json"), workers=1)
+    atlas = AtlasPacker(ir, workers=1, extra_sprites={DEFAULT_ATTACHMENT: disc_pixels(DEFAULT_ATTACHMENT_SIZE)}).pack()
+    paths = atlas.save(str(tmp_path), "effect")
+    return stats, atlas, sum(os.path.getsize(path) for path in paths if path.endswith(".png"))
+
+
+def test_estimates_match_real_exports(tmp_path):
+    ir = _make_ir()
+    ir.loop_duration = 1.0
+    sheet = np.zeros((16, 32, 4), dtype=np.uint8)
+    sheet[2:12, 3:9] = [255, 200, 0, 255]
+    write_png(str(tmp_path / "sheet.png"), sheet)
+    ir.add_sprite_asset(SpriteAsset(asset_id="sheet", path=str(tmp_path / "sheet.png"), width=32, height=16))
+    ir.add_sprite_definition(SpriteDefinition(definition_id="spark", asset_id="sheet", region=(0, 0, 16, 16)))
+    ir.get_emitter("sparks").set_param_value("sprite_definition_id", "spark")
+
+    estimator = budget_estimator(ir, workers=1)
+    assert budget_estimator(ir) is estimator # Attached to the effect
+    estimate = estimator.estimate()
+    stats, atlas, png_bytes = _exported(ir, tmp_path)
+    assert (estimate.json_keys, estimate.json_bytes, estimate.json_gzip_bytes) == (stats.keys, stats.raw_bytes,
+                                                                                    stats.gzip_bytes)
+    assert (estimate.atlas_pages, estimate.atlas_area, estimate.png_bytes) == (len(atlas.pages), atlas.area, png_bytes)
+    assert sum(estimate.emitter_bytes.values()) < estimate.json_bytes and set(estimate.emitter_keys) == {
+        "sparks", "smoke", "plain"}
+    # Far beyond 5 KB: the JSON is over budget, the small atlas is not
+    assert estimate.over_budget() == ["json_gzip_bytes"] and not estimate.within_budget
+    pages = len(atlas.pages)
+    assert estimate.summary()["atlas_pages"] == {"estimate": pages, "limit": 2, "usage": pages / 2}
+    assert np.array_equal(load_rgba(str(tmp_path / "atlas_0.png")), atlas.pages[0].pixels)
+
+
+def test_edits_recompute_only_what_changed(tmp_path):
+    ir = _make_ir()
+    ir.loop_duration = 0.5
+    estimator = budget_estimator(ir, budget=ExportBudget(json_gzip_bytes=1 << 20), workers=1)
+    estimator.estimate()
+    assert (estimator.stats.bakes, estimator.stats.compiles, estimator.stats.packs) == (3, 3, 1)
+    assert not estimator.stale
+    estimator.estimate()
+    assert (estimator.stats.bakes, estimator.stats.compiles, estimator.stats.packs) == (3, 3, 1)
+
+    # A timeline on the last emitter: only it is baked and compiled again
+    ir.add_or_update_timeline("plain/emission_rate", AnimatedParameter([TimelineKeyframe(0.0, 20.0)]))
+    assert estimator.stale
+    estimate = estimator.estimate()
+    assert (estimator.stats.bakes, estimator.stats.compiles, estimator.stats.packs) == (4, 4, 1)
+    stats, _atlas, _png_bytes = _exported(ir, tmp_path)
+    assert (estimate.json_bytes, estimate.json_gzip_bytes) == (stats.raw_bytes, stats.gzip_bytes)
+    assert estimate.within_budget
+
+    # The first emitter: it bakes again, and the others compile again only if their slot names shift
+    keys_before = estimate.emitter_keys
+    ir.get_emitter("sparks").set_param_value("emission_rate", 100.0)
+    estimate = estimator.estimate()
+    assert estimator.stats.bakes == 5 and 5 <= estimator.stats.compiles <= 7
+    stats, _atlas, _png_bytes = _exported(ir, tmp_path)
+    assert (estimate.json_keys, estimate.json_bytes, estimate.json_gzip_bytes) == (stats.keys, stats.raw_bytes,
+                                                                                    stats.gzip_bytes)
+    assert estimate.emitter_keys["sparks"] < keys_before["sparks"]
+
+
+def test_estimates_from_a_snapshot_of_the_effect():
+    ir = _make_ir()
+    ir.loop_duration = 0.5
+    snapshot = ir.snapshot()
+    ir.get_emitter("sparks").set_param_value("emission_rate", 100.0)
+    ir.add_or_update_timeline("plain/emission_rate", AnimatedParameter([TimelineKeyframe(0.0, 20.0)]))
+    assert snapshot.get_emitter("sparks").get_param_value("emission_rate") != 100.0
+    assert "plain/emission_rate" not in snapshot.timelines
+
+    # An edit made while the snapshot is taken waits for it, and is picked up by the next estimate
+    estimator = budget_estimator(ir, budget=ExportBudget(json_gzip_bytes=1 << 20), workers=1)
+    real_snapshot = ir.snapshot
+
+    def snapshot_then_edit():
+        with ir.lock:
+            effect = real_snapshot()
+            ir.get_emitter("smoke").set_param_value("emission_rate", 1.0)
+        return effect
+
+    ir.snapshot = snapshot_then_edit
+    estimator.estimate()
+    del ir.snapshot
+    assert estimator.stale
+    estimator.estimate()
+    assert estimator.stats.bakes == 4 and not estimator.stale
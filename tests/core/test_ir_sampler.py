@@ -0,0 +1,72 @@
+from src.core.ir import (AnimatedParameter, EffectIR, EmitterParameter, EmitterProperties,
+                         TimelineKeyframe)
+
+
+def _make_ir():
+    ir = EffectIR()
+    ir.add_emitter(EmitterProperties(
+        emitter_id="e1",
+        emitter_type="PointParticleEmitter",
+        parameters={
+            "emission_rate": EmitterParameter(name="emission_rate", value=10.0),
+            "particle_color": EmitterParameter(name="particle_color", value=(1.0, 1.0, 1.0, 1.0)),
+            "lifespan": EmitterParameter(name="lifespan", value=2.0),
+        },
+    ))
+    ir.add_or_update_timeline("e1/emission_rate", AnimatedParameter(keyframes=[
+        TimelineKeyframe(time=0.0, value=5.0),
+        TimelineKeyframe(time=1.0, value=50.0, interpolation_mode="step"),
+        TimelineKeyframe(time=2.0, value=50.0),
+        TimelineKeyframe(time=3.0, value=10.0),
+    ]))
+    ir.add_or_update_timeline("e1/particle_color", AnimatedParameter(keyframes=[
+        TimelineKeyframe(time=0.0, value=(1.0, 0.0, 0.0, 1.0)),
+        TimelineKeyframe(time=2.0, value=(0.0, 0.0, 1.0, 0.0)),
+    ]))
+    return ir
+
+
+def test_sampler_matches_animated_parameter():
+    ir = _make_ir()
+    sampler = ir.get_sampler()
+    for step in range(-4, 45):
+        t = step * 0.1
+        for name in ("emission_rate", "particle_color", "lifespan"):
+            timeline = ir.timelines.get(f"e1/{name}")
+            base = ir.get_emitter("e1").get_param_value(name)
+            expected = timeline.get_value_at_time(t, base) if timeline else base
+            assert sampler.value("e1", name, t) == expected
+            assert ir.get_animated_param_value("e1", name, t) == expected
+        assert sampler.sample("e1", t) == {
+            name: sampler.value("e1", name, t) for name in ("emission_rate", "particle_color", "lifespan")
+        }
+
+
+def test_sampler_unknown_emitter():
+    ir = _make_ir()
+    assert ir.get_animated_param_value("missing", "emission_rate", 0.0) is None
+    assert ir.get_sampler().sample("missing", 0.0) == {}
+
+
+def test_sampler_rebuilt_only_on_change():
+    ir = _make_ir()
+    sampler = ir.get_sampler()
+    assert ir.get_sampler() is sampler
+
+    # Base value edits are read live and need no rebuild
+    ir.get_emitter("e1").set_param_value("lifespan", 3.0)
+    assert ir.get_sampler() is sampler
+    assert sampler.value("e1", "lifespan", 0.0) == 3.0
+
+    ir.add_or_update_timeline("e1/lifespan", AnimatedParameter(keyframes=[TimelineKeyframe(time=0.0, value=1.0)]))
+    rebuilt = ir.get_sampler()
+    assert rebuilt is not sampler
+    assert rebuilt.value("e1", "lifespan", 0.0) == 1.0
+
+
+def test_in_place_keyframe_edits_are_seen():
+    ir = _make_ir()
+    sampler = ir.get_sampler()
+    timeline = ir.timelines["e1/emission_rate"]
+    timeline.add_keyframe(TimelineKeyframe(time=4.0, value=99.0))
+    assert sampler.value("e1", "emission_rate", 5.0) == 99.0
@@ -0,0 +1,82 @@
+import numpy as np
+
+from src.core.analytic import AnalyticSimulator
+from src.core.ir import AnimatedParameter, EffectIR, EmitterParameter, EmitterProperties, TimelineKeyframe
+from src.core.looping import TRACK_CHANNELS, LoopBaker
+
+from .test_simulator import _make_ir
+
+
+def _frame_states(baked, frame):
+    rows = np.flatnonzero(baked.frame == frame)
+    states = np.column_stack([baked.position[rows], np.mod(baked.rotation[rows], 360.0),
+                              baked.size[rows], baked.color[rows]])
+    return states[np.lexsort(states.T[::-1])]
+
+
+def test_tracks_follow_the_simulation():
+    ir = _make_ir(("smoke",))
+    bake = LoopBaker(ir, duration=1.0, workers=1).bake()
+    baked = bake.emitters[0]
+    assert bake.frame_count == 60 and bake.prewarm == 1.0 and baked.cycle.max() >= 1 # Lifespans outlive the loop
+    analytic = AnalyticSimulator(ir, duration=2.0)
+    tracks = baked.sample_tracks()
+    for frame in (0, 25, 60):
+        for cycle in range(int(baked.cycle.max()) + 1):
+            rows = np.flatnonzero((baked.frame == frame) & (baked.cycle[tracks] == cycle))
+            pool = analytic.evaluate(bake.prewarm + bake.times()[frame] + cycle * bake.duration)
+            n = pool.count
+            ids = baked.particle_id[tracks[rows]]
+            order = np.argsort(pool.particle_id[:n])
+            found = order[np.searchsorted(pool.particle_id[:n], ids, sorter=order)]
+            assert np.array_equal(pool.particle_id[found], ids)
+            assert np.allclose(baked.position[rows], pool.position[found])
+            assert np.allclose(np.mod(baked.rotation[rows], 360.0), pool.rotation[found])
+            assert np.allclose(baked.size[rows], pool.size[found])
+            assert np.allclose(baked.color[rows], pool.color[found])
+
+
+def test_frame_d_matches_frame_0():
+    bake = LoopBaker(_make_ir(), duration=0.75, workers=1).bake()
+    for baked in bake.emitters:
+        assert baked.track_count > 0
+        assert np.allclose(_frame_states(baked, bake.frame_count), _frame_states(baked, 0))
+        for name in TRACK_CHANNELS: # The seam key is always kept
+            assert baked.keys[name][np.flatnonzero(baked.frame == bake.frame_count)].all()
+
+
+def test_held_values_are_trimmed():
+    ir = EffectIR()
+    ir.add_emitter(EmitterProperties(
+        emitter_id="still", emitter_type="PointParticleEmitter",
+        parameters={k: EmitterParameter(name=k, value=v) for k, v in {
+            "emission_rate": 10.0, "lifespan": 3.0, "speed_range": (0.0, 0.0),
+        }.items()},
+    ))
+    baked = LoopBaker(ir, duration=1.0, workers=1).bake().emitters[0]
+    counts = np.diff(baked.offsets)
+    for name in TRACK_CHANNELS: # Each track keeps its first and last sample only
+        assert baked.key_count(name) == int(np.minimum(counts, 2).sum())
+    assert baked.sample_count > 4 * baked.key_count("position")
+
+
+def test_worker_processes_bake_the_same_tracks():
+    ir = _make_ir()
+    serial = LoopBaker(ir, duration=0.5, workers=1).bake()
+    parallel = LoopBaker(ir, duration=0.5, workers=2).bake()
+    assert [e.emitter_id for e in parallel.emitters] == ["sparks", "smoke", "plain"]
+    for a, b in zip(serial.emitters, parallel.emitters):
+        for name in ("offsets", "particle_id", "frame") + TRACK_CHANNELS:
+            assert np.array_equal(getattr(a, name), getattr(b, name))
+        assert all(np.array_equal(a.keys[name], b.keys[name]) for name in TRACK_CHANNELS)
+
+
+def test_timelines_repeat_every_loop():
+    ir = _make_ir(("plain",))
+    ir.add_or_update_timeline("plain/emission_rate", AnimatedParameter([
+        TimelineKeyframe(0.0, 100.0, "step"), TimelineKeyframe(0.5, 0.0)]))
+    for prewarm in (None, 0.0, 0.3):
+        baked = LoopBaker(ir, duration=1.0, prewarm=prewarm, workers=1).bake().emitters[0]
+        # Births follow the timeline from the loop start: about 50 in the first half, none after
+        birth = np.mod(baked.birth_time[baked.cycle == 0], 1.0)
+        assert 45 <= len(birth) <= 55 and birth.max() < 0.5
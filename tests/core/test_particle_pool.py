@@ -0,0 +1,146 @@
+import tracemalloc
+
+import numpy as np
+
+from src.core.ir import EffectIR, EmitterParameter, EmitterProperties
+from src.core.particle_pool import PARTICLE_COLUMNS, ParticlePool
+from src.core.particle_system import ParticleSystem
+
+from .test_curves import _interpolate_color_curve, _interpolate_scalar_curve
+
+
+def _steady_system(max_particles):
+    values = {
+        "emission_rate": 3000.0,
+        "lifespan_range": (0.5, 1.5),
+        "speed_range": (50.0, 100.0),
+        "emission_angle_range_deg": (-30.0, 30.0),
+        "size_range": (4.0, 8.0),
+        "angular_velocity_range_dps": (-90.0, 90.0),
+        "acceleration_vector": (0.0, -10.0),
+        "orient_to_velocity": True,
+        "size_over_lifespan": [(0.0, 0.2), (0.1, 1.0), (1.0, 0.0)],
+        "opacity_over_lifespan": [(0.0, 0.0), (0.2, 1.0), (1.0, 0.0)],
+        "color_over_lifespan": [(0.0, (1.0, 0.0, 0.0, 1.0)), (1.0, (0.0, 0.0, 1.0, 1.0))],
+    }
+    ir = EffectIR()
+    ir.add_emitter(EmitterProperties(
+        emitter_id="e1",
+        emitter_type="PointParticleEmitter",
+        parameters={name: EmitterParameter(name=name, value=value) for name, value in values.items()},
+    ))
+    return ParticleSystem(effect_ir=ir, emitter_id="e1", max_particles=max_particles)
+
+
+def test_steady_state_update_does_not_allocate():
+    ps = _steady_system(max_particles=20000)
+    dt, t = 1.0 / 60.0, 0.0
+    for _ in range(150): # Warm up past the longest lifespan
+        ps.update(dt, t)
+        t += dt
+    assert 2000 < ps.pool.count < 20000
+    columns_before = [id(getattr(ps.pool, name)) for name, *_ in PARTICLE_COLUMNS]
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for _ in range(60):
+            ps.update(dt, t)
+            t += dt
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # A single column temporary for the live particles would be ~40 KB or more;
+    # what remains is per-emission bookkeeping that does not scale with count.
+    assert peak - baseline < 16 * 1024
+    assert current - baseline < 1024
+    assert [id(getattr(ps.pool, name)) for name, *_ in PARTICLE_COLUMNS] == columns_before
+
+
+def test_fixed_capacity_pool_reuses_slots_and_clamps_spawns():
+    pool = ParticlePool(capacity=4, fixed_capacity=True)
+    rows = pool.spawn(3, lifespan=np.array([1.0, 5.0, 1.0]))
+    assert rows == slice(0, 3)
+    assert pool.spawn(5, lifespan=np.full(5, 5.0)) == slice(3, 4)
+    assert pool.capacity == 4
+
+    pool.integrate(2.0)
+    assert pool.remove_dead() == 2
+    assert pool.count == 2
+    assert sorted(pool.particle_id[:2]) == [1, 3]
+
+    rows = pool.spawn(3)
+    assert rows == slice(2, 4)
+    assert list(pool.particle_id[rows]) == [4, 5]
+
+
+def test_particle_ids_are_unique_and_increasing():
+    pool = ParticlePool(capacity=2)
+    pool.spawn(5)
+    pool.spawn(3)
+    assert pool.capacity >= 8
+    assert list(pool.particle_id[:pool.count]) == list(range(8))
+    assert [view.id for view in pool.views()] == list(range(8))
+
+
+def test_spawn_broadcasts_scalars_and_copies_per_particle_arrays():
+    pool = ParticlePool(capacity=2)
+    rows = pool.spawn(3, sprite_definition_id="spark", position=(1.0, 2.0), size=np.array([1.0, 2.0, 3.0]),
+                      color=(0.5, 0.5, 0.5, 1.0), emitter_index=4)
+    assert rows == slice(0, 3) and pool.count == 3
+    assert np.array_equal(pool.position[rows], [[1.0, 2.0]] * 3)
+    assert list(pool.size[rows]) == [1.0, 2.0, 3.0] and list(pool.emitter_index[rows]) == [4, 4, 4]
+    assert pool.sprite_ids[pool.sprite_index[0]] == "spark" and pool.views()[2].color == (0.5, 0.5, 0.5, 1.0)
+    try:
+        pool.spawn(1, not_a_column=1.0)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("Unknown columns must be rejected")
+
+
+def test_integrate_moves_rotates_and_orients():
+    pool = ParticlePool()
+    pool.spawn(2, velocity=np.array([[10.0, 0.0], [0.0, 0.0]]), acceleration=(0.0, -2.0),
+               angular_velocity=90.0, rotation=330.0, orient_to_velocity=np.array([False, True]))
+    pool.integrate(0.5)
+    assert np.allclose(pool.age[:2], 0.5)
+    assert np.allclose(pool.velocity[:2], [[10.0, -1.0], [0.0, -1.0]]) # Semi-implicit Euler
+    assert np.allclose(pool.position[:2], [[5.0, -0.5], [0.0, -0.5]])
+    assert np.allclose(pool.rotation[:2], [15.0, -90.0]) # Wrapped; the second faces its velocity
+
+    pool.integrate(np.array([1.0]), start=1) # Per-row steps for the rows from `start` on
+    assert np.allclose(pool.age[:2], [0.5, 1.5]) and np.allclose(pool.position[1], [0.0, -3.5])
+
+
+def test_remove_dead_keeps_every_survivor_intact():
+    pool = ParticlePool(capacity=8)
+    lifespans = np.array([1.0, 5.0, 1.0, 5.0, 5.0, 1.0, 1.0, 5.0])
+    pool.spawn(8, lifespan=lifespans, position=np.arange(16.0).reshape(8, 2))
+    pool.integrate(2.0)
+    assert pool.remove_dead() == 4 and pool.count == 4
+    survivors = dict(zip(pool.particle_id[:4], pool.position[:4]))
+    assert sorted(survivors) == [1, 3, 4, 7]
+    assert all(np.array_equal(position, [2.0 * i, 2.0 * i + 1.0]) for i, position in survivors.items())
+    assert pool.remove_dead() == 0
+
+
+def test_lifetime_curves_stay_within_tolerance():
+    tolerance = 1e-3
+    ps = _steady_system(max_particles=5000)
+    ps.lifetime_curves.tolerance = tolerance
+    dt, t = 1.0 / 60.0, 0.0
+    for _ in range(30):
+        ps.update(dt, t)
+        t += dt
+    pool, n = ps.pool, ps.pool.count
+    norm_age = np.clip(pool.age[:n] / pool.lifespan[:n], 0.0, 1.0)
+    params = ps.emitter_properties.parameters
+    size = [_interpolate_scalar_curve(params["size_over_lifespan"].value, a) for a in norm_age]
+    opacity = [_interpolate_scalar_curve(params["opacity_over_lifespan"].value, a) for a in norm_age]
+    color = [_interpolate_color_curve(params["color_over_lifespan"].value, a) for a in norm_age]
+    assert np.max(np.abs(pool.size[:n] - pool.initial_size[:n] * size)) <= tolerance * pool.initial_size[:n].max()
+    assert np.max(np.abs(pool.color[:n, 3] - opacity)) <= tolerance # Opacity sets the final alpha
+    assert np.max(np.abs(pool.color[:n, :3] - np.array(color)[:, :3])) <= tolerance
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from src.core.ir import EffectIR, EmitterParameter, EmitterProperties
+from src.core.particle_system import ParticleSystem
+
+
+def _make_system(max_particles=1000, **overrides):
+    values = {
+        "emission_rate": 600.0,
+        "lifespan_range": (1.0, 2.0),
+        "speed_range": (50.0, 100.0),
+        "emission_angle_range_deg": (-30.0, 30.0),
+        "size_range": (4.0, 8.0),
+        "acceleration_vector": (0.0, -10.0),
+        "emitter_position": (100.0, 50.0),
+        "sprite_definition_id": "spark",
+    }
+    values.update(overrides)
+    ir = EffectIR()
+    ir.add_emitter(EmitterProperties(
+        emitter_id="e1",
+        emitter_type="PointParticleEmitter",
+        parameters={name: EmitterParameter(name=name, value=value) for name, value in values.items()},
+    ))
+    return ParticleSystem(effect_ir=ir, emitter_id="e1", max_particles=max_particles)
+
+
+def test_emit_batch_draws_vectors_within_ranges():
+    ps = _make_system()
+    rows = ps.emit_batch(200, 0.0, 0.0)
+    pool = ps.pool
+    assert rows == slice(0, 200) and pool.count == 200
+    assert np.all((pool.lifespan[rows] >= 1.0) & (pool.lifespan[rows] <= 2.0))
+    assert np.all((pool.size[rows] >= 4.0) & (pool.size[rows] <= 8.0))
+    speed = np.hypot(pool.velocity[rows, 0], pool.velocity[rows, 1])
+    assert np.all((speed >= 50.0 - 1e-9) & (speed <= 100.0 + 1e-9))
+    assert np.allclose(pool.position[rows], (100.0, 50.0))
+    assert len(np.unique(pool.lifespan[rows])) > 1
+    assert {p.sprite_definition_id for p in ps.get_alive_particles()} == {"spark"}
+
+
+def test_emit_batch_staggers_births_over_the_step():
+    ps = _make_system()
+    rows = ps.emit_batch(4, 1.0, 1.5)
+    assert np.allclose(ps.pool.age[rows], [0.5, 0.375, 0.25, 0.125])
+
+
+def test_emit_batch_respects_max_particles():
+    ps = _make_system(max_particles=50)
+    assert ps.emit_batch(80, 0.0, 0.1) == slice(0, 50)
+    assert ps.emit_batch(10, 0.1, 0.2) == slice(50, 50)
+
+
+@pytest.mark.parametrize("dt", [1.0 / 60.0, 0.5])
+def test_update_emits_rate_times_dt(dt):
+    ps = _make_system(max_particles=100000, lifespan_range=(10.0, 10.0))
+    t = 0.0
+    for _ in range(4):
+        ps.update(dt, t)
+        t += dt
+    assert ps.pool.count == int(round(600.0 * dt * 4))
+    assert ps.pool.age[:ps.pool.count].max() <= 4 * dt + 1e-9
@@ -0,0 +1,93 @@
+import csv
+import gc
+import json
+import threading
+
+import numpy as np
+
+from src.core.profiler import FrameProfiler
+from src.core.simulator import EffectSimulator
+
+from .test_simulator import _make_ir
+
+
+def test_ring_buffer_keeps_the_newest_frames_in_order():
+    profiler = FrameProfiler(capacity=4)
+    for k in range(6):
+        profiler.add("draw", float(k))
+        profiler.add("draw", 0.5)
+        profiler.end_frame({"a": k}, instruction_count=10 * k)
+    assert len(profiler) == 4 and profiler.frames == 6
+    assert profiler.recent("draw").tolist() == [2.5, 3.5, 4.5, 5.5]
+    assert profiler.recent("instructions").tolist() == [20, 30, 40, 50]
+    assert profiler.recent("emit").tolist() == [0.0] * 4
+    assert [row["frame"] for row in profiler.rows()] == [2, 3, 4, 5]
+    assert profiler.latest_particle_counts() == {"a": 5}
+
+    profiler.end_frame({"b": 7}) # "a" absent this frame
+    assert profiler.latest_particle_counts() == {"a": 0, "b": 7}
+
+
+def test_phases_accumulate_across_threads():
+    profiler = FrameProfiler()
+
+    def worker():
+        for _ in range(1000):
+            profiler.add("update", 0.001)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with profiler.phase("vertices"):
+        pass
+    profiler.end_frame()
+    assert np.isclose(profiler.recent("update")[-1], 4.0)
+    assert profiler.recent("vertices")[-1] >= 0.0
+
+
+def test_simulator_reports_its_phases():
+    simulator = EffectSimulator(_make_ir(), max_particles=5000)
+    simulator.profiler = FrameProfiler()
+    for _ in range(10):
+        simulator.step(1.0 / 60.0)
+        simulator.profiler.end_frame()
+    summary = simulator.profiler.summary()
+    for name in ("emit", "update", "curves"):
+        assert summary[name]["max"] > 0.0
+    assert summary["vertices"]["max"] == summary["draw"]["max"] == 0.0
+
+
+def test_gc_pauses_are_attributed_to_the_frame():
+    profiler = FrameProfiler()
+    profiler.hook_gc()
+    try:
+        gc.collect()
+        profiler.end_frame()
+    finally:
+        profiler.unhook_gc()
+    assert profiler.gc_collections[0] >= 1 and profiler.gc_times[0] > 0.0
+    gc.collect()
+    profiler.end_frame()
+    assert profiler.gc_collections[1] == 0
+
+
+def test_export_csv_and_json(tmp_path):
+    profiler = FrameProfiler()
+    for k in range(3):
+        profiler.add("emit", 0.002)
+        profiler.end_frame({"sparks": k + 1}, instruction_count=5, draw_calls=2, state_changes_saved=k)
+
+    profiler.export(str(tmp_path / "profile.csv"))
+    with open(tmp_path / "profile.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 3
+    assert float(rows[0]["emit_ms"]) == 2.0 and rows[2]["particles:sparks"] == "3"
+    assert [row["state_changes_saved"] for row in rows] == ["0", "1", "2"] and rows[0]["draw_calls"] == "2"
+
+    profiler.export(str(tmp_path / "profile.json"))
+    with open(tmp_path / "profile.json") as f:
+        data = json.load(f)
+    assert data["phases"] == list(profiler.phases)
+    assert len(data["frames"]) == 3 and data["summary"]["emit"]["mean"] == 0.002
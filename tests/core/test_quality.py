@@ -0,0 +1,44 @@
+import numpy as np
+
+from src.core.particle_pool import ParticlePool
+from src.core.quality import QUALITY_LEVELS, AdaptiveQuality, QualityLevel, select_particles
+
+
+def test_select_particles_subsamples_by_id_and_drops_sub_pixel():
+    pool = ParticlePool(capacity=8)
+    pool.spawn(8, size=np.array([4.0, 0.5, 4.0, 0.5, 4.0, 4.0, 0.2, 4.0]), lifespan=1.0)
+    rows = np.arange(8)[::-1]
+    assert select_particles(pool, rows, QUALITY_LEVELS[0]).tolist() == rows.tolist()
+    halved = select_particles(pool, rows, QualityLevel("half", particle_stride=2))
+    assert (pool.particle_id[halved] % 2 == 0).all() and len(halved) == 4
+    assert halved.tolist() == sorted(halved.tolist(), reverse=True) # Order kept
+    large = select_particles(pool, rows, QualityLevel("large", min_pixel_size=1.0), size_scale=1.5)
+    assert sorted(large.tolist()) == [0, 2, 4, 5, 7]
+    assert select_particles(pool, rows, QualityLevel("large", min_pixel_size=1.0), size_scale=2.0).size == 7
+
+
+def test_quality_degrades_under_load_and_recovers_with_headroom():
+    quality = AdaptiveQuality(budget=0.010, degrade_frames=3, restore_frames=10)
+    changes = [quality.record(0.008) for _ in range(20)]
+    assert not any(changes) and quality.index == 0
+
+    for _ in range(3):
+        changed = quality.record(0.030)
+    assert changed and quality.level is QUALITY_LEVELS[1]
+    for _ in range(3 * len(QUALITY_LEVELS)):
+        quality.record(0.030)
+    assert quality.level is QUALITY_LEVELS[-1] # Never past the last level
+
+    frames = 1
+    while not quality.record(0.004):
+        frames += 1
+    assert frames >= 10 and quality.index == len(QUALITY_LEVELS) - 2
+    quality.enabled = False
+    assert quality.level is QUALITY_LEVELS[0] and not quality.record(1.0)
+
+
+def test_single_spikes_do_not_change_quality():
+    quality = AdaptiveQuality(budget=0.010)
+    for k in range(200):
+        quality.record(0.040 if k % 20 == 0 else 0.005)
+    assert quality.index == 0
@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.core.ir import FlipbookDefinition, SpriteAsset, SpriteDefinition
+from src.core.particle_pool import ParticlePool
+from src.core.rasterizer import EffectFrameRenderer, SoftwareRasterizer, load_rgba, write_png
+
+from .test_simulator import _make_ir
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+
+
+def _pool(rows):
+    pool = ParticlePool(capacity=len(rows))
+    for position, size, rotation, color, sprite in rows:
+        pool.spawn(1, sprite, position=position, size=size, rotation=rotation, color=color, lifespan=1.0)
+    return pool
+
+
+def _random_pool(count, seed=3):
+    rng = np.random.default_rng(seed)
+    return _pool([(rng.uniform(0, 32, 2), rng.uniform(1, 12), rng.uniform(0, 360), rng.uniform(0, 1, 4), None)
+                  for _ in range(count)])
+
+
+@pytest.mark.parametrize("blend_mode", ["alpha", "additive", "multiply", "screen"])
+def test_batched_composition_matches_particle_by_particle(blend_mode):
+    pool = _random_pool(60)
+    raster = SoftwareRasterizer(_make_ir(), 32, 32, background=(0.2, 0.4, 0.6, 1.0))
+    batched = raster.new_frame()
+    raster.composite(batched, pool, slice(0, pool.count), blend_mode)
+    sequential = raster.new_frame()
+    for row in range(pool.count):
+        raster.composite(sequential, pool, np.array([row]), blend_mode)
+    assert np.allclose(batched, sequential, atol=1e-9)
+    assert not np.allclose(batched, raster.new_frame()) # Something was drawn
+
+
+def test_blend_modes_follow_gl_blend_functions():
+    red = ((2.0, 2.0), 4.0, 0.0, (1.0, 0.0, 0.0, 0.5), None)
+    raster = SoftwareRasterizer(_make_ir(), 4, 4, background=(0.5, 0.5, 0.5, 1.0))
+    pool = _pool([red, red, red])
+    center = 2 * 4 + 2 # Pixel (2, 2), fully inside the disc
+    expected = {
+        "alpha": [0.9375, 0.0625, 0.0625],
+        "additive": [1.0, 0.5, 0.5], # Clamped like a fixed-point framebuffer
+        "multiply": [0.5, 0.0625, 0.0625], # Half-transparent: halfway to the identity
+        "screen": [0.9375, 0.5, 0.5],
+    }
+    for blend_mode, rgb in expected.items():
+        frame = raster.new_frame()
+        raster.composite(frame, pool, slice(0, 3), blend_mode)
+        assert np.allclose(frame[center, :3], rgb), blend_mode
+
+
+def test_sprite_regions_are_sampled_with_pivot_and_orientation(tmp_path):
+    ir = _make_ir(("plain",))
+    ir.add_sprite_asset(SpriteAsset(asset_id="atlas", path="atlas.png", width=4, height=2))
+    ir.add_sprite_definition(SpriteDefinition(definition_id="right", asset_id="atlas", region=(2, 0, 2, 2),
+                                              pivot=(0.0, 0.0)))
+    atlas = np.zeros((2, 4, 4), dtype=np.uint8)
+    atlas[..., 3] = 255
+    atlas[0, 2:, 0] = 255 # Top row of the region red, bottom row green
+    atlas[1, 2:, 1] = 255
+    raster = SoftwareRasterizer(ir, 8, 8)
+    raster.set_asset_image("atlas", atlas)
+    image = raster.render(_pool([((2.0, 2.0), 4.0, 0.0, (1.0, 1.0, 1.0, 1.0), "right")]), [("alpha", slice(0, 1))])
+    # Output is top row first; the sprite spans x, y in [2, 6) with its top half red
+    assert image[2:4, 2:6, 0].min() == 255 and image[2:4, 2:6, 1].max() == 0
+    assert image[4:6, 2:6, 1].min() == 255 and image[4:6, 2:6, 0].max() == 0
+    assert image[:2].max() == 0 and image[:, :2].max() == 0
+
+
+def test_flipbook_particles_show_the_frame_for_their_age():
+    ir = _make_ir(("plain",))
+    ir.add_sprite_asset(SpriteAsset(asset_id="strip", path="strip.png", width=3, height=1))
+    for k in range(3):
+        ir.add_sprite_definition(SpriteDefinition(definition_id=f"frame_{k}", asset_id="strip", region=(k, 0, 1, 1)))
+    ir.add_flipbook(FlipbookDefinition(definition_id="blink", frame_ids=["frame_0", "frame_1", "frame_2"]))
+    strip = np.zeros((1, 3, 4), dtype=np.uint8)
+    strip[0, :, 3] = 255
+    strip[0, [0, 1, 2], [0, 1, 2]] = 255 # Red, green, blue frames
+    raster = SoftwareRasterizer(ir, 6, 2)
+    raster.set_asset_image("strip", strip)
+    pool = ParticlePool(capacity=3)
+    pool.spawn(3, "blink", position=np.array([[1.0, 1.0], [3.0, 1.0], [5.0, 1.0]]), size=2.0,
+               age=np.array([0.1, 0.5, 0.9]), lifespan=1.0) # Over the lifespan: frames 0, 1, 2
+    image = raster.render(pool, [("alpha", slice(0, 3))])
+    assert image[:, 0:2, :3].reshape(-1, 3).tolist() == [[255, 0, 0]] * 4
+    assert image[:, 2:4, :3].reshape(-1, 3).tolist() == [[0, 255, 0]] * 4
+    assert image[:, 4:6, :3].reshape(-1, 3).tolist() == [[0, 0, 255]] * 4
+
+
+def test_write_png_round_trips(tmp_path):
+    pixels = np.random.default_rng(0).integers(0, 256, (5, 7, 4), dtype=np.uint8)
+    path = str(tmp_path / "frame.png")
+    write_png(path, pixels)
+    assert np.array_equal(load_rgba(path), pixels)
+
+
+def _golden_renderer():
+    return EffectFrameRenderer(_make_ir(), 96, 64, max_particles=5000, origin=(-48.0, -24.0), scale=0.5,
+                               background=(0.0, 0.0, 0.0, 1.0))
+
+
+@pytest.mark.parametrize("time", [0.5, 1.25])
+def test_effect_frames_match_golden_images(time):
+    image = _golden_renderer().frame(time)
+    golden = load_rgba(os.path.join(GOLDEN_DIR, f"effect_{int(time * 1000):04d}ms.png"))
+    assert image.shape == golden.shape
+    difference = np.abs(image.astype(np.int16) - golden.astype(np.int16))
+    # Allow last-bit rounding differences across platforms
+    assert difference.max() <= 2 and np.count_nonzero(difference) < image.size // 100
+
+
+def test_export_sequence_and_thumbnail(tmp_path):
+    renderer = _golden_renderer()
+    paths = renderer.export_sequence(str(tmp_path), fps=10, start=0.0, end=0.5)
+    assert [os.path.basename(p) for p in paths] == [f"frame_{i:04d}.png" for i in range(5)]
+    assert np.array_equal(load_rgba(paths[-1]), renderer.frame(0.4))
+    assert renderer.thumbnail(0.4, size=32).shape == (21, 32, 4)
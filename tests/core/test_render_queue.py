@@ -0,0 +1,38 @@
+from src.core.render_queue import (RenderQueueStats, build_render_queue, count_state_changes,
+                                   render_queue_stats)
+
+
+def _summary(batches):
+    return [(b.blend_mode, b.texture_key, b.payloads) for b in batches]
+
+
+def test_consecutive_compatible_draws_merge():
+    items = [("alpha", "atlas", 0), ("alpha", "atlas", 1), ("alpha", "disc", 2), ("additive", "atlas", 3)]
+    assert _summary(build_render_queue(items)) == [
+        ("alpha", "atlas", [0, 1]), ("alpha", "disc", [2]), ("additive", "atlas", [3])]
+
+
+def test_order_dependent_modes_keep_their_order():
+    items = [("alpha", "a", 0), ("alpha", "b", 1), ("alpha", "a", 2), ("screen", "a", 3), ("alpha", "a", 4)]
+    assert [b.payloads for b in build_render_queue(items)] == [[0], [1], [2], [3], [4]]
+
+
+def test_order_independent_runs_regroup_by_texture():
+    items = [("additive", "a", 0), ("additive", "b", 1), ("additive", "a", 2), ("additive", "b", 3),
+             ("alpha", "a", 4), ("additive", "a", 5)]
+    assert _summary(build_render_queue(items)) == [
+        ("additive", "a", [0, 2]), ("additive", "b", [1, 3]), ("alpha", "a", [4]), ("additive", "a", [5])]
+
+
+def test_state_changes_saved():
+    assert count_state_changes([]) == 0
+    # Alpha with a, switch to additive, bind b, restore the UI's blend state
+    assert count_state_changes([("alpha", "a"), ("additive", "a"), ("additive", "b")]) == 5
+    items = [("additive", "a", 0), ("additive", "b", 1), ("additive", "a", 2), ("additive", "b", 3)]
+    stats = render_queue_stats(len(items), build_render_queue(items))
+    assert (stats.items, stats.draws, stats.state_changes, stats.unbatched_state_changes) == (4, 2, 4, 12)
+    assert stats.state_changes_saved == 8
+    total = RenderQueueStats()
+    total.add(stats)
+    total.add(stats)
+    assert total.draws == 4 and total.state_changes_saved == 16
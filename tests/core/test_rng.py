@@ -0,0 +1,78 @@
+import numpy as np
+
+from src.core.ir import EffectIR, EmitterParameter, EmitterProperties
+from src.core.particle_system import ParticleSystem
+from src.core.rng import RandomStream
+
+
+def test_values_are_random_access():
+    stream = RandomStream(1234)
+    full = stream.random(channel=0, start=0, count=1000)
+    assert np.array_equal(stream.random(0, 700, 1), full[700:701])
+    assert np.array_equal(np.concatenate([stream.random(0, 0, 300), stream.random(0, 300, 700)]), full)
+    assert np.all((full >= 0.0) & (full < 1.0))
+    assert abs(full.mean() - 0.5) < 0.05
+
+
+def test_channels_and_seeds_are_independent():
+    a = RandomStream(1).random(0, 0, 256)
+    assert not np.array_equal(a, RandomStream(1).random(1, 0, 256))
+    assert not np.array_equal(a, RandomStream(2).random(0, 0, 256))
+    assert np.array_equal(a, RandomStream(1).random(0, 0, 256))
+
+
+def _make_ir(seed=None):
+    values = {
+        "emission_rate": 300.0,
+        "lifespan_range": (0.5, 1.5),
+        "speed_range": (50.0, 100.0),
+        "emission_angle_range_deg": (-45.0, 45.0),
+        "size_range": (4.0, 8.0),
+        "rotation_range_deg": (0.0, 360.0),
+    }
+    ir = EffectIR()
+    ir.add_emitter(EmitterProperties(
+        emitter_id="e1",
+        emitter_type="PointParticleEmitter",
+        parameters={name: EmitterParameter(name=name, value=value) for name, value in values.items()},
+        seed=seed,
+    ))
+    return ir
+
+
+def _run(ps, frames=90):
+    t = 0.0
+    for _ in range(frames):
+        ps.update(1.0 / 60.0, t)
+        t += 1.0 / 60.0
+    n = ps.pool.count
+    order = np.argsort(ps.pool.particle_id[:n])
+    return ps.pool.position[:n][order], ps.pool.rotation[:n][order]
+
+
+def test_same_effect_replays_identically():
+    first = _run(ParticleSystem(_make_ir(), "e1"))
+    second = _run(ParticleSystem(_make_ir(), "e1"))
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
+
+    ps = ParticleSystem(_make_ir(), "e1")
+    _run(ps, frames=10)
+    ps.reset()
+    assert all(np.array_equal(a, b) for a, b in zip(first, _run(ps)))
+
+
+def test_seed_is_stored_on_emitter():
+    assert _make_ir().get_emitter("e1").seed == _make_ir().get_emitter("e1").seed
+    a = _run(ParticleSystem(_make_ir(seed=7), "e1"))
+    b = _run(ParticleSystem(_make_ir(seed=8), "e1"))
+    assert not np.array_equal(a[0], b[0])
+
+
+def test_particle_draws_do_not_depend_on_batch_size():
+    whole = ParticleSystem(_make_ir(), "e1")
+    whole.emit_batch(10, 0.0, 0.0)
+    split = ParticleSystem(_make_ir(), "e1")
+    split.emit_batch(4, 0.0, 0.0)
+    split.emit_batch(6, 0.0, 0.0)
+    for column in ("lifespan", "velocity", "size", "rotation"):
+        assert np.array_equal(getattr(whole.pool, column)[:10], getattr(split.pool, column)[:10])
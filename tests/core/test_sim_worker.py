@@ -0,0 +1,143 @@
+import time
+
+import numpy as np
+import pytest
+
+from src.core.ir import AnimatedParameter, TimelineKeyframe
+from src.core.sim_worker import SimulationWorker
+
+from .test_checkpoints import _sequential_state
+from .test_simulator import _make_ir
+
+DT = 1.0 / 60.0
+
+
+def _frame_state(worker):
+    frame = worker.acquire_frame()
+    try:
+        return frame.serial, frame.step, {v.emitter_id: v.position[np.argsort(v.particle_id)] for v in frame.views()}
+    finally:
+        worker.release_frame()
+
+
+def test_published_frames_match_the_simulation():
+    ir = _make_ir()
+    worker = SimulationWorker(ir, max_particles=5000)
+    worker.process([("seek", 2.0), ("seek", 1.0)]) # Coalesced into one seek
+    serial, step, positions = _frame_state(worker)
+    assert (serial, step) == (1, 60)
+    expected = _sequential_state(ir, 60)
+    for view in expected.emitter_views():
+        assert np.array_equal(positions[view.emitter_id], view.position[np.argsort(view.particle_id)])
+
+
+def test_edits_run_on_the_worker_and_resimulate_the_same_time():
+    ir = _make_ir()
+    worker = SimulationWorker(ir, max_particles=5000)
+    worker.process([("seek", 0.5)])
+    before = dict(worker.acquire_frame().fingerprints)
+    worker.release_frame()
+
+    worker.process([("edit", lambda: ir.get_emitter("smoke").set_param_value("emission_rate", 10.0))])
+    frame = worker.acquire_frame()
+    assert frame.step == 30
+    assert [k for k in before if frame.fingerprints[k] != before[k]] == ["smoke"]
+    assert len(frame.views()[1]) < 60
+    worker.release_frame()
+
+
+def test_background_playback_and_double_buffered_handoff():
+    worker = SimulationWorker(_make_ir(), max_particles=5000)
+    worker.start()
+    try:
+        worker.seek(0.5)
+        assert worker.wait_for_frame(0, timeout=5.0)
+        serial, step, _ = _frame_state(worker)
+        assert step == 30
+
+        # A frame being read is never replaced underneath the reader
+        frame = worker.acquire_frame()
+        worker.seek(1.0)
+        assert not worker.wait_for_frame(serial, timeout=0.2)
+        assert frame.step == 30
+        worker.release_frame()
+        assert worker.wait_for_frame(serial, timeout=5.0)
+        assert _frame_state(worker)[1] == 60
+
+        worker.play()
+        serial = worker.serial
+        assert worker.wait_for_frame(serial + 3, timeout=5.0)
+        assert _frame_state(worker)[1] > 60
+        worker.pause()
+    finally:
+        worker.stop()
+
+
+def test_a_failing_step_pauses_and_is_raised_to_the_caller():
+    worker = SimulationWorker(_make_ir(), max_particles=5000)
+    advance = worker.advance
+    failures = []
+
+    def failing_advance():
+        failures.append(1)
+        raise RuntimeError("step failed")
+
+    worker.advance = failing_advance
+    worker.start()
+    try:
+        worker.play()
+        worker.seek(0.5)
+        assert worker.wait_for_frame(0, timeout=5.0)
+        thread = worker._thread
+        deadline = time.perf_counter() + 5.0
+        while not failures and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        assert failures
+        deadline = time.perf_counter() + 5.0
+        while worker.playing and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        with pytest.raises(RuntimeError, match="step failed"):
+            worker.raise_error()
+        worker.raise_error() # Reported once
+        # Still serving commands, and playing again once asked
+        worker.advance = advance
+        serial = worker.serial
+        worker.seek(1.0)
+        assert worker.wait_for_frame(serial, timeout=5.0) and thread.is_alive()
+        worker.play()
+        assert worker.wait_for_frame(serial + 3, timeout=5.0)
+    finally:
+        worker.stop()
+
+
+def test_edit_then_loop_wrap_keeps_playing():
+    ir = _make_ir()
+    ir.loop_duration = 0.5
+    worker = SimulationWorker(ir, max_particles=5000)
+    worker.process([("seek", 0.25)])
+    rate = AnimatedParameter([TimelineKeyframe(0.0, 30.0)])
+    worker.process([("edit", lambda: ir.add_or_update_timeline("smoke/emission_rate", rate))])
+    steps = []
+    for _ in range(30): # Past the loop end and around again
+        worker.advance()
+        steps.append(worker.timeline.current_step)
+    assert steps.count(0) == 1 and steps[-1] > 0
+    _frame_state(worker) # The wrapped frame was published
+    worker.process([("seek", 0.1)]) # Scrubbing back before the edited time
+    assert worker.timeline.current_step == 6
+
+
+def test_a_failing_edit_still_resimulates_and_raises():
+    ir = _make_ir()
+    worker = SimulationWorker(ir, max_particles=5000)
+    worker.process([("seek", 0.5)])
+
+    def bad_edit():
+        ir.get_emitter("smoke").set_param_value("emission_rate", 10.0)
+        raise ValueError("bad value")
+
+    with pytest.raises(ValueError, match="bad value"):
+        worker.process([("edit", bad_edit)])
+    frame = worker.acquire_frame()
+    assert frame.step == 30 and len(frame.views()[1]) < 60 # The partial edit is simulated
+    worker.release_frame()
@@ -0,0 +1,106 @@
+import numpy as np
+
+from src.core.ir import EffectIR, EmitterParameter, EmitterProperties
+from src.core.particle_system import ParticleSystem
+from src.core.simulator import EffectSimulator
+
+DT = 1.0 / 60.0
+
+EMITTERS = {
+    "sparks": {
+        "emission_rate": 300.0,
+        "lifespan_range": (0.5, 1.0),
+        "speed_range": (50.0, 100.0),
+        "size_over_lifespan": [(0.0, 0.2), (0.5, 1.0), (1.0, 0.0)],
+        "opacity_over_lifespan": [(0.0, 0.0), (0.2, 1.0), (1.0, 0.0)],
+    },
+    "smoke": {
+        "emission_rate": 120.0,
+        "lifespan_range": (1.0, 2.0),
+        "particle_color": (0.5, 0.5, 0.5, 0.7),
+        "color_over_lifespan": [(0.0, (1.0, 1.0, 1.0, 1.0)), (1.0, (0.2, 0.2, 0.2, 0.3))],
+    },
+    "plain": {
+        "emission_rate": 60.0,
+        "lifespan_range": (0.3, 0.6),
+        "particle_color": (0.0, 1.0, 0.0, 0.5),
+    },
+}
+
+
+def _make_ir(names=("sparks", "smoke", "plain")):
+    ir = EffectIR()
+    for name in names:
+        ir.add_emitter(EmitterProperties(
+            emitter_id=name,
+            emitter_type="PointParticleEmitter",
+            blending_mode="additive" if name == "sparks" else "alpha",
+            parameters={k: EmitterParameter(name=k, value=v) for k, v in EMITTERS[name].items()},
+        ))
+    return ir
+
+
+def _by_id(ids, *columns):
+    order = np.argsort(ids)
+    return [column[order] for column in columns]
+
+
+def test_simulator_matches_standalone_systems():
+    ir = _make_ir()
+    sim = EffectSimulator(ir, max_particles=5000)
+    systems = {e.emitter_id: ParticleSystem(effect_ir=ir, emitter_id=e.emitter_id, max_particles=5000)
+               for e in ir.emitters}
+    t = 0.0
+    for _ in range(90):
+        sim.step(DT, t)
+        for system in systems.values():
+            system.update(DT, t)
+        t += DT
+
+    assert sim.pool.count == sum(s.pool.count for s in systems.values())
+    for view in sim.emitter_views():
+        pool = systems[view.emitter_id].pool
+        n = pool.count
+        assert len(view) == n > 0
+        # Particle ids differ (shared pool), but birth order within an emitter matches
+        expected = _by_id(pool.particle_id[:n], pool.position[:n], pool.size[:n], pool.color[:n])
+        actual = _by_id(view.particle_id, view.position, view.size, view.color)
+        for a, e in zip(actual, expected):
+            assert np.allclose(a, e, atol=1e-6)
+
+
+def test_emitter_views_report_blending_and_partition_the_pool():
+    sim = EffectSimulator(_make_ir(), max_particles=5000)
+    for _ in range(30):
+        sim.step(DT)
+    views = sim.emitter_views()
+    assert [v.emitter_id for v in views] == ["sparks", "smoke", "plain"]
+    assert [v.blending_mode for v in views] == ["additive", "alpha", "alpha"]
+    assert sorted(np.concatenate([v.rows for v in views]).tolist()) == list(range(sim.pool.count))
+    assert np.array_equal(sim.emitter_view("smoke").rows, np.sort(views[1].rows))
+
+
+def test_emitters_added_and_removed_between_steps():
+    ir = _make_ir(("sparks", "smoke"))
+    sim = EffectSimulator(ir, max_particles=5000)
+    for _ in range(10):
+        sim.step(DT)
+    smoke_before = len(sim.emitter_view("smoke"))
+
+    ir.emitters.pop(0) # Remove "sparks"
+    ir.add_emitter(_make_ir(("plain",)).emitters[0])
+    sim.step(0.0)
+
+    assert sim.emitter_ids == ["smoke", "plain"]
+    assert len(sim.emitter_view("smoke")) == smoke_before
+    assert sim.pool.count == smoke_before
+
+
+def test_each_emitter_is_capped_by_its_own_particles():
+    sim = EffectSimulator(_make_ir(), max_particles=5000)
+    sim.systems[2].max_particles = 20 # "plain"; the pool holds hundreds of the other emitters' particles
+    for _ in range(30):
+        sim.step(DT)
+    assert sim.pool.count > 100
+    assert 0 < len(sim.emitter_view("plain")) <= 20
+    assert sim.systems[0]._curve_workspace is None # The simulator applies the curves of the shared pool
@@ -0,0 +1,97 @@
+import gzip
+import io
+import json
+
+import numpy as np
+
+from src.core.decimation import DecimationTolerances, decimate_bake
+from src.core.ir import SpriteAsset, SpriteDefinition
+from src.core.looping import LoopBaker
+from src.core.spine_export import (SpineExportOptions, SpineJsonCompiler, assign_slots, export_spine_json,
+                                   format_number, short_names)
+
+from .test_simulator import _make_ir
+
+
+class _Stream(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return super().write(data)
+
+
+def _shown_at(attachment_keys, time):
+    """Attachment a slot shows at `time` (keys without a name hide it)."""
+    shown = None
+    for key in attachment_keys:
+        if key.get("time", 0.0) <= time + 1e-6:
+            shown = key.get("name")
+    return shown
+
+
+def test_names_numbers_and_slots():
+    names = short_names()
+    first = [next(names) for _ in range(40)]
+    assert first[:3] == ["a", "b", "c"] and first[36:38] == ["aa", "ab"] and len(set(first)) == 40
+    assert [format_number(v, 2) for v in (1.0, -0.001, 2.345, 10.5)] == ["1", "0", "2.35", "10.5"]
+    slot_of, count = assign_slots(np.array([0, 5, 10, 3, 12]), np.array([10, 12, 20, 4, 13]))
+    assert count == 2 and slot_of.tolist() == [0, 1, 0, 1, 1]
+
+
+def test_compiled_json_plays_the_bake():
+    ir = _make_ir()
+    ir.add_sprite_asset(SpriteAsset(asset_id="atlas", path="atlas.png", width=64, height=64))
+    ir.add_sprite_definition(SpriteDefinition(definition_id="spark", asset_id="atlas", region=(0, 0, 16, 8),
+                                              pivot=(0.25, 0.5)))
+    ir.get_emitter("sparks").set_param_value("sprite_definition_id", "spark")
+    bake = LoopBaker(ir, duration=1.0, workers=1).bake()
+    decimate_bake(bake)
+    stream = _Stream()
+    compiler = SpineJsonCompiler(ir, SpineExportOptions(precision=1))
+    bone_timelines = compiler._bone_timelines
+    written_at = [] # Bytes already written as each slot's bone timelines are generated
+    compiler._bone_timelines = lambda *args: written_at.append(len(stream.getvalue())) or bone_timelines(*args)
+    stats = compiler.compile(bake, stream)
+    data = stream.getvalue()
+    assert stats.raw_bytes == len(data) and stats.gzip_bytes == len(gzip.compress(data, 9))
+    # Streamed: written while slots are still being generated, not built up front
+    assert stream.writes > 1 and written_at[-1] > written_at[0]
+
+    skeleton = json.loads(data)
+    slots = skeleton["slots"]
+    # Tracks share slots: one slot per particle alive at once, the fewest possible
+    assert stats.slots == len(slots) == len(skeleton["bones"]) - 1
+    assert len(slots) == sum(np.bincount(baked.frame).max() for baked in bake.emitters) < bake.track_count
+    assert [slot.get("blend") for slot in slots].count("additive") > 0 and "normal" not in data.decode()
+    attachments = skeleton["skins"][0]["attachments"]
+    spark_slot = next(slot["name"] for slot in slots if slot.get("blend") == "additive")
+    assert attachments[spark_slot] == {"spark": {"x": 4, "width": 16, "height": 8}}
+    assert b'"time":0,' not in data and b'"x":1,"y":1' not in data
+
+    # Slots show exactly as many particles as the bake has on each frame
+    animation = skeleton["animations"]["loop"]
+    times = bake.times()
+    for frame in (0, 17, 42, bake.frame_count):
+        shown = sum(_shown_at(animation["slots"][slot["name"]]["attachment"], times[frame]) is not None
+                    for slot in slots)
+        assert shown == sum(int(np.count_nonzero(baked.frame == frame)) for baked in bake.emitters)
+    last_times = [timeline[-1].get("time", 0.0) for slot in animation["slots"].values() for timeline in slot.values()]
+    assert max(last_times) == 1.0 # The animation lasts exactly one loop
+
+
+def test_export_spine_json(tmp_path):
+    ir = _make_ir(("plain",))
+    ir.loop_duration = 0.5
+    path = str(tmp_path / "effect.json")
+    stats = export_spine_json(ir, path, workers=1)
+    with open(path, "rb") as f:
+        data = f.read()
+    assert stats.raw_bytes == len(data) and json.loads(data)["bones"][0] == {"name": "root"}
+    rgba = json.loads(data)["animations"]["loop"]["slots"]["a"]["rgba"]
+    assert stats.keys > 0 and {key["color"] for key in rgba} == {"00ff0080"}
+    # Decimated with the default tolerances unless others are given
+    explicit = export_spine_json(ir, str(tmp_path / "explicit.json"), tolerances=DecimationTolerances(), workers=1)
+    assert (explicit.keys, explicit.raw_bytes) == (stats.keys, stats.raw_bytes)
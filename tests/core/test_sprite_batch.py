@@ -0,0 +1,78 @@
+import numpy as np
+
+from src.core.ir import FlipbookDefinition, SpriteAsset, SpriteDefinition
+from src.core.particle_pool import ParticlePool
+from src.core.sprite_batch import (MAX_QUADS_PER_MESH, VERTEX_STRIDE, SpriteTable, expand_flipbooks,
+                                   fill_quad_vertices, flipbook_frames, quad_corners, quad_indices)
+
+from .test_simulator import _make_ir
+
+
+def test_quad_corners_respect_pivot_aspect_and_rotation():
+    position = np.array([[10.0, 20.0], [0.0, 0.0]])
+    x, y = quad_corners(position, np.array([4.0, 2.0]), np.array([0.0, 90.0]),
+                        np.array([[0.5, 0.5], [0.0, 0.0]]), np.array([0.5, 1.0]))
+    # 4 x 2 quad centred on (10, 20); corners bottom-left, bottom-right, top-right, top-left
+    assert np.allclose(x[0], [8.0, 12.0, 12.0, 8.0])
+    assert np.allclose(y[0], [19.0, 19.0, 21.0, 21.0])
+    # 2 x 2 quad pivoting on its bottom-left corner, turned 90 degrees counter-clockwise
+    assert np.allclose(x[1], [0.0, 0.0, -2.0, -2.0])
+    assert np.allclose(y[1], [0.0, 2.0, 2.0, 0.0])
+
+
+def test_fill_quad_vertices_interleaves_uvs_and_colors():
+    table = SpriteTable(2)
+    table.set_sprite(1, "atlas", object(), (0.25, 0.5, 0.75, 0.5, 0.75, 1.0, 0.25, 1.0), aspect=2.0)
+    sprite_index = np.array([1, -1])
+    out = np.empty((2, 4, VERTEX_STRIDE), dtype=np.float32)
+    fill_quad_vertices(out, np.zeros((2, 2)), np.array([1.0, 1.0]), np.zeros(2),
+                       np.array([[1.0, 0.0, 0.0, 0.5], [0.0, 1.0, 0.0, 1.0]]),
+                       table.tex_coords[sprite_index], table.pivot[sprite_index], table.aspect[sprite_index])
+    assert np.allclose(out[0, :, 2:4], [[0.25, 0.5], [0.75, 0.5], [0.75, 1.0], [0.25, 1.0]])
+    assert np.allclose(out[1, :, 2:4], [[0, 0], [1, 0], [1, 1], [0, 1]])
+    assert np.allclose(out[0, :, 1], [-1.0, -1.0, 1.0, 1.0]) # aspect 2 doubles the height
+    assert np.allclose(out[:, :, 4:], [[[1.0, 0.0, 0.0, 0.5]] * 4, [[0.0, 1.0, 0.0, 1.0]] * 4])
+    assert table.slot.tolist() == [-1, 0, -1]
+
+
+def test_quad_indices_fit_unsigned_short_meshes():
+    indices = quad_indices(MAX_QUADS_PER_MESH)
+    assert indices[:12].tolist() == [0, 1, 2, 2, 3, 0, 4, 5, 6, 6, 7, 4]
+    assert indices.max() == 65535
+
+
+def test_flipbook_frames_by_rate_and_over_lifetime():
+    age = np.array([0.0, 0.24, 0.26, 0.9, 1.7, 1.0])
+    lifespan = np.full(6, 2.0)
+    count = np.full(6, 4)
+    looped = flipbook_frames(age, lifespan, count, np.full(6, 4.0), np.ones(6, dtype=bool))
+    assert looped.tolist() == [0, 0, 1, 3, 2, 0]
+    held = flipbook_frames(age, lifespan, count, np.full(6, 4.0), np.zeros(6, dtype=bool))
+    assert held.tolist() == [0, 0, 1, 3, 3, 3]
+    over_life = flipbook_frames(age, lifespan, count, np.zeros(6), np.ones(6, dtype=bool))
+    assert over_life.tolist() == [0, 0, 0, 1, 3, 2]
+    assert flipbook_frames(np.array([2.0]), np.array([2.0]), np.array([4]), np.zeros(1),
+                           np.ones(1, dtype=bool)).tolist() == [3] # Dying particles keep the last frame
+
+
+def test_sprite_rows_resolve_flipbooks_to_frame_rows():
+    ir = _make_ir(("plain",))
+    ir.add_sprite_asset(SpriteAsset(asset_id="atlas", path="atlas.png", width=32, height=8))
+    for k in range(4):
+        ir.add_sprite_definition(SpriteDefinition(definition_id=f"spark_{k}", asset_id="atlas", region=(8 * k, 0, 8, 8)))
+    ir.add_flipbook(FlipbookDefinition(definition_id="sparkle", frame_ids=[f"spark_{k}" for k in range(4)],
+                                       frame_rate=10.0))
+    ir.add_flipbook(FlipbookDefinition(definition_id="broken", frame_ids=["spark_0", "missing"]))
+    assert "broken" not in ir.flipbooks
+
+    pool = ParticlePool(capacity=8)
+    pool.spawn(3, "sparkle", age=np.array([0.0, 0.15, 0.35]), lifespan=1.0)
+    pool.spawn(1, "spark_2")
+    pool.spawn(1, None)
+    row_ids, flipbooks = expand_flipbooks(pool.sprite_ids, ir)
+    assert row_ids == ["sparkle", "spark_2", "spark_0", "spark_1", "spark_2", "spark_3"]
+    table = SpriteTable(len(row_ids))
+    assert table.sprite_rows(pool, slice(0, 5)).tolist() == [0, 0, 0, 1, -1] # No flipbooks yet
+    for flipbook in flipbooks:
+        table.set_flipbook(*flipbook)
+    assert table.sprite_rows(pool, slice(0, 5)).tolist() == [2, 3, 5, 1, -1]
@@ -0,0 +1,66 @@
+from src.core.ir import EffectIR, SpriteAsset, SpriteDefinition
+from src.core.texture_cache import TextureCache
+
+
+def _make_ir():
+    ir = EffectIR()
+    for asset_id in ("a", "b", "c"):
+        ir.add_sprite_asset(SpriteAsset(asset_id=asset_id, path=f"{asset_id}.png", width=64, height=64))
+        for k in range(3):
+            ir.add_sprite_definition(SpriteDefinition(definition_id=f"{asset_id}{k}", asset_id=asset_id,
+                                                      region=(16 * k, 0, 16, 16)))
+    ir.add_sprite_asset(SpriteAsset(asset_id="broken", path="missing.png", width=1, height=1))
+    ir.add_sprite_definition(SpriteDefinition(definition_id="broken0", asset_id="broken", region=(0, 0, 1, 1)))
+    return ir
+
+
+def _make_cache(budget_bytes):
+    loads = []
+
+    def load_atlas(asset):
+        if asset.path == "missing.png":
+            raise IOError("not found")
+        loads.append(asset.asset_id)
+        return ("atlas", asset.asset_id), 100
+
+    def make_region(texture, asset, definition):
+        return ("region", texture[1], definition.region)
+
+    return TextureCache(_make_ir(), load_atlas, make_region, budget_bytes=budget_bytes), loads
+
+
+def test_each_atlas_is_loaded_once_and_regions_are_shared():
+    cache, loads = _make_cache(budget_bytes=1000)
+    regions = [cache.get(f"a{k}") for k in range(3)] + [cache.get("a1")]
+    assert loads == ["a"]
+    assert regions[1] is regions[3]
+    assert regions[2] == ("region", "a", (32, 0, 16, 16))
+    assert (cache.stats.misses, cache.stats.hits) == (1, 3)
+    assert cache.get("unknown") is None and cache.get(None) is None
+
+
+def test_least_recently_used_atlas_is_evicted_over_budget():
+    cache, loads = _make_cache(budget_bytes=250)
+    cache.get("a0")
+    cache.get("b0")
+    cache.get("a1") # Touch a: b is now least recently used
+    generation = cache.generation
+    cache.get("c0")
+    assert cache.resident_assets == ["a", "c"]
+    assert cache.bytes_used == 200 and cache.stats.evictions == 1
+    assert cache.generation > generation
+    cache.get("b2")
+    assert loads == ["a", "b", "c", "b"]
+    assert cache.resident_assets == ["c", "b"]
+
+
+def test_failed_atlases_are_not_retried_until_invalidated(capsys):
+    cache, loads = _make_cache(budget_bytes=1000)
+    assert cache.get("broken0") is None
+    assert cache.get("broken0") is None
+    assert cache.stats.failures == 1
+    assert "Warning" in capsys.readouterr().out
+    cache.get("a0")
+    cache.invalidate()
+    assert cache.bytes_used == 0 and len(cache) == 0 and cache.stats.evictions == 0
+    assert cache.get("broken0") is None and cache.stats.failures == 2
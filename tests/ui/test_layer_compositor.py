@@ -0,0 +1,53 @@
+from kivy.graphics.opengl import GL_DST_COLOR, GL_ONE, GL_ZERO
+
+from src.core.sim_worker import SimulationWorker
+from src.ui.preview_window import layer_compositor
+
+from ..core.test_simulator import _make_ir
+
+
+def test_layer_compositor_imports():
+    # main.py imports the compositor; a missing name there stops the editor from starting
+    assert layer_compositor.COMPOSITE_BLEND_FUNCS["multiply"] == (GL_DST_COLOR, GL_ZERO, GL_ZERO, GL_ONE)
+    assert layer_compositor.LAYER_CLEAR_COLORS["multiply"] == (1.0, 1.0, 1.0, 1.0)
+
+
+def _dirty_layers(worker, tracker):
+    # What LayeredParticleRenderer.draw() re-renders for the worker's latest frame
+    frame = worker.acquire_frame()
+    try:
+        counts = {view.emitter_id: len(view) for view in frame.views()}
+        keys = layer_compositor.layer_keys(worker.effect_ir, frame.views(), frame.step, frame.fingerprints)
+        return tracker.update(keys), counts
+    finally:
+        worker.release_frame()
+
+
+def test_layers_are_reused_until_their_emitter_is_edited():
+    ir = _make_ir()
+    worker = SimulationWorker(ir, max_particles=5000)
+    tracker = layer_compositor.LayerTracker()
+    worker.process([("seek", 0.5)])
+    assert _dirty_layers(worker, tracker)[0] == ["sparks", "smoke", "plain"]
+    worker.process([("seek", 0.5)]) # Same frame again: every layer comes from its cache
+    assert _dirty_layers(worker, tracker)[0] == [] and tracker.reuses == 3
+
+    worker.process([("edit", lambda: ir.get_emitter("smoke").set_param_value("emission_rate", 10.0))])
+    assert _dirty_layers(worker, tracker)[0] == ["smoke"]
+
+
+def test_a_full_pool_couples_every_layer():
+    # The pool fills up, so emitters limit each other: an edit to one changes the others' particles
+    ir = _make_ir()
+    worker = SimulationWorker(ir, max_particles=200)
+    tracker = layer_compositor.LayerTracker()
+    worker.process([("seek", 1.0)])
+    _dirty, before = _dirty_layers(worker, tracker)
+    assert worker.simulator.saturated
+
+    worker.process([("edit", lambda: ir.get_emitter("plain").set_param_value("emission_rate", 0.0))])
+    dirty, after = _dirty_layers(worker, tracker)
+    assert after["sparks"] != before["sparks"] and after["smoke"] != before["smoke"]
+    assert dirty == ["sparks", "smoke", "plain"]
+    worker.process([("seek", 1.0)])
+    assert _dirty_layers(worker, tracker)[0] == [] # Still cached while nothing changes
@@ -6,6 +6,10 @@ Prints the RGBA values of the centre pixel of the sprite PNG as it exists
 on disk and as it is seen by Kivy after loading.  If RGB is non-zero where
 alpha is 0 the texture is *not* clean and will break Screen mode.
 
+Since sprite assets are premultiplied on import (src/core/asset_import.py),
+transparent texels reach the renderer as (0, 0, 0, 0) whatever the PNG
+stores; the last section shows the imported value.
+
 Run once from the project root:
     python tools/diagnose_blend.py
 """
@@ -72,4 +76,13 @@ elif a_d == 0 and (r_k or g_k or b_k):
 elif a_d == 0 and a_k == 0 and (r_k or g_k or b_k) == 0:
     print(' • Texture is clean; artefacts likely from region slice, GLES quirk or blend factors – see fixes 3 or 4.')
 else:
-    print(' • Centre pixel not fully transparent; if this is inside the sprite that is fine. Pick a transparent pixel for the test.') 
\ No newline at end of file
+    print(' • Centre pixel not fully transparent; if this is inside the sprite that is fine. Pick a transparent pixel for the test.') 
+
+# ------------------------------------------------------------
+# 3) What does the renderer get after import?
+# ------------------------------------------------------------
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.core.asset_import import ImportedAsset, load_rgba
+imported = ImportedAsset.from_pixels('diagnose', load_rgba(str(PNG_PATH)))
+cx, cy = imported.source_size[0] // 2, imported.source_size[1] // 2
+print('\n📦  Imported centre pixel (premultiplied):', tuple(int(c) for c in imported.crop((cx, cy, 1, 1))[0, 0]))